@@ -0,0 +1,28 @@
+''' Random self-play with VectorKeezenGame: moves per second of N games in lockstep
+'''
+import time
+
+import numpy as np
+
+from rlcard.games.keezen.keezengameadapter import KeezenGameAdapter
+from rlcard.games.keezen.vector import VectorKeezenGame
+
+step_num = 200
+
+for game_type in ["Keez", "KeezSimple"]:
+    KeezenGameAdapter.game_type = game_type
+    game = KeezenGameAdapter().game
+    for num_games in [64, 1024]:
+        vector_game = VectorKeezenGame(game, num_games, seed=0)
+        observations, legal_masks = vector_game.reset()
+        finished_games = 0
+        start = time.time()
+        for _ in range(step_num):
+            # Random legal action for each game
+            actions = (vector_game.np_random.random_sample(legal_masks.shape) * legal_masks).argmax(axis=1)
+            observations, legal_masks, rewards, dones = vector_game.step(actions)
+            finished_games += dones.sum()
+        duration = time.time() - start
+        print("{0}, {1} games: {2:.0f} moves/sec, {3} games finished".format(game_type, num_games,
+                                                                            step_num * num_games / duration,
+                                                                            finished_games))
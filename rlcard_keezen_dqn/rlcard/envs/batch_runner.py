@@ -0,0 +1,164 @@
+import numpy as np
+
+from rlcard.utils import reorganize, get_legal_masks
+
+
+class BatchRunner(object):
+    '''
+    Plays `env_num` games at once in one process. In each round the states of
+    all games that wait on the same agent are gathered, and an agent with
+    `eval_step_batch(obs, legal_masks)` (or `step_batch` for training) picks
+    the actions of all of them in one call, like one forward pass of a
+    network. `eval_step_batch` returns the actions and probabilities like
+    `eval_step`, `step_batch` returns the actions. The observations are
+    stacked (batch, *state_shape), the legal action masks are boolean
+    (batch, action_num), taken from the 'legal_mask' of the states if the
+    agent declares it in its state_fields. Other agents get a call per state,
+    like in `Env.run`. A finished game is replaced by the next one, so the
+    batch keeps `env_num` games until the last games are started.
+    '''
+
+    def __init__(self, env_id, config):
+        ''' Initialize the runner
+
+        Args:
+            env_id (string): The name of the environment, like 'keezen' or 'mejn'
+            config (dict): The config of the environments, 'env_num' is the
+              number of games in flight. Each game gets its own seed
+              (seed + number of the game, counted over all runs) if 'seed'
+              is given.
+        '''
+        self.num = config['env_num']
+        self.seed = config['seed']
+        self.game_count = 0  # The number of games of the previous runs
+        self.envs = []
+        for index in range(self.num):
+            env_config = dict(config, env_num=1)
+            if env_config['seed'] is not None:
+                env_config['seed'] = env_config['seed'] + index
+            self.envs.append(_make(env_id, env_config))
+        self.player_num = self.envs[0].player_num
+        self.action_num = self.envs[0].action_num
+        self.state_shape = self.envs[0].state_shape
+        self.timestep = 0
+        self.agents = None
+
+    def set_agents(self, agents):
+        '''
+        Set the agents that will play the games. The same agent object in
+        several seats gets the states of all these seats in one batch.
+        This function must be called before `run`.
+
+        Args:
+            agents (list): List of Agent classes
+        '''
+        for agent in agents:
+            if agent.use_raw and (hasattr(agent, 'eval_step_batch') or hasattr(agent, 'step_batch')):
+                raise ValueError('Agents with raw data are not supported by batched steps.')
+        self.agents = agents
+        for env in self.envs:
+            env.set_agents(agents)
+
+    def run(self, is_training=False, game_num=None):
+        '''
+        Run complete games, like `Env.run` for each game. The environments
+        play `env_num` games at once, an environment starts the next game
+        when its game is over while games are left.
+
+        Args:
+            is_training (boolean): True if for training purpose.
+            game_num (int): The number of games, `env_num` by default.
+
+        Returns:
+            (tuple) Tuple containing:
+
+                (list): A list of trajectories generated from each game.
+                (list): A list of payoffs of each game.
+        '''
+        if game_num is None:
+            game_num = self.num
+        trajectories = [[[] for _ in range(self.player_num)] for _ in range(game_num)]
+        payoffs = [None] * game_num
+        games = [None] * self.num  # The number of the game of each environment
+        states = [None] * self.num
+        player_ids = [None] * self.num
+        active = []
+        for index in range(min(self.num, game_num)):
+            self._start_game(index, index, games, states, player_ids, trajectories)
+            active.append(index)
+        started = len(active)
+        while active:
+            # Gather the games that wait on the same agent
+            batches = {}
+            for index in active:
+                agent = self.agents[player_ids[index]]
+                batches.setdefault(id(agent), (agent, []))[1].append(index)
+            actions = {}
+            for agent, indexes in batches.values():
+                for index, action in zip(indexes, self._get_actions(agent, [states[i] for i in indexes],
+                                                                     is_training)):
+                    actions[index] = action
+
+            # Step all games, an environment with a finished game starts the next game if any
+            for index in active:
+                env = self.envs[index]
+                game_trajectories = trajectories[games[index]]
+                next_state, next_player_id = env.step(actions[index], self.agents[player_ids[index]].use_raw)
+                game_trajectories[player_ids[index]].append(actions[index])
+                states[index], player_ids[index] = next_state, next_player_id
+                if not env.is_over():
+                    game_trajectories[next_player_id].append(next_state)
+            self.timestep += len(active)
+            next_active = []
+            for index in active:
+                if not self.envs[index].is_over():
+                    next_active.append(index)
+                    continue
+                self._end_game(index, games, trajectories, payoffs)
+                if started < game_num:
+                    self._start_game(index, started, games, states, player_ids, trajectories)
+                    started += 1
+                    next_active.append(index)
+            active = next_active
+        self.game_count += game_num
+        return trajectories, payoffs
+
+    def _start_game(self, index, game, games, states, player_ids, trajectories):
+        ''' Reset the environment of the index for the game, with the seed of the game '''
+        env = self.envs[index]
+        if self.seed is not None:
+            env._seed(self.seed + self.game_count + game)
+        games[index] = game
+        states[index], player_ids[index] = env.reset()
+        trajectories[game][player_ids[index]].append(states[index])
+
+    def _end_game(self, index, games, trajectories, payoffs):
+        ''' Add a final state to all the players and reorganize the trajectories of the game '''
+        env = self.envs[index]
+        game = games[index]
+        for player_id in range(self.player_num):
+            trajectories[game][player_id].append(env.get_state(player_id))
+        payoffs[game] = env.get_payoffs()
+        trajectories[game] = reorganize(trajectories[game], payoffs[game])
+
+    def _get_actions(self, agent, states, is_training):
+        ''' The actions of the agent for the states, in one call if the agent has a batched step '''
+        batch_step = getattr(agent, 'step_batch' if is_training else 'eval_step_batch', None)
+        if batch_step is None:
+            if is_training:
+                return [agent.step(state) for state in states]
+            return [agent.eval_step(state)[0] for state in states]
+        obs = np.stack([state['obs'] for state in states])
+        if 'legal_mask' in states[0]:  # Declared in the state_fields of the agent
+            legal_masks = np.stack([state['legal_mask'] for state in states])
+        else:
+            legal_masks = get_legal_masks([state['legal_actions'] for state in states], self.action_num)
+        if is_training:
+            return [int(action) for action in batch_step(obs, legal_masks)]
+        actions, _ = batch_step(obs, legal_masks)
+        return [int(action) for action in actions]
+
+
+def _make(env_id, config):
+    from rlcard.envs.registration import make  # Imported here: registration imports this module
+    return make(env_id, config)
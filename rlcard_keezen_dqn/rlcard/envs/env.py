@@ -278,6 +278,26 @@ class Env(object):
         '''
         raise NotImplementedError
 
+    def _get_state_fields(self, player_id):
+        ''' Get the state fields the agent of the player uses, declared by the
+        agent as `state_fields`, like ['obs', 'legal_actions']. The env only
+        builds these fields, an agent that only needs the legal actions gets
+        no observation. The player id is always in the state.
+
+        Args:
+            player_id (int): The player id
+
+        Returns:
+            (list): The names of the fields, None if the agent does not declare them
+        '''
+        if self.single_agent_mode:
+            agents = self.model.agents if player_id != self.active_player else None
+        else:
+            agents = getattr(self, 'agents', None)
+        if agents is None:
+            return None
+        return getattr(agents[player_id], 'state_fields', None)
+
     def _extract_state(self, state):
         ''' Extract useful information from state for RL. Must be implemented in the child class.
 
@@ -313,6 +333,19 @@ class Env(object):
         '''
         raise NotImplementedError
 
+    def _get_legal_mask(self, legal_actions=None):
+        ''' Get the legal actions for current state as a boolean mask.
+
+        Args:
+            legal_actions (list): The legal actions' id, if already known
+
+        Returns:
+            (numpy.array): A (action_num,) boolean mask of the legal actions.
+        '''
+        legal_mask = np.zeros(self.action_num, dtype=bool)
+        legal_mask[legal_actions if legal_actions is not None else self._get_legal_actions()] = True
+        return legal_mask
+
     def _single_agent_step(self, action):
         ''' Step forward for human/single agent
 
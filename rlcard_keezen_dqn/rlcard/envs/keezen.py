@@ -1,17 +1,27 @@
 import numpy as np
 
 from rlcard.envs import Env
-from rlcard.games.keezen.board import BoardState
+from rlcard.games.keezen.board import BoardState, BoardPlanes
 from rlcard.games.keezen.card import CardState
-from rlcard.games.keezen.game import GameActions
+from rlcard.games.keezen.game import GameActions, ArrayGameState
 from rlcard.games.keezen.keezengameadapter import KeezenGameAdapter
+from rlcard.games.keezen.move import MoveType
 
 
 class KeezenEnv(Env):
     """ Keezen Environment."""
 
+    STATE_FIELDS = ('obs', 'legal_actions', 'allowed_moves', 'game_state')  # For agents without state_fields
+    LEAN_STATE_FIELDS = ('obs', 'legal_actions')
+
     def __init__(self, config):
-        self.game = KeezenGameAdapter()
+        self.lean_state = config.get('lean_state', False)  # Only obs, legal actions and player id in the states
+        self.game = KeezenGameAdapter(array_game_state=config.get('array_game_state', False),
+                                      lean_state=self.lean_state)
+        self.game.game.history_snapshot_interval = config.get('step_back_snapshot_interval', 0)
+        self.encoder = KeezenObservationEncoder(self.game.game.board, self.game.game.players,
+                                                config.get('debug_observation', False))
+        self.card_observation = config.get('card_observation', False)  # Add the own and played card planes
         self.action_num = self.game.get_action_num()
         self._ACTION_LIST = []  # List with all action ids, such as 'NO','DL','RU01P0','RO01P1' etc
         self._ACTION_SPACE = {}  # Map action indexes to action ids String (action id) --> int (action index)
@@ -28,7 +38,7 @@ class KeezenEnv(Env):
                 idx += 1
         # FIXED: self._ACTION_LIST = list(self._ACTION_SPACE.values())
         super().__init__(config)
-        self.state_shape = [5, 97]  # 97 123 TODO, 97 for player+board, 123 for player+board+cards
+        self.state_shape = [5, 123] if self.card_observation else [5, 97]  # 123 with the card planes
 
     # OLD: 2x bytearray 96
     # def _extract_state(self, state):
@@ -50,38 +60,58 @@ class KeezenEnv(Env):
     #     return extracted_state
 
     def _extract_state(self, state):
-        # obs = np.zeros((5, 122), dtype=bool)  # 5x0 = active player, 5x13 is player cards, 5x13 is played cards, 5x96 is marbles on board
-        fields_with_marbles = state['fields_with_marbles']
         cur_player = state['state_for_player']
-        # cur_player = self.game.players[0]
-        play_with_color = state['players_play_with_color']
-
-        cur_player_plays_with_color = play_with_color[cur_player]
-        # own_cards = CardState.get_card_state_as_matrix(self.game.game_state.player_cards[cur_player])
-        # played_cards = CardState.get_card_state_as_matrix(self.game.game_state.played_cards)
-        board_matrix = BoardState.get_board_state_as_matrix(fields_with_marbles, self.game.game.board, cur_player,
-                                                            cur_player_plays_with_color, self.game.game.players)
-        active_player = np.zeros((5, 1), dtype=int)
-        index_of_cur_player = self.game.game.players.index(cur_player)
-        active_player[index_of_cur_player][0] = 1
-        obs = np.hstack((active_player, board_matrix))  # ACTIVE PLAYER AND BOARD STATE
-
-        # Board only:
-        # obs = board_matrix
-
-        # Board and card state
-        #obs = np.hstack((active_player, own_cards))
-        #obs = np.hstack((obs, played_cards))
-        #obs = np.hstack((obs, board_matrix))
-
-        extracted_state = {}
-        extracted_state['obs'] = obs
-        extracted_state['player_id'] = self.game.game.players.index(cur_player)
-        extracted_state['legal_actions'] = self._get_legal_actions()
-        extracted_state['allowed_moves'] = state.get("allowed_moves")
-        extracted_state['game_state'] = state.get("game_state")
+        player_id = self.game.game.players.index(cur_player)
+        state_fields = self._get_state_fields(player_id)
+        if state_fields is None:  # All fields, the game objects not in lean states
+            state_fields = self.LEAN_STATE_FIELDS if self.lean_state else self.STATE_FIELDS
+        extracted_state = {'player_id': player_id}
+        if 'obs' in state_fields:
+            extracted_state['obs'] = self._get_observation(state, cur_player)
+        if 'legal_actions' in state_fields:
+            extracted_state['legal_actions'] = self._get_legal_actions()
+        if 'legal_mask' in state_fields:  # Boolean (action_num,) array, for batched agents
+            extracted_state['legal_mask'] = self._get_legal_mask(extracted_state.get('legal_actions'))
+        if 'allowed_moves' in state_fields:
+            extracted_state['allowed_moves'] = self.game.get_allowed_moves() if self.lean_state \
+                else state.get("allowed_moves")
+        if 'game_state' in state_fields:
+            extracted_state['game_state'] = state.get("game_state")
         return extracted_state
 
+    def _get_observation(self, state, cur_player):
+        # obs = np.zeros((5, 122), dtype=bool)  # 5x0 = active player, 5x13 is player cards, 5x13 is played cards, 5x96 is marbles on board
+        game_state = state.get("game_state")
+        if isinstance(game_state, ArrayGameState) and game_state.move_player == cur_player:
+            # Read-only int8 view on the planes of the game state, updated in place by the game: no rebuild
+            obs = game_state.get_observation()
+        elif game_state is not None:
+            obs = self.encoder.encode(game_state, cur_player)  # ACTIVE PLAYER AND BOARD STATE, updated with the move
+        else:
+            fields_with_marbles = state['fields_with_marbles']
+            play_with_color = state['players_play_with_color']
+
+            cur_player_plays_with_color = play_with_color[cur_player]
+            board_matrix = BoardState.get_board_state_as_matrix(fields_with_marbles, self.game.game.board, cur_player,
+                                                                cur_player_plays_with_color, self.game.game.players)
+            active_player = np.zeros((5, 1), dtype=int)
+            index_of_cur_player = self.game.game.players.index(cur_player)
+            active_player[index_of_cur_player][0] = 1
+            obs = np.hstack((active_player, board_matrix))  # ACTIVE PLAYER AND BOARD STATE
+
+        if self.card_observation:  # Board and card state
+            obs = np.hstack((obs, self._get_card_planes(game_state or self.game.game_state, cur_player)))
+        return obs
+
+    @staticmethod
+    def _get_card_planes(game_state, player):
+        """The own cards and played cards planes, 5x13 each."""
+        if isinstance(game_state, ArrayGameState):
+            return game_state.get_card_planes(player)
+        own_cards = CardState.get_card_state_as_matrix(game_state.player_cards[player])
+        played_cards = CardState.get_card_state_as_matrix(game_state.played_cards)
+        return np.hstack((own_cards, played_cards))
+
     def get_payoffs(self):
         """ Get the payoffs of players. Returns: payoffs (list): a list of payoffs for each player"""
         is_over, rewards = self.game.game.is_over(self.game.game_state)
@@ -122,3 +152,99 @@ class KeezenEnv(Env):
         print("!!get_perfect_information!!")
         raise NotImplementedError
         return state
+
+
+class KeezenObservationEncoder:
+    """Keeps the observation planes (see BoardPlanes) of the last encoded game state and applies the marble moves of
+    the executed move (game_state.last_move) as deltas, instead of rebuilding the board matrix each step. The planes
+    are rebuilt when the game state does not follow the last encoded one, like after a reset or a step back.
+    In debug mode each update is checked against BoardState.get_board_state_as_matrix."""
+
+    def __init__(self, board, players, debug=False):
+        self.board = board
+        self.players = players
+        self.board_planes = BoardPlanes(board, players)
+        self.debug = debug
+        self.observation = np.zeros(self.board_planes.shape, dtype=int)
+        self.marble_fields = [-1] * len(board.marbles)  # Marble id --> field id
+        self.field_marbles = [-1] * len(board.fields)  # Field id --> marble id
+        self.active_row = None
+        self.game_state = None
+        self.round_number = None
+        self.move_number = None
+
+    def encode(self, game_state, player):
+        """Returns the observation of the game state for the player, active player column first."""
+        if game_state is not self.game_state or game_state.round_number != self.round_number \
+                or game_state.move_number != self.move_number:
+            if self._follows_encoded_state(game_state):
+                self._apply_move(game_state.last_move)
+            else:
+                self._set_board(game_state.fields_with_marbles)
+            self.game_state = game_state
+            self.round_number = game_state.round_number
+            self.move_number = game_state.move_number
+            if self.debug:
+                self._check_board(game_state.fields_with_marbles)
+        self._set_active_row(self.board_planes.player_rows[player])
+        return self.observation.copy()
+
+    def _follows_encoded_state(self, game_state) -> bool:
+        """Returns if the game state is the result of a step from the last encoded game state."""
+        if self.game_state is None or (game_state.round_number == 0 and game_state.move_number == 0):
+            return False
+        move = game_state.last_move
+        if move is None:
+            return game_state.round_number == self.round_number and game_state.move_number == self.move_number
+        if move.move_type == MoveType.DEAL:
+            return game_state.round_number == self.round_number + 1 and game_state.move_number == self.move_number
+        return game_state.round_number == self.round_number and game_state.move_number == self.move_number + 1
+
+    def _apply_move(self, move):
+        if move is None:
+            return
+        for marble_move in move.marble_moves:
+            self._put_marble(marble_move.marble.id_, marble_move.to_field.id_)
+            for hit_marble_move in marble_move.hit_marble_moves:
+                self._put_marble(hit_marble_move.marble.id_, hit_marble_move.to_field.id_)
+
+    def _set_board(self, fields_with_marbles):
+        self.observation[:, 1:] = 0
+        self.marble_fields = [-1] * len(self.marble_fields)
+        self.field_marbles = [-1] * len(self.field_marbles)
+        for field, marble in fields_with_marbles.items():
+            self._put_marble(marble.id_, field.id_)
+
+    def _put_marble(self, marble_id, field_id):
+        """Same as BoardState.put_marble_on_field: a marble on the destination field is removed from the board."""
+        current_field_id = self.marble_fields[marble_id]
+        if current_field_id == field_id:
+            return
+        board_planes = self.board_planes
+        if current_field_id >= 0:
+            column = board_planes.field_columns[current_field_id]
+            self.observation[board_planes.marble_rows[marble_id], column] = 0
+            self.observation[board_planes.all_marbles_row, column] = 0
+            self.field_marbles[current_field_id] = -1
+        column = board_planes.field_columns[field_id]
+        replaced_marble_id = self.field_marbles[field_id]
+        if replaced_marble_id >= 0:
+            self.observation[board_planes.marble_rows[replaced_marble_id], column] = 0
+            self.marble_fields[replaced_marble_id] = -1
+        self.observation[board_planes.marble_rows[marble_id], column] = 1
+        self.observation[board_planes.all_marbles_row, column] = 1
+        self.field_marbles[field_id] = marble_id
+        self.marble_fields[marble_id] = field_id
+
+    def _set_active_row(self, row):
+        if row != self.active_row:
+            if self.active_row is not None:
+                self.observation[self.active_row, 0] = 0
+            self.observation[row, 0] = 1
+            self.active_row = row
+
+    def _check_board(self, fields_with_marbles):
+        board_matrix = BoardState.get_board_state_as_matrix(fields_with_marbles, self.board, None, None, self.players)
+        if not np.array_equal(board_matrix, self.observation[:, 1:]):
+            raise ValueError("Incremental observation differs from the full recompute, move: " +
+                             str(self.game_state.last_move))
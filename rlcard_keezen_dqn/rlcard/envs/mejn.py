@@ -9,8 +9,12 @@ from rlcard.games.mejn.mejngameadapter import MejnGameAdapter
 class MejnEnv(Env):
     """ Mejn Environment."""
 
+    STATE_FIELDS = ('obs', 'legal_actions', 'allowed_moves', 'game_state')  # For agents without state_fields
+    LEAN_STATE_FIELDS = ('obs', 'legal_actions')
+
     def __init__(self, config):
-        self.game = MejnGameAdapter()
+        self.lean_state = config.get('lean_state', False)  # Only obs, legal actions and player id in the states
+        self.game = MejnGameAdapter(lean_state=self.lean_state)
         self.action_num = self.game.get_action_num()
         self._ACTION_LIST = []  # List with all action ids, such as 'NO','DL','RU01P0','RO01P1' etc
         self._ACTION_SPACE = {}  # Map action indexes to action ids String (action id) --> int (action index)
@@ -24,22 +28,37 @@ class MejnEnv(Env):
         self.state_shape = [5, 73]
 
     def _extract_state(self, state):
-        fields_with_marbles = state['fields_with_marbles']
         cur_player = state['state_for_player']
+        player_id = self.game.game.players.index(cur_player)
+        state_fields = self._get_state_fields(player_id)
+        if state_fields is None:  # All fields, the game objects not in lean states
+            state_fields = self.LEAN_STATE_FIELDS if self.lean_state else self.STATE_FIELDS
+        extracted_state = {'player_id': player_id}
+        if 'obs' in state_fields:
+            extracted_state['obs'] = self._get_observation(state, cur_player)
+        if 'legal_actions' in state_fields:
+            extracted_state['legal_actions'] = self._get_legal_actions()
+        if 'legal_mask' in state_fields:  # Boolean (action_num,) array, for batched agents
+            extracted_state['legal_mask'] = self._get_legal_mask(extracted_state.get('legal_actions'))
+        if 'allowed_moves' in state_fields:
+            extracted_state['allowed_moves'] = self.game.get_allowed_moves() if self.lean_state \
+                else state.get("allowed_moves")
+        if 'game_state' in state_fields:
+            extracted_state['game_state'] = state.get("game_state")
+        return extracted_state
+
+    def _get_observation(self, state, cur_player):
+        if self.lean_state:
+            fields_with_marbles = state['game_state'].fields_with_marbles
+        else:
+            fields_with_marbles = state['fields_with_marbles']
 
         board_matrix = BoardState.get_board_state_as_matrix(fields_with_marbles, self.game.game.board, self.game.game.players)
         active_player = np.zeros((5, 1), dtype=int)
         index_of_cur_player = self.game.game.players.index(cur_player)
         active_player[index_of_cur_player][0] = 1
         obs = np.hstack((active_player, board_matrix))  # ACTIVE PLAYER AND BOARD STATE
-
-        extracted_state = {}
-        extracted_state['obs'] = obs
-        extracted_state['player_id'] = self.game.game.players.index(cur_player)
-        extracted_state['legal_actions'] = self._get_legal_actions()
-        extracted_state['allowed_moves'] = state.get("allowed_moves")
-        extracted_state['game_state'] = state.get("game_state")
-        return extracted_state
+        return obs
 
     def get_payoffs(self):
         """ Get the payoffs of players. Returns: payoffs (list): a list of payoffs for each player"""
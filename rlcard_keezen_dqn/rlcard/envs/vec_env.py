@@ -0,0 +1,246 @@
+import multiprocessing
+
+import numpy as np
+
+from rlcard.utils import reorganize
+
+
+class VecEnv(object):
+    '''
+    Runs `env_num` environments in worker processes. The observations, legal
+    action masks, player ids, payoffs and done flags of all environments are
+    written by the workers into shared memory NumPy buffers, only the actions
+    and short commands are sent over the pipes.
+    '''
+
+    def __init__(self, env_id, config):
+        ''' Initialize the vectorized environment
+
+        Args:
+            env_id (string): The name of the environment, like 'keezen' or 'mejn'
+            config (dict): The config of the environments, 'env_num' is the
+              number of worker processes. Each worker gets its own seed
+              (seed + worker index) if 'seed' is given.
+        '''
+        self.num = config['env_num']
+        self.env_id = env_id
+        self.config = dict(config, env_num=1)
+
+        # Probe environment for the shapes of the buffers
+        env = _make(env_id, self.config)
+        state, _ = env.reset()
+        self.player_num = env.player_num
+        self.action_num = env.action_num
+        self.state_shape = env.state_shape
+        obs = np.asarray(state['obs'])
+
+        self.timestep = 0
+        self.agents = None
+        self._buffers = _SharedBuffers(self.num, obs.shape, obs.dtype, self.action_num, self.player_num)
+        context = multiprocessing.get_context()
+        self.remotes, work_remotes = zip(*[context.Pipe() for _ in range(self.num)])
+        self.processes = []
+        for index, work_remote in enumerate(work_remotes):
+            worker_config = dict(self.config)
+            if worker_config['seed'] is not None:
+                worker_config['seed'] = worker_config['seed'] + index
+            process = context.Process(target=_worker, args=(work_remote, env_id, worker_config, self._buffers, index),
+                                      daemon=True)
+            process.start()
+            work_remote.close()
+            self.processes.append(process)
+        self.closed = False
+
+    def reset(self):
+        ''' Start a new game in all environments
+
+        Returns:
+            (tuple): Tuple containing:
+
+                (numpy.array): The observations (env_num, *state_shape)
+                (numpy.array): The legal action masks (env_num, action_num)
+                (numpy.array): The current player ids (env_num,)
+        '''
+        self._send_all([('reset', None)] * self.num)
+        return self._buffers.obs.copy(), self._buffers.legal_masks.copy(), self._buffers.player_ids.copy()
+
+    def step(self, actions):
+        ''' Step forward in all environments. An environment with a finished game
+        is reset: its observation is the first one of the new game.
+
+        Args:
+            actions (list): The action (index) for each environment
+
+        Returns:
+            (tuple): Tuple containing:
+
+                (numpy.array): The observations (env_num, *state_shape)
+                (numpy.array): The legal action masks (env_num, action_num)
+                (numpy.array): The current player ids (env_num,)
+                (numpy.array): The payoffs (env_num, player_num), 0 if the game is not over
+                (numpy.array): The done flags (env_num,)
+        '''
+        self.timestep += self.num
+        self._send_all([('step', int(action)) for action in actions])
+        buffers = self._buffers
+        return buffers.obs.copy(), buffers.legal_masks.copy(), buffers.player_ids.copy(), buffers.payoffs.copy(), \
+            buffers.dones.copy()
+
+    def set_agents(self, agents):
+        '''
+        Set the agents that will interact with the environments.
+        This function must be called before `run`.
+
+        Args:
+            agents (list): List of Agent classes, the agents do not get raw data
+        '''
+        for agent in agents:
+            if agent.use_raw:
+                raise ValueError('Agents with raw data are not supported by VecEnv.')
+        self.agents = agents
+
+    def run(self, is_training=False):
+        '''
+        Run a complete game in each environment, like `Env.run`.
+
+        Args:
+            is_training (boolean): True if for training purpose.
+
+        Returns:
+            (tuple) Tuple containing:
+
+                (list): A list of trajectories generated from each environment.
+                (list): A list of payoffs of each environment.
+        '''
+        buffers = self._buffers
+        trajectories = [[[] for _ in range(self.player_num)] for _ in range(self.num)]
+        self._send_all([('reset', None)] * self.num)
+        states = [self._get_state(index) for index in range(self.num)]
+        for index, state in enumerate(states):
+            trajectories[index][buffers.player_ids[index]].append(state)
+        payoffs = [None] * self.num
+        active = list(range(self.num))
+        while active:
+            commands = []
+            for index in active:
+                agent = self.agents[buffers.player_ids[index]]
+                if not is_training:
+                    action, _ = agent.eval_step(states[index])
+                else:
+                    action = agent.step(states[index])
+                trajectories[index][buffers.player_ids[index]].append(action)
+                commands.append(('play', action))
+            self.timestep += len(active)
+            self._send(active, commands)
+            for index in active:
+                if buffers.dones[index]:
+                    payoffs[index] = buffers.payoffs[index].copy()
+                else:
+                    states[index] = self._get_state(index)
+                    trajectories[index][buffers.player_ids[index]].append(states[index])
+            active = [index for index in active if not buffers.dones[index]]
+
+        # Add a final state to all the players and reorganize the trajectories
+        for player_id in range(self.player_num):
+            self._send_all([('final_state', player_id)] * self.num)
+            for index in range(self.num):
+                trajectories[index][player_id].append(self._get_state(index))
+        trajectories = [reorganize(env_trajectories, env_payoffs)
+                        for env_trajectories, env_payoffs in zip(trajectories, payoffs)]
+        return trajectories, payoffs
+
+    def close(self):
+        ''' Stop the worker processes '''
+        if self.closed:
+            return
+        for remote in self.remotes:
+            remote.send(('close', None))
+        for process in self.processes:
+            process.join()
+        self.closed = True
+
+    def _get_state(self, index):
+        return {'obs': self._buffers.obs[index].copy(),
+                'legal_actions': np.flatnonzero(self._buffers.legal_masks[index]).tolist(),
+                'player_id': int(self._buffers.player_ids[index])}
+
+    def _send_all(self, commands):
+        self._send(range(self.num), commands)
+
+    def _send(self, indexes, commands):
+        for index, command in zip(indexes, commands):
+            self.remotes[index].send(command)
+        for index in indexes:
+            error = self.remotes[index].recv()
+            if error is not None:
+                raise RuntimeError('Error in environment {}: {}'.format(index, error))
+
+
+class _SharedBuffers(object):
+    ''' The NumPy arrays in shared memory, written by the workers '''
+
+    def __init__(self, num, obs_shape, obs_dtype, action_num, player_num):
+        self.arrays = {'obs': ((num,) + tuple(obs_shape), np.dtype(obs_dtype)),
+                       'legal_masks': ((num, action_num), np.dtype(bool)),
+                       'player_ids': ((num,), np.dtype(np.int64)),
+                       'payoffs': ((num, player_num), np.dtype(np.float64)),
+                       'dones': ((num,), np.dtype(bool))}
+        self.raw_arrays = {name: multiprocessing.RawArray('b', int(np.prod(shape)) * dtype.itemsize)
+                           for name, (shape, dtype) in self.arrays.items()}
+        self._set_views()
+
+    def _set_views(self):
+        for name, (shape, dtype) in self.arrays.items():
+            setattr(self, name, np.frombuffer(self.raw_arrays[name], dtype=dtype).reshape(shape))
+
+    def __getstate__(self):
+        return {'arrays': self.arrays, 'raw_arrays': self.raw_arrays}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._set_views()
+
+
+def _make(env_id, config):
+    from rlcard.envs.registration import make  # Imported here: registration imports this module
+    return make(env_id, config)
+
+
+def _worker(remote, env_id, config, buffers, index):
+    ''' Runs an environment, writes the results of the commands into the buffers '''
+    env = _make(env_id, config)
+
+    def write_state(state, player_id):
+        buffers.obs[index] = state['obs']
+        if 'legal_mask' in state:
+            buffers.legal_masks[index] = state['legal_mask']
+        else:
+            buffers.legal_masks[index] = False
+            buffers.legal_masks[index, state['legal_actions']] = True
+        buffers.player_ids[index] = player_id
+
+    while True:
+        command, data = remote.recv()
+        try:
+            if command == 'close':
+                remote.close()
+                break
+            elif command == 'reset':
+                write_state(*env.reset())
+                buffers.payoffs[index] = 0
+                buffers.dones[index] = False
+            elif command == 'step' or command == 'play':
+                state, player_id = env.step(data)
+                done = env.is_over()
+                buffers.dones[index] = done
+                buffers.payoffs[index] = env.get_payoffs() if done else 0
+                if done and command == 'step':  # Auto reset
+                    state, player_id = env.reset()
+                write_state(state, player_id)
+            elif command == 'final_state':
+                write_state(env.get_state(data), data)
+            else:
+                raise ValueError('Unknown command: ' + str(command))
+            remote.send(None)
+        except Exception as error:
+            remote.send(repr(error))
@@ -1,5 +1,4 @@
 import random
-from copy import copy
 
 from rlcard.games.keezen.board import Board, FieldType, BoardState
 from rlcard.games.keezen.cardop import CardOpRun, CardOpSplitTwoMarbles, CardOpStart
@@ -92,19 +91,20 @@ class RuleBasedMoveEvaluator:
                 eval_result_hit = self.evaluate_marble_position(mm_hit.marble, move, game_state)
                 evaluation_result_before_move.add(eval_result_hit)
 
-            # Move the marble(s)
-            c_game_state = copy(game_state)
-            _ = BoardState.put_marble_on_field(marble_move.marble, marble_move.to_field,
-                                               c_game_state.fields_with_marbles)
+            # Move the marble(s), undone after the evaluation
+            marble_puts = []
+            _ = BoardState.put_marble_on_field_with_undo(marble_move.marble, marble_move.to_field,
+                                                         game_state.fields_with_marbles, marble_puts)
             for hit_marble_move in marble_move.hit_marble_moves:
-                _ = BoardState.put_marble_on_field(hit_marble_move.marble, hit_marble_move.to_field,
-                                                   c_game_state.fields_with_marbles)
+                _ = BoardState.put_marble_on_field_with_undo(hit_marble_move.marble, hit_marble_move.to_field,
+                                                             game_state.fields_with_marbles, marble_puts)
 
             # Evaluate new position
-            evaluation_result_after_move = self.evaluate_marble_position(marble_move.marble, move, c_game_state)
+            evaluation_result_after_move = self.evaluate_marble_position(marble_move.marble, move, game_state)
             for mm_hit in marble_move.hit_marble_moves:
-                eval_result_hit = self.evaluate_marble_position(mm_hit.marble, move, c_game_state)
+                eval_result_hit = self.evaluate_marble_position(mm_hit.marble, move, game_state)
                 evaluation_result_before_move.add(eval_result_hit)
+            BoardState.undo_marble_puts(marble_puts, game_state.fields_with_marbles)
             # Subtract to get marble move result
             evaluation_result_after_move.subtract(evaluation_result_before_move)
 
@@ -375,6 +375,8 @@ class EvaluationResult:
 
 class RuleBasedAgentAdapter:
 
+    state_fields = ['allowed_moves', 'game_state']  # The env builds only these fields of the states
+
     def __init__(self, rule_based_agent: RuleBasedAgent):
         self.rule_based_agent = rule_based_agent
 
@@ -18,6 +18,12 @@ class FieldType:
     WAIT = "WAIT"
 
 
+class StepRule:
+    ALLOWED = "ALLOWED"
+    NOT_ALLOWED = "NOT_ALLOWED"
+    CHECK_BLOCKER = "CHECK_BLOCKER"  # Allowed if there is no marble of the field color on the field
+
+
 class Board:
     """The board contains fields and marbles."""
 
@@ -31,8 +37,10 @@ class Board:
         self.startFields = []
         self.homeFields = []
         self.marbles = []
+        self.marbles_with_color = {}  # Color --> [Marble], filled by create_marbles
         self.create_fields(players)
         self.create_marbles(players, 4)
+        self.compile_paths(players)
 
     def create_fields(self, players):
         field_id = 0
@@ -90,10 +98,11 @@ class Board:
             for i in range(0, number_of_marbles_per_player):  # 0..< numberOfMarblesPerPlayer:
                 marble = Marble(marble_id, player.player_color, str(i))  # player.location + str(i))
                 self.marbles.append(marble)
+                self.marbles_with_color.setdefault(player.player_color, []).append(marble)
                 marble_id += 1
 
     def get_marbles_with_color(self, color) -> []:
-        return [marble for marble in self.marbles if marble.color_ == color]
+        return list(self.marbles_with_color.get(color, []))
 
     def get_start_field_with_color(self, color):
         return [field for field in self.startFields if field.color_ == color][0]
@@ -109,16 +118,20 @@ class Board:
         return None
 
     def get_marbles_at_home(self, marble_color, fields_with_marbles) -> []:
-        return [marble for marble in self.marbles if marble.color_ == marble_color
-                and BoardState.get_field_for_marble(marble, fields_with_marbles).type_ == FieldType.HOME]
+        return [marble for marble in self.marbles_with_color.get(marble_color, [])
+                if BoardState.get_field_for_marble(marble, fields_with_marbles).type_ == FieldType.HOME]
 
     def get_marbles_at_wait(self, marble_color, fields_with_marbles) -> []:  # [Marble]:
-        return [marble for marble in self.marbles if marble.color_ == marble_color
-                and BoardState.get_field_for_marble(marble, fields_with_marbles).type_ == FieldType.WAIT]
+        return [marble for marble in self.marbles_with_color.get(marble_color, [])
+                if BoardState.get_field_for_marble(marble, fields_with_marbles).type_ == FieldType.WAIT]
+
+    def get_home_count(self, marble_color, fields_with_marbles) -> int:
+        if isinstance(fields_with_marbles, FieldsWithMarbles):
+            return fields_with_marbles.home_counts.get(marble_color, 0)
+        return len(self.get_marbles_at_home(marble_color, fields_with_marbles))  # Plain dict: no home counts
 
     def is_color_finished(self, color, fields_with_marbles, rules) -> bool:
-        home_marbles = self.get_marbles_at_home(color, fields_with_marbles)
-        return len(home_marbles) == rules.finish_marble_nrs  # Was 4, smaller to shorten game
+        return self.get_home_count(color, fields_with_marbles) == rules.finish_marble_nrs  # Was 4, smaller to shorten game
 
     def get_waiting_marble(self, color, fields_with_marbles):  # -> Marble:
         marbles_at_wait = self.get_marbles_at_wait(color, fields_with_marbles)
@@ -134,7 +147,28 @@ class Board:
 
     @staticmethod
     def get_path_for_color(marble_color, current_field, run_fields: int, fields_with_marbles, get_shorter_path=False):
-        """Returns a path for a marble if it exists. Assumed is that for Keezen there is max 1 path."""
+        """Returns a path for a marble if it exists. Assumed is that for Keezen there is max 1 path.
+        Uses the path compiled by compile_paths if available, otherwise walks the fields."""
+        compiled_path = current_field.paths.get((marble_color, run_fields))
+        if compiled_path is None:
+            return Board._walk_path_for_color(marble_color, current_field, run_fields, fields_with_marbles,
+                                              get_shorter_path)
+        path, blocker_indexes = compiled_path
+        if fields_with_marbles is not None:
+            for index in blocker_indexes:
+                field = path[index]
+                marble_on_field = fields_with_marbles.get(field)
+                if marble_on_field is not None and marble_on_field.color_ == field.color_:
+                    path = path[:index]  # Blocked: the marble can not pass this START or HOME field
+                    break
+        if get_shorter_path or len(path) == abs(run_fields):
+            return list(path)
+        return []
+
+    @staticmethod
+    def _walk_path_for_color(marble_color, current_field, run_fields: int, fields_with_marbles,
+                             get_shorter_path=False):
+        """Returns a path for a marble by walking the next or previous fields step by step."""
         path: List[Field] = []
         for step in range(abs(run_fields)):
             next_fields = current_field.next_fields
@@ -151,27 +185,73 @@ class Board:
             return path
         return []
 
+    def compile_paths(self, players, run_fields_range=range(-4, 13)):
+        """Compiles for each color, field and run length the path without other marbles on the board. The indexes
+        in the path of START and HOME fields that might be blocked by a marble are stored with the path.
+        A path is not compiled if a blocked field would lead to another route; those are walked at runtime."""
+        for field in self.fields:
+            field.paths.clear()
+            for player in players:
+                for run_fields in run_fields_range:
+                    if run_fields == 0:
+                        continue
+                    compiled_path = Board._compile_path(player.player_color, field, run_fields)
+                    if compiled_path is not None:
+                        field.paths[(player.player_color, run_fields)] = compiled_path
+
+    @staticmethod
+    def _compile_path(marble_color, current_field, run_fields: int):
+        """Walks the fields like _walk_path_for_color, but records the blocker checks instead of doing them."""
+        backwards = run_fields < 0
+        path = []
+        blocker_indexes = []
+        for step in range(abs(run_fields)):
+            next_fields = current_field.previous_fields if backwards else current_field.next_fields
+            step_rules = [Board.get_step_rule(marble_color, current_field, next_field, backwards)
+                          for next_field in next_fields]
+            allowed = [i for i, step_rule in enumerate(step_rules) if step_rule != StepRule.NOT_ALLOWED]
+            if not allowed:
+                break
+            if step_rules[allowed[0]] == StepRule.CHECK_BLOCKER:
+                if len(allowed) > 1:
+                    return None  # A blocking marble would lead to another next field
+                blocker_indexes.append(len(path))
+            current_field = next_fields[allowed[0]]
+            path.append(current_field)
+        return tuple(path), tuple(blocker_indexes)
+
     @staticmethod
     def is_next_field_allowed(marble_color, current_field, next_field, fields_with_marbles, backwards) -> bool:
+        step_rule = Board.get_step_rule(marble_color, current_field, next_field, backwards)
+        if step_rule == StepRule.CHECK_BLOCKER:
+            # Check if there is a blocking marble
+            if fields_with_marbles is not None:
+                marble_on_field = BoardState.get_marble_for_field_opt(next_field, fields_with_marbles)
+                if marble_on_field is not None and marble_on_field.color_ == next_field.color_:
+                    return False
+            return True
+        return step_rule == StepRule.ALLOWED
+
+    @staticmethod
+    def get_step_rule(marble_color, current_field, next_field, backwards) -> str:
+        """Returns if a step to the next field is allowed, not allowed or depends on a blocking marble."""
         if backwards and next_field not in current_field.previous_fields:
-            return False  # Field has to be in previous fields if moving backward
+            return StepRule.NOT_ALLOWED  # Field has to be in previous fields if moving backward
         elif not backwards and next_field not in current_field.next_fields:
-            return False  # Field has to be in next fields if moving forward
+            return StepRule.NOT_ALLOWED  # Field has to be in next fields if moving forward
         elif next_field.type_ == FieldType.HOME and next_field.color_ != marble_color:
-            return False  # It is a home field of other player
+            return StepRule.NOT_ALLOWED  # It is a home field of other player
         elif backwards and current_field.type_ == FieldType.HOME:
-            return False  # Marble is on home field: backwards not allowed
+            return StepRule.NOT_ALLOWED  # Marble is on home field: backwards not allowed
         elif backwards and next_field.type_ == FieldType.START and next_field.color_ == marble_color:
-            return Board.startFieldPassingBackwards  # Run backwards via start?
+            # Run backwards via start?
+            return StepRule.ALLOWED if Board.startFieldPassingBackwards else StepRule.NOT_ALLOWED
         elif not backwards and next_field.type_ == FieldType.START and next_field.color_ == marble_color:
-            return Board.startFieldPassingForwards  # Run forwards via start?
+            # Run forwards via start?
+            return StepRule.ALLOWED if Board.startFieldPassingForwards else StepRule.NOT_ALLOWED
         elif next_field.type_ == FieldType.START or next_field.type_ == FieldType.HOME:
-            # Check if there is a blocking marble
-            if fields_with_marbles is not None:
-                marble_on_field = BoardState.get_marble_for_field_opt(next_field, fields_with_marbles)
-                if marble_on_field is not None and marble_on_field.color_ == next_field.color_:
-                    return False
-        return True
+            return StepRule.CHECK_BLOCKER
+        return StepRule.ALLOWED
 
 
 class Field:
@@ -183,6 +263,7 @@ class Field:
         self.color_ = color_
         self.next_fields = []
         self.previous_fields = []
+        self.paths = {}  # (color, run_fields) --> (path, blocker_indexes), filled by Board.compile_paths
 
     def __str__(self):
         return "Field[{0}], type: {1}, color: {2}.".format(self.id_, self.type_, self.color_)
@@ -208,6 +289,167 @@ class Marble:
         return self.color_[0]
 
 
+class FieldsWithMarbles(dict):
+    """Dict of Field --> Marble that also keeps the reverse index Marble --> Field up to date.
+    Used as the fields_with_marbles of a game state, so a marble position lookup does not scan the board.
+    The number of marbles at the home fields per marble color is kept up to date as well (home_counts)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if len(args) == 1 and not kwargs and isinstance(args[0], FieldsWithMarbles):  # Copy: no rebuild
+            self.marbles_with_fields = dict(args[0].marbles_with_fields)
+            self.home_counts = dict(args[0].home_counts)
+            return
+        self.marbles_with_fields = {marble: field for field, marble in self.items()}
+        self.home_counts = {}  # Marble color --> number of marbles at home fields
+        for marble, field in self.marbles_with_fields.items():
+            if field.type_ == FieldType.HOME:
+                self.home_counts[marble.color_] = self.home_counts.get(marble.color_, 0) + 1
+
+    def __setitem__(self, field, marble):
+        replaced_marble = self.get(field)
+        if replaced_marble is not None and self.marbles_with_fields.get(replaced_marble) is field:
+            del self.marbles_with_fields[replaced_marble]
+            if field.type_ == FieldType.HOME:
+                self.home_counts[replaced_marble.color_] -= 1
+        super().__setitem__(field, marble)
+        from_field = self.marbles_with_fields.get(marble)
+        if from_field is not None and from_field.type_ == FieldType.HOME:
+            self.home_counts[marble.color_] -= 1
+        self.marbles_with_fields[marble] = field
+        if field.type_ == FieldType.HOME:
+            self.home_counts[marble.color_] = self.home_counts.get(marble.color_, 0) + 1
+
+    def __delitem__(self, field):
+        marble = self[field]
+        super().__delitem__(field)
+        if self.marbles_with_fields.get(marble) is field:
+            del self.marbles_with_fields[marble]
+            if field.type_ == FieldType.HOME:
+                self.home_counts[marble.color_] -= 1
+
+    def __reduce__(self):
+        return self.__class__, (dict(self),)
+
+    def pop(self, field, *default):
+        if field in self:
+            marble = self[field]
+            del self[field]
+            return marble
+        return super().pop(field, *default)
+
+    def clear(self):
+        super().clear()
+        self.marbles_with_fields.clear()
+        self.home_counts.clear()
+
+    def update(self, *args, **kwargs):
+        for field, marble in dict(*args, **kwargs).items():
+            self[field] = marble
+
+    def copy(self):
+        return FieldsWithMarbles(self)
+
+
+class BoardPlanes:
+    """Layout of the observation planes of a board: a row per player (color) plus a row with all marbles, a column
+    for the active player followed by a column per field in FIELDID_STATEINDEX_MAP order."""
+
+    def __init__(self, board, players):
+        color_rows = {player.player_color: row for row, player in enumerate(players)}
+        self.player_rows = {player: row for row, player in enumerate(players)}
+        self.marble_rows = [color_rows[marble.color_] for marble in board.marbles]  # Marble id --> row
+        self.all_marbles_row = len(players)
+        self.field_columns = [BoardState.FIELDID_STATEINDEX_MAP[field.id_] + 1 for field in board.fields]  # Field id
+        self.shape = (len(players) + 1, len(board.fields) + 1)
+        self.marble_count = len(board.marbles)
+
+
+class ArrayFieldsWithMarbles(FieldsWithMarbles):
+    """FieldsWithMarbles that also keeps the marble positions (marble id --> field id, -1 if not on a field) and the
+    observation planes as NumPy int8 arrays, updated in place on every change. Column 0 of the planes is the active
+    player column, set by the game state. A view returned by get_observation is never changed: the planes are copied
+    before the next change (copy on write)."""
+
+    def __init__(self, board_planes, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.board_planes = board_planes
+        self.marble_positions = np.full(board_planes.marble_count, -1, dtype=np.int8)
+        self.observation = np.zeros(board_planes.shape, dtype=np.int8)
+        self.active_row = None
+        self._observation_exported = False
+        for field, marble in self.items():
+            self._put_on_planes(marble, field)
+
+    def __setitem__(self, field, marble):
+        replaced_marble = self.get(field)
+        super().__setitem__(field, marble)
+        if replaced_marble is not None:
+            self._remove_from_planes(replaced_marble, field)
+        self._put_on_planes(marble, field)
+
+    def __delitem__(self, field):
+        marble = self[field]
+        super().__delitem__(field)
+        self._remove_from_planes(marble, field)
+        self._get_writable_observation()[self.board_planes.all_marbles_row, self.board_planes.field_columns[field.id_]] = 0
+
+    def __reduce__(self):
+        return self.__class__, (self.board_planes, dict(self)), {'observation': self.observation.copy(),
+                                                                 'active_row': self.active_row}
+
+    def clear(self):
+        super().clear()
+        self.marble_positions.fill(-1)
+        self._get_writable_observation()[:, 1:] = 0
+
+    def copy(self):
+        new_one = ArrayFieldsWithMarbles.__new__(ArrayFieldsWithMarbles)
+        dict.update(new_one, self)
+        new_one.marbles_with_fields = dict(self.marbles_with_fields)
+        new_one.home_counts = dict(self.home_counts)
+        new_one.board_planes = self.board_planes
+        new_one.marble_positions = self.marble_positions.copy()
+        new_one.observation = self.observation.copy()
+        new_one.active_row = self.active_row
+        new_one._observation_exported = False
+        return new_one
+
+    def set_active_row(self, row):
+        if row != self.active_row:
+            observation = self._get_writable_observation()
+            if self.active_row is not None:
+                observation[self.active_row, 0] = 0
+            observation[row, 0] = 1
+            self.active_row = row
+
+    def get_observation(self):
+        """Returns a read-only view on the observation planes."""
+        self._observation_exported = True
+        observation = self.observation.view()
+        observation.flags.writeable = False
+        return observation
+
+    def _get_writable_observation(self):
+        if self._observation_exported:
+            self.observation = self.observation.copy()
+            self._observation_exported = False
+        return self.observation
+
+    def _put_on_planes(self, marble, field):
+        column = self.board_planes.field_columns[field.id_]
+        observation = self._get_writable_observation()
+        observation[self.board_planes.marble_rows[marble.id_], column] = 1
+        observation[self.board_planes.all_marbles_row, column] = 1
+        self.marble_positions[marble.id_] = field.id_
+
+    def _remove_from_planes(self, marble, field):
+        self._get_writable_observation()[self.board_planes.marble_rows[marble.id_],
+                                         self.board_planes.field_columns[field.id_]] = 0
+        if self.marble_positions[marble.id_] == field.id_:
+            self.marble_positions[marble.id_] = -1
+
+
 class BoardState:
     """Manages the positions of marbles on fields. Helper class, does not hold any state."""
     FIELDID_STATEINDEX_MAP = {5: 0, 6: 1, 7: 2, 8: 3, 9: 4, 10: 5, 11: 6, 12: 7, 13: 8, 14: 9, 15: 10, 16: 11, 17: 12,
@@ -240,7 +482,7 @@ class BoardState:
     @staticmethod
     def get_initial_board_state(marbles, wait_fields) -> {}:
         """Returns the board state with all marbles on the wait fields."""
-        fields_with_marbles = dict()
+        fields_with_marbles = FieldsWithMarbles()
         copy_fields = wait_fields.copy()
         for marble in marbles:
             field = next(copy_field for copy_field in copy_fields if copy_field.color_ == marble.color_)
@@ -250,10 +492,11 @@ class BoardState:
 
     @staticmethod
     def get_field_for_marble(marble: Marble, fields_with_marbles) -> Field:
-        for key_field, value_marble in fields_with_marbles.items():
+        if isinstance(fields_with_marbles, FieldsWithMarbles):
+            return fields_with_marbles.marbles_with_fields.get(marble)
+        for key_field, value_marble in fields_with_marbles.items():  # Plain dict: no reverse index
             if value_marble == marble:
                 return key_field
-        # return self.marbles_with_fields[marble]
 
     @staticmethod
     def get_marble_for_field(field: Field, fields_with_marbles) -> Marble:
@@ -261,9 +504,7 @@ class BoardState:
 
     @staticmethod
     def get_marble_for_field_opt(field: Field, fields_with_marbles):
-        if field in fields_with_marbles.keys():
-            return fields_with_marbles[field]
-        return None
+        return fields_with_marbles.get(field)
 
     @staticmethod
     def put_marble_on_field(marble, field, fields_with_marbles):  # -> Optional[Marble]:
@@ -278,6 +519,30 @@ class BoardState:
             return already_marble_on_field
         return None
 
+    @staticmethod
+    def put_marble_on_field_with_undo(marble, field, fields_with_marbles, marble_puts):
+        """Same as put_marble_on_field, but appends (marble, from field, to field, hit marble) to marble_puts so
+        undo_marble_puts can revert it."""
+        from_field = BoardState.get_field_for_marble(marble, fields_with_marbles)
+        if field == from_field:
+            return None
+        already_marble_on_field = BoardState.get_marble_for_field_opt(field, fields_with_marbles)
+        marble_puts.append((marble, from_field, field, already_marble_on_field))
+        if from_field:
+            del fields_with_marbles[from_field]
+        fields_with_marbles[field] = marble
+        return already_marble_on_field
+
+    @staticmethod
+    def undo_marble_puts(marble_puts, fields_with_marbles):
+        """Reverts the marble puts of put_marble_on_field_with_undo, last put first."""
+        for marble, from_field, to_field, hit_marble in reversed(marble_puts):
+            del fields_with_marbles[to_field]
+            if hit_marble is not None:
+                fields_with_marbles[to_field] = hit_marble
+            if from_field is not None:
+                fields_with_marbles[from_field] = marble
+
     @staticmethod
     def reset(board, fields_with_marbles):
         """Put all marbles on WAIT fields."""
@@ -19,17 +19,17 @@ class CardState:
     """Helps to manage the positions of all cards."""
 
     @staticmethod
-    def get_initial_card_state(cards: [Card], players):
+    def get_initial_card_state(cards: [Card], players, random_buffer=None):
         stock_cards: [Card] = cards.copy()
         player_cards: {Player: [Card]} = {}
         for player in players:
             player_cards[player] = []
         played_cards: [Card] = []
-        shuffle(stock_cards)
+        CardState.shuffle(stock_cards, random_buffer)
         return stock_cards, player_cards, played_cards
 
     @staticmethod
-    def reset(stock_cards, player_cards, played_cards):
+    def reset(stock_cards, player_cards, played_cards, card_locations=None, random_buffer=None):
         """Resets the stock and shuffles."""
         stock_cards.extend(played_cards)
         played_cards.clear()
@@ -37,19 +37,34 @@ class CardState:
             cards = player_cards[player]
             stock_cards.extend(cards)
             player_cards[player] = []
-        shuffle(stock_cards)
+        CardState.shuffle(stock_cards, random_buffer)
+        if card_locations is not None:
+            card_locations.reset()
 
     @staticmethod
-    def deal_card(player, stock_cards, player_cards) -> Card:
+    def shuffle(stock_cards, random_buffer=None):
+        """Shuffles with the RandomBuffer of the game, or with the random module if there is none."""
+        if random_buffer is not None:
+            random_buffer.shuffle(stock_cards)
+        else:
+            shuffle(stock_cards)
+
+    @staticmethod
+    def deal_card(player, stock_cards, player_cards, card_locations=None) -> Card:
         """Deal a card to a player."""
         card: Card = stock_cards.pop()
         player_cards[player].append(card)
+        if card_locations is not None:
+            card_locations.move_card(card, card_locations.player_rows[player])
         return card
 
     @staticmethod
-    def play_cards(player, cards, player_cards, played_cards):
+    def play_cards(player, cards, player_cards, played_cards, card_locations=None):
         """Play multiple cards (throw all)."""
         played_cards.extend(cards)
+        if card_locations is not None:
+            for card in cards:
+                card_locations.move_card(card, CardLocations.PLAYED)
         if len(cards) == 1:
             player_cards[player].remove(cards[0])
         else:
@@ -75,18 +90,82 @@ class CardState:
 
     @staticmethod
     def get_card_state_as_matrix(cards: [Card]):
-        """Returns the cards in a 5x13 matrix."""
-        indices = [0]*13
-        for card in cards:
-            card_index = card.card_value.value - 1
-            indices[card_index] = indices[card_index] + 1
+        """Returns the cards in a 5x13 matrix: a column per card value, a 1 in the row of the number of cards with that
+        value (0-4)."""
+        histogram = np.bincount([card.card_value.value - 1 for card in cards], minlength=13)
         card_state = np.zeros((5, 13), dtype=int)
-        for i, index in enumerate(indices):
-            if index == 1:
-                card_state[index][i] = 1
+        card_state[histogram, np.arange(13)] = 1
         return card_state
 
 
+class CardLocations:
+    """The location of each card in an int8 array (card id --> location): the player row for a card in a hand, STOCK
+    or PLAYED. The number of cards at each location is kept as well, so moving a card and the hand counts are O(1).
+    The order of the stock and the hands is kept by the card lists of the game state."""
+
+    STOCK = 4
+    PLAYED = 5
+
+    def __init__(self, player_rows, stock_cards=(), player_cards=None, played_cards=()):
+        self.player_rows = player_rows  # Player --> row, like BoardPlanes.player_rows
+        cards = sorted(list(stock_cards) + list(played_cards) +
+                       [card for cards in (player_cards or {}).values() for card in cards], key=lambda card: card.id_)
+        self.card_values = np.array([card.card_value.value - 1 for card in cards], dtype=np.int8)  # Card id --> 0-12
+        self.locations = np.full(len(cards), CardLocations.STOCK, dtype=np.int8)
+        self.counts = [0] * (CardLocations.PLAYED + 1)  # Location --> number of cards
+        self.counts[CardLocations.STOCK] = len(cards)
+        self.set_cards(stock_cards, player_cards or {}, played_cards)
+
+    def copy(self):
+        new_one = CardLocations.__new__(CardLocations)
+        new_one.player_rows = self.player_rows
+        new_one.card_values = self.card_values
+        new_one.locations = self.locations.copy()
+        new_one.counts = list(self.counts)
+        return new_one
+
+    def reset(self):
+        """All cards back in the stock."""
+        self.locations[:] = CardLocations.STOCK
+        self.counts = [0] * len(self.counts)
+        self.counts[CardLocations.STOCK] = len(self.locations)
+
+    def set_cards(self, stock_cards, player_cards, played_cards):
+        self.reset()
+        for card in played_cards:
+            self.move_card(card, CardLocations.PLAYED)
+        for player, cards in player_cards.items():
+            for card in cards:
+                self.move_card(card, self.player_rows[player])
+
+    def move_card(self, card, location):
+        self.counts[self.locations[card.id_]] -= 1
+        self.counts[location] += 1
+        self.locations[card.id_] = location
+
+    def get_count(self, location) -> int:
+        return self.counts[location]
+
+    def get_hand_count(self, player) -> int:
+        return self.counts[self.player_rows[player]]
+
+    def get_hands_count(self) -> int:
+        """Number of cards in all hands."""
+        return len(self.locations) - self.counts[CardLocations.STOCK] - self.counts[CardLocations.PLAYED]
+
+    def get_value_histogram(self, location):
+        """Number of cards of each card value (ACE first) at the location."""
+        return np.bincount(self.card_values[self.locations == location], minlength=13)
+
+    def get_card_planes(self, player):
+        """The hand of the player and the played cards as 5x13 planes, like CardState.get_card_state_as_matrix."""
+        planes = np.zeros((5, 26), dtype=np.int8)
+        columns = np.arange(13)
+        planes[self.get_value_histogram(self.player_rows[player]), columns] = 1
+        planes[self.get_value_histogram(CardLocations.PLAYED), columns + 13] = 1
+        return planes
+
+
 class Suit(Enum):
     DIAMONDS = 0
     HEARTS = 1
@@ -165,8 +165,8 @@ class CardOpSplitTwoMarbles:
             # Check if player will finish his last marble to continue with teammate marbles
             if player.player_color == plays_with_color:
                 # if player.get_team_mate().player_color == player.get_team_mate().plays_with_color:
-                home_marbles = self.board.get_marbles_at_home(plays_with_color, fields_with_marbles)
-                if len(home_marbles) == 3:
+                if self.board.get_home_count(plays_with_color, fields_with_marbles) == 3:
+                    home_marbles = self.board.get_marbles_at_home(plays_with_color, fields_with_marbles)
                     path_length = 0
                     for home_marble in home_marbles:
                         path_length += len(self.board.get_path_for_marble(home_marble, 3, fields_with_marbles, True))
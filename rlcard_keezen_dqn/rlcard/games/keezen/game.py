@@ -1,9 +1,12 @@
 from copy import copy
 
-from rlcard.games.keezen.card import CardState, Suit, CardValue
-from rlcard.games.keezen.board import BoardState, FieldType
+from rlcard.games.keezen.card import CardState, CardLocations, Suit, CardValue
+from rlcard.games.keezen.board import Board, BoardState, FieldType, FieldsWithMarbles, BoardPlanes, \
+    ArrayFieldsWithMarbles
 from rlcard.games.keezen.move import Move, MoveType
-from rlcard.games.keezen.player import Player
+from rlcard.games.keezen.player import Player, Team
+from rlcard.games.keezen.rules import Rules
+from rlcard.utils import seeding
 
 from colorama import Fore, Style
 
@@ -15,24 +18,69 @@ class Game:
     GAME_STATE_COLUMNS = 97  #123  # 97 # 123  # 123
     GAME_STATE_ROWS = 5
     allow_step_back = False
+    history_snapshot_interval = 0  # With step back: store a full game state every N moves as well, 0 for none
+    array_game_state = False  # Use ArrayGameState, with marble positions and observation planes as NumPy arrays
 
     def __init__(self, rules, players, board):
         self.rules = rules
         self.players = players
         self.board = board
+        self.board_planes = BoardPlanes(board, players)
         self.cards = self.rules.initialize_cards()
         self.card_ops = self.rules.initialize_card_ops(self.cards, board)
-        self.game_history = []
+        self.game_history = []  # UndoToken for each step, used by step_back
+        self.history_snapshots = {}  # Number of steps --> copy of the game state after these steps
+        self.history_game_state = None  # The last game state returned by init_game, step or step_back
         self.legal_moves = {}  # Maps action_index -> move
+        self.np_random = None
         # self.temp_rewards = [0, 0, 0, 0]
 
+    @property
+    def spec(self):
+        """The game type and the name, color, location and team name of each player: enough to create a game with the
+        same players, board and cards (see from_spec). Pickled game states carry the spec of their game."""
+        return self.rules.game_type, tuple((player.name, player.player_color, player.location,
+                                            player.team.name if player.team is not None else None)
+                                           for player in self.players)
+
+    @classmethod
+    def from_spec(cls, spec):
+        """Creates a game with the rules and players of the spec, see spec."""
+        game_type, player_specs = spec
+        players = [Player(name, player_color, location) for name, player_color, location, _ in player_specs]
+        team_names = [team_name for _, _, _, team_name in player_specs]
+        for team_name in dict.fromkeys(team_names):
+            if team_name is not None:
+                Team(team_name, [player for player, name in zip(players, team_names) if name == team_name])
+        return cls(Rules(game_type), players, Board(players))
+
+    @property
+    def np_random(self):
+        return self._np_random
+
+    @np_random.setter
+    def np_random(self, np_random):
+        """The RandomState of the game (see Env._seed) for the shuffles, None to use the random module."""
+        self._np_random = np_random
+        self.random_buffer = seeding.RandomBuffer(np_random) if np_random is not None else None
+
     def init_game(self):
         """Initializes the game. All marbles at wait fields, cards in stock."""
         self.game_history.clear()
+        self.history_snapshots.clear()
         # self.temp_rewards = [0, 0, 0, 0]
+        game_state = self._new_game_state()
+        if self.allow_step_back:
+            self._add_history(None, game_state)
+        # game_state_dict = game_state.get_state_for_player(move_player)
+        return game_state, self.players.index(game_state.move_player)
+
+    def _new_game_state(self):
+        """The game state at the start of a game, with the cards of the first round dealt."""
         round_number = 0
         move_number = 0
-        stock_cards, player_cards, played_cards = CardState.get_initial_card_state(self.cards, self.players)
+        stock_cards, player_cards, played_cards = CardState.get_initial_card_state(self.cards, self.players,
+                                                                                   self.random_buffer)
         fields_with_marbles = BoardState.get_initial_board_state(self.board.marbles, self.board.waitFields)
         players_play_with_color = {}
         for player in self.players:
@@ -40,12 +88,15 @@ class Game:
         deal_player = self.players[self.rules.player_start]
         move_player = deal_player.get_next_player(self.players)
         self._deal_cards(deal_player, stock_cards, player_cards, round_number)
-        game_state = GameState(fields_with_marbles, stock_cards, player_cards, played_cards,
-                               players_play_with_color, deal_player, move_player, round_number, move_number)
-        if self.allow_step_back:
-            self.game_history.append(game_state)
-        # game_state_dict = game_state.get_state_for_player(move_player)
-        return game_state, self.players.index(move_player)
+        if self.array_game_state:
+            game_state = ArrayGameState(self.board_planes, fields_with_marbles, stock_cards, player_cards,
+                                        played_cards, players_play_with_color, deal_player, move_player, round_number,
+                                        move_number)
+        else:
+            game_state = GameState(fields_with_marbles, stock_cards, player_cards, played_cards,
+                                   players_play_with_color, deal_player, move_player, round_number, move_number)
+        game_state.game = self
+        return game_state
 
     # def render(self, game_state):
     #     for player in self.players:
@@ -158,18 +209,96 @@ class Game:
 
     def step(self, move, game_state) -> ():  # GamePosition, reward, done, info: [String: String]):
         rewards = None
+        undo_token = UndoToken(move, game_state) if self.allow_step_back else None
+        self._play_move(move, game_state, undo_token)
+        done, end_rewards = self.is_over(game_state)
+
+        rewards = [0, 0, 0, 0]  # self.temp_rewards
+        if done:
+            rewards = end_rewards
+            # Combine temporary rewards with end rewards
+            # for idx, end_reward in enumerate(end_rewards):
+            #     rewards[idx] = rewards[idx] + end_reward
+        # else:  # Changed: change move_player when not finished
+        self._set_next_move_player(move, game_state)
+
+        copy_game_state = copy(game_state)
+        copy_game_state.last_move = move  # Used for incremental updates, like the observation encoder of KeezenEnv
+        if self.allow_step_back:
+            self._add_history(undo_token, copy_game_state)
+
+        return copy_game_state, rewards, done
+
+    def play(self, move, game_state) -> ():
+        """Does a move on the game state in place, like step but without copy, history and undo token.
+        Returns the done flag and the rewards (None if not done)."""
+        self._play_move(move, game_state)
+        done, rewards = self.is_over(game_state)
+        self._set_next_move_player(move, game_state)
+        return done, rewards
+
+    def apply_move(self, game_state, move):  # -> UndoToken
+        """Does a move on the game state in place, like step but without copying the game state.
+        Returns the undo token for undo. The token has the done flag and rewards of the move as well."""
+        undo_token = UndoToken(move, game_state)
+        self._play_move(move, game_state, undo_token)
+        undo_token.done, undo_token.rewards = self.is_over(game_state)
+        self._set_next_move_player(move, game_state)
+        game_state.last_move = move
+        return undo_token
+
+    def undo(self, game_state, undo_token):
+        """Reverts apply_move: the game state is exactly the same as before the move."""
+        move = undo_token.move
+        BoardState.undo_marble_puts(undo_token.marble_puts, game_state.fields_with_marbles)
+        if undo_token.switched_color is not None:
+            game_state.players_play_with_color[undo_token.move_player] = undo_token.switched_color
+        if move and move.move_type == MoveType.DEAL:
+            if undo_token.card_state is not None:
+                stock_cards, played_cards, player_cards = undo_token.card_state
+                game_state.stock_cards[:] = stock_cards
+                game_state.played_cards[:] = played_cards
+                game_state.player_cards.update(player_cards)
+                if game_state.card_locations is not None:
+                    game_state.card_locations.set_cards(stock_cards, player_cards, played_cards)
+            else:
+                self._undeal_cards(game_state.deal_player, game_state.stock_cards, game_state.player_cards,
+                                   game_state.round_number, game_state.card_locations)
+        elif move:
+            hand = game_state.player_cards[move.player]
+            cards = game_state.played_cards[-undo_token.played_card_count:]
+            if undo_token.card_index is not None:
+                hand.insert(undo_token.card_index, cards[0])
+            else:
+                hand.extend(cards)
+            del game_state.played_cards[-undo_token.played_card_count:]
+            if game_state.card_locations is not None:
+                for card in cards:
+                    game_state.card_locations.move_card(card, game_state.card_locations.player_rows[move.player])
+        game_state.deal_player = undo_token.deal_player
+        game_state.move_player = undo_token.move_player
+        game_state.round_number = undo_token.round_number
+        game_state.move_number = undo_token.move_number
+        game_state.last_move = undo_token.last_move
+
+    def _play_move(self, move, game_state, undo_token=None):
+        """Plays the cards and moves the marbles of a move, or deals. Records the changes in the undo token if given."""
         if move:
             if move.move_type == MoveType.DEAL:
                 if not Game._is_round_over(game_state):
                     raise ValueError("Cannot deal when round is not finished.")
                 game_state.round_number += 1
                 if not game_state.stock_cards:
-                    CardState.reset(game_state.stock_cards, game_state.player_cards, game_state.played_cards)
+                    if undo_token is not None:
+                        undo_token.card_state = (list(game_state.stock_cards), list(game_state.played_cards),
+                                                 dict(game_state.player_cards))
+                    CardState.reset(game_state.stock_cards, game_state.player_cards, game_state.played_cards,
+                                    game_state.card_locations, self.random_buffer)
                     game_state.deal_player = game_state.deal_player.get_next_player(self.players)
                 elif self.rules.rotate_dealer_each_round:
                     game_state.deal_player = game_state.deal_player.get_next_player(self.players)
                 self._deal_cards(game_state.deal_player, game_state.stock_cards, game_state.player_cards,
-                                 game_state.round_number)
+                                 game_state.round_number, game_state.card_locations)
             else:
                 # If move is a -4 from own start add a reward
                 # if move.move_type == MoveType.RUN and move.cards[0].card_value == CardValue.FOUR:
@@ -181,44 +310,46 @@ class Game:
                 #                 self.temp_rewards[idx] = self.temp_rewards[idx] + 1000
                 #                 print("4 BACKWARDS! temp_rewards: " + str(self.temp_rewards))
 
-                CardState.play_cards(move.player, move.cards, game_state.player_cards, game_state.played_cards)
+                if undo_token is not None:
+                    undo_token.played_card_count = len(move.cards)  # move.cards can be the hand of the player
+                    if len(move.cards) == 1:
+                        undo_token.card_index = game_state.player_cards[move.player].index(move.cards[0])
+                CardState.play_cards(move.player, move.cards, game_state.player_cards, game_state.played_cards,
+                                     game_state.card_locations)
                 for marble_move in move.marble_moves:
-                    _ = BoardState.put_marble_on_field(marble_move.marble, marble_move.to_field,
-                                                       game_state.fields_with_marbles)
+                    Game._put_marble_on_field(marble_move.marble, marble_move.to_field, game_state.fields_with_marbles,
+                                              undo_token)
                     for hit_marble_move in marble_move.hit_marble_moves:
-                        _ = BoardState.put_marble_on_field(hit_marble_move.marble, hit_marble_move.to_field,
-                                                           game_state.fields_with_marbles)
+                        Game._put_marble_on_field(hit_marble_move.marble, hit_marble_move.to_field,
+                                                  game_state.fields_with_marbles, undo_token)
                 if self.rules.switch_color and self.board.is_color_finished(game_state.move_player.player_color, game_state.fields_with_marbles, self.rules):
                     team_mate_color = game_state.move_player.get_team_mate().player_color
                     if (not self.board.is_color_finished(team_mate_color, game_state.fields_with_marbles, self.rules)) and \
                             game_state.move_player.player_color == game_state.move_player_plays_with_color():
                         # Switch color
+                        if undo_token is not None:
+                            undo_token.switched_color = game_state.move_player_plays_with_color()
                         game_state.players_play_with_color[game_state.move_player] = team_mate_color
                 game_state.move_number += 1
-        done, end_rewards = self.is_over(game_state)
 
-        rewards = [0, 0, 0, 0]  # self.temp_rewards
-        if done:
-            rewards = end_rewards
-            # Combine temporary rewards with end rewards
-            # for idx, end_reward in enumerate(end_rewards):
-            #     rewards[idx] = rewards[idx] + end_reward
-        # else:  # Changed: change move_player when not finished
+    def _set_next_move_player(self, move, game_state):
         if move and move.move_type == MoveType.DEAL:
             game_state.move_player = game_state.deal_player.get_next_player(self.players)
         else:
             game_state.move_player = game_state.move_player.get_next_player(self.players)
 
-        copy_game_state = copy(game_state)
-        if self.allow_step_back:
-            copy_game_state.last_move = move
-            self.game_history.append(copy_game_state)
-
-        return copy_game_state, rewards, done
+    @staticmethod
+    def _put_marble_on_field(marble, field, fields_with_marbles, undo_token):
+        if undo_token is not None:
+            _ = BoardState.put_marble_on_field_with_undo(marble, field, fields_with_marbles, undo_token.marble_puts)
+        else:
+            _ = BoardState.put_marble_on_field(marble, field, fields_with_marbles)
 
     @staticmethod
     def _is_round_over(game_state) -> bool:
         """Returns if the current round is over. All players have played their cards."""
+        if game_state.card_locations is not None:
+            return game_state.card_locations.get_hands_count() == 0
         all_players_card_count = sum([len(element) for element in game_state.player_cards.values()])
         return all_players_card_count == 0
 
@@ -274,21 +405,79 @@ class Game:
         return False, None
 
     def step_back(self):
-        """Returns and removes the last game_state from game history."""
-        if self.game_history:
-            prev_game_state = self.game_history.pop()
-            return prev_game_state
-        return None
+        """Returns the game state before the last step, or None if there is no step to go back to.
+        The last returned game state is changed back in place, a copy of it is returned."""
+        if not self.game_history:
+            return None
+        undo_token = self.game_history.pop()
+        self.history_snapshots.pop(len(self.game_history) + 1, None)
+        snapshot = self.history_snapshots.get(len(self.game_history))
+        if snapshot is not None:
+            self.history_game_state = Game._copy_game_state(snapshot)
+        else:
+            self.undo(self.history_game_state, undo_token)
+        copy_game_state = copy(self.history_game_state)
+        copy_game_state.last_move = self.history_game_state.last_move
+        return copy_game_state
+
+    def _add_history(self, undo_token, game_state):
+        """Adds the undo token of a step (None for the initial game state) and a snapshot every N steps."""
+        if undo_token is not None:
+            self.game_history.append(undo_token)
+        self.history_game_state = game_state
+        if self.history_snapshot_interval and len(self.game_history) % self.history_snapshot_interval == 0:
+            self.history_snapshots[len(self.game_history)] = Game._copy_game_state(game_state)
 
-    def _deal_cards(self, deal_player, stock_cards, player_cards, round_number):
+    @staticmethod
+    def _copy_game_state(game_state):
+        """Copy of the game state that does not share the card lists of the players."""
+        copy_game_state = copy(game_state)
+        copy_game_state.player_cards = {player: list(cards) for player, cards in game_state.player_cards.items()}
+        copy_game_state.last_move = game_state.last_move
+        return copy_game_state
+
+    def _deal_cards(self, deal_player, stock_cards, player_cards, round_number, card_locations=None):
         """Deals the cards for a new round."""
         number_of_cards = self.rules.cards_per_round[round_number % len(self.rules.cards_per_round)]
         player = deal_player.get_next_player(self.players)
         for _ in range(number_of_cards):
             for _ in range(len(self.players)):
-                _ = CardState.deal_card(player, stock_cards, player_cards)
+                _ = CardState.deal_card(player, stock_cards, player_cards, card_locations)
                 player = player.get_next_player(self.players)
 
+    def _undeal_cards(self, deal_player, stock_cards, player_cards, round_number, card_locations=None):
+        """Reverts _deal_cards: puts the dealt cards back on the stock, in the original order."""
+        number_of_cards = self.rules.cards_per_round[round_number % len(self.rules.cards_per_round)]
+        deal_order = []
+        player = deal_player.get_next_player(self.players)
+        for _ in range(len(self.players)):
+            deal_order.append(player)
+            player = player.get_next_player(self.players)
+        for _ in range(number_of_cards):
+            for player in reversed(deal_order):
+                stock_cards.append(player_cards[player].pop())
+                if card_locations is not None:
+                    card_locations.move_card(stock_cards[-1], CardLocations.STOCK)
+
+
+class UndoToken:
+    """The changes of Game.apply_move to a game state, used by Game.undo to revert them."""
+
+    def __init__(self, move, game_state):
+        self.move = move
+        self.move_player = game_state.move_player
+        self.deal_player = game_state.deal_player
+        self.round_number = game_state.round_number
+        self.move_number = game_state.move_number
+        self.last_move = game_state.last_move
+        self.marble_puts = []  # See BoardState.put_marble_on_field_with_undo
+        self.played_card_count = 0
+        self.card_index = None  # Index of the played card in the hand, if one card is played
+        self.switched_color = None  # Color the move player played with before switching
+        self.card_state = None  # (stock cards, played cards, player cards) before the stock was reset by a deal
+        self.done = False
+        self.rewards = None
+
 
 class GameState:
     """A GameState holds the state of a game. This means the marble positions, player cards, move player, the colors
@@ -296,7 +485,7 @@ class GameState:
 
     def __init__(self, fields_with_marbles, stock_cards, player_cards, played_cards, players_play_with_color,
                  deal_player, move_player, round_number, move_number):
-        self.fields_with_marbles = dict(fields_with_marbles)
+        self.fields_with_marbles = self._new_fields_with_marbles(fields_with_marbles)
         self.stock_cards = list(stock_cards)
         self.played_cards = list(played_cards)
         self.player_cards = dict(player_cards)
@@ -306,26 +495,105 @@ class GameState:
         self.round_number = round_number
         self.move_number = move_number
         self.last_move = None
+        self.card_locations = None  # CardLocations, kept by ArrayGameState
+        self.game = None  # The game of the players, marbles and cards, used by to_bytes and pickle
 
     def __copy__(self):
         new_one = type(self)(self.fields_with_marbles, self.stock_cards, self.player_cards, self.played_cards,
                              self.players_play_with_color, self.deal_player, self.move_player, self.round_number,
                              self.move_number)
+        new_one.game = self.game
         return new_one
 
+    def _new_fields_with_marbles(self, fields_with_marbles):
+        return FieldsWithMarbles(fields_with_marbles)
+
+    def __reduce__(self):
+        data = self.to_bytes()
+        return _unpickle_game_state, (type(self), data, self.game.spec)
+
+    def to_bytes(self, game=None):
+        """Encodes the game state in 84 bytes: the field id of each marble, the color index each player plays with,
+        the deal and move player, the round and move numbers (2 bytes each), the number of cards in the stock, played
+        cards and each hand and then the card ids in that order. The players, marbles and cards are resolved against
+        the game, the game of the game state by default."""
+        game = game or self.game
+        if game is None:
+            raise ValueError("The game state has no game to encode the players, marbles and cards with.")
+        players = game.players
+        marble_fields = [255] * len(game.board.marbles)
+        for field, marble in self.fields_with_marbles.items():
+            marble_fields[marble.id_] = field.id_
+        colors = [player.player_color for player in players]
+        data = bytearray(marble_fields)
+        data.extend(colors.index(self.players_play_with_color[player]) for player in players)
+        data.append(players.index(self.deal_player))
+        data.append(players.index(self.move_player))
+        data += self.round_number.to_bytes(2, 'little') + self.move_number.to_bytes(2, 'little')
+        hands = [self.player_cards[player] for player in players]
+        data.append(len(self.stock_cards))
+        data.append(len(self.played_cards))
+        data.extend(len(cards) for cards in hands)
+        for cards in [self.stock_cards, self.played_cards] + hands:
+            data.extend(card.id_ for card in cards)
+        return bytes(data)
+
+    @classmethod
+    def from_bytes(cls, data, game):
+        """Decodes a game state encoded by to_bytes, with the players, fields, marbles and cards of the game."""
+        if game is None:
+            raise ValueError("A game is needed to decode the players, marbles and cards of a game state.")
+        players = game.players
+        fields = game.board.fields
+        marbles = game.board.marbles
+        marble_count = len(marbles)
+        fields_with_marbles = FieldsWithMarbles()
+        for marble, field_id in zip(marbles, data[:marble_count]):
+            if field_id != 255:
+                fields_with_marbles[fields[field_id]] = marble
+        offset = marble_count
+        colors = [player.player_color for player in players]
+        players_play_with_color = {player: colors[color_index]
+                                   for player, color_index in zip(players, data[offset:offset + len(players)])}
+        offset += len(players)
+        deal_player = players[data[offset]]
+        move_player = players[data[offset + 1]]
+        round_number = int.from_bytes(data[offset + 2:offset + 4], 'little')
+        move_number = int.from_bytes(data[offset + 4:offset + 6], 'little')
+        offset += 6
+        card_counts = data[offset:offset + 2 + len(players)]
+        offset += len(card_counts)
+        card_lists = []
+        for count in card_counts:
+            card_lists.append([game.cards[card_id] for card_id in data[offset:offset + count]])
+            offset += count
+        stock_cards, played_cards = card_lists[:2]
+        player_cards = dict(zip(players, card_lists[2:]))
+        game_state = cls._new(game, fields_with_marbles, stock_cards, player_cards, played_cards,
+                              players_play_with_color, deal_player, move_player, round_number, move_number)
+        game_state.game = game
+        return game_state
+
+    @classmethod
+    def _new(cls, game, *args):
+        return cls(*args)
+
     def move_player_plays_with_color(self):
         return self.players_play_with_color[self.move_player]
 
     def get_state_for_player(self, player: Player):
-        state = dict()
+        state = PlayerState()
         state['state_for_player'] = player
-        state['fields_with_marbles'] = dict(self.fields_with_marbles)
+        state['fields_with_marbles'] = self.fields_with_marbles.copy()
         state['stock_count'] = len(self.stock_cards)
         state['played_cards'] = list(self.played_cards)
         state['player_cards'] = list(self.player_cards[player])
         player_card_count = {}
         for player in self.player_cards.keys():
-            player_card_count[player] = len(self.player_cards[player])
+            if self.card_locations is not None:
+                player_card_count[player] = self.card_locations.get_hand_count(player)
+            else:
+                player_card_count[player] = len(self.player_cards[player])
         state['player_card_count'] = player_card_count
         state['players_play_with_color'] = dict(self.players_play_with_color)
         state['deal_player'] = self.deal_player
@@ -335,6 +603,84 @@ class GameState:
         return state
 
 
+class ArrayGameState(GameState):
+    """A GameState backed by NumPy int8 arrays: the marble positions and the observation planes (see BoardPlanes) are
+    kept in an ArrayFieldsWithMarbles and updated in place when marbles move or the move player changes, so the
+    observation is not rebuilt each step. The card locations are kept in a CardLocations."""
+
+    def __init__(self, board_planes, fields_with_marbles, stock_cards, player_cards, played_cards,
+                 players_play_with_color, deal_player, move_player, round_number, move_number, card_locations=None):
+        self.board_planes = board_planes
+        super().__init__(fields_with_marbles, stock_cards, player_cards, played_cards, players_play_with_color,
+                         deal_player, move_player, round_number, move_number)
+        if card_locations is None:
+            card_locations = CardLocations(board_planes.player_rows, stock_cards, player_cards, played_cards)
+        self.card_locations = card_locations
+
+    def __copy__(self):
+        new_one = type(self)(self.board_planes, self.fields_with_marbles, self.stock_cards, self.player_cards,
+                             self.played_cards, self.players_play_with_color, self.deal_player, self.move_player,
+                             self.round_number, self.move_number, self.card_locations.copy())
+        new_one.game = self.game
+        return new_one
+
+    @classmethod
+    def _new(cls, game, *args):
+        return cls(game.board_planes, *args)
+
+    def _new_fields_with_marbles(self, fields_with_marbles):
+        if isinstance(fields_with_marbles, ArrayFieldsWithMarbles):
+            return fields_with_marbles.copy()  # Copies the arrays, no rebuild
+        return ArrayFieldsWithMarbles(self.board_planes, fields_with_marbles)
+
+    @property
+    def move_player(self):
+        return self._move_player
+
+    @move_player.setter
+    def move_player(self, player):
+        self._move_player = player
+        self.fields_with_marbles.set_active_row(self.board_planes.player_rows[player])
+
+    @property
+    def marble_positions(self):
+        """Marble id --> field id (int8), -1 if the marble is not on a field."""
+        return self.fields_with_marbles.marble_positions
+
+    def get_observation(self):
+        """Returns a read-only view on the observation planes, active player column first. The view is not changed
+        by later steps."""
+        return self.fields_with_marbles.get_observation()
+
+    def get_card_planes(self, player):
+        """The hand of the player and the played cards as 5x26 planes, see CardLocations.get_card_planes."""
+        return self.card_locations.get_card_planes(player)
+
+
+class PlayerState(dict):
+    """The state of a game state for a player, see GameState.get_state_for_player. The board (fields_with_marbles)
+    and the allowed moves refer to the Field objects of the whole board: they are left out when pickled, the game
+    state in the player state is pickled compactly and has the same board."""
+
+    UNPICKLED_KEYS = ('fields_with_marbles', 'allowed_moves')
+
+    def __reduce__(self):
+        return PlayerState, (), None, None, ((key, value) for key, value in self.items()
+                                             if key not in PlayerState.UNPICKLED_KEYS)
+
+
+_spec_games = {}  # Spec --> game created from the spec, decodes the unpickled game states of games with the spec
+
+
+def _unpickle_game_state(cls, data, game_spec):
+    """Decodes a pickled game state with a game created from the spec of its game, once per process. The game state
+    does not refer to the game it was pickled from: see GameState.from_bytes to decode it with another game."""
+    game = _spec_games.get(game_spec)
+    if game is None:
+        game = _spec_games[game_spec] = Game.from_spec(game_spec)
+    return cls.from_bytes(data, game)
+
+
 class GameActions:
     # 'NO', 'SP07P23P3', 'SP07P33P1','SP07P04T0', ADDED 16x SW11Pxxx for R and Y
     ALL_ACTIONS_271 = ['NO', 'DL', 'RU01P0', 'RU01P1', 'RU01P2', 'RU01P3', 'RU02P0', 'RU02P1', 'RU02P2', 'RU02P3', 'RU03P0',
@@ -464,3 +810,138 @@ class GameActions:
     #                    'SW11P1T0', 'SW11P1T1', 'SW11P1T2', 'SW11P1T3', 'SW11P2O0', 'SW11P2O1', 'SW11P2O2', 'SW11P2O3',
     #                    'SW11P2T0', 'SW11P2T1', 'SW11P2T2', 'SW11P2T3', 'SW11P3O0', 'SW11P3O1', 'SW11P3O2', 'SW11P3O3',
     #                    'SW11P3T0', 'SW11P3T1', 'SW11P3T2', 'SW11P3T3', 'TC']
+
+
+class ActionCodec:
+    """Computes the action index of a move directly from the move type, card value and the progress ranks of the
+    marbles (see Move.get_marble_position), with one compiled table for the action spaces ALL_ACTIONS_271 and
+    ALL_ACTIONS_SIMPLE. The raw action (like 'SP07P12T3') is only built on request, by get_raw_action.
+    ALL_ACTIONS_SIMPLE is not one-to-one: the 'O' of a switch is the action of a switch with the next (A) and with
+    the previous (B) opponent. get_legal_moves takes one move per action index, see get_tie_break_key."""
+
+    ACTION_SPACES = {"Keez": GameActions.ALL_ACTIONS_271, "KeezSimple": GameActions.ALL_ACTIONS_SIMPLE}
+    TYPE_CODES = {MoveType.START: "ST", MoveType.RUN: "RU", MoveType.SPLIT: "SP", MoveType.SWITCH: "SW"}
+    KEY_ACTIONS = {("NO",): "NO", (MoveType.DEAL,): "DL", (MoveType.THROW_CARDS,): "TC"}
+
+    def __init__(self, game):
+        self.players = game.players
+        self.board = game.board
+        # Color --> progress of each field (field id --> index in the path of the color, -1 if not in the path)
+        self.field_progress = {}
+        for player_idx, player in enumerate(game.players):
+            progress = [-1] * len(game.board.fields)
+            for index, field_id in enumerate(BoardState.PATH_FOR_LOCATION[player_idx]):
+                progress[field_id] = index
+            self.field_progress[player.player_color] = progress
+        # Action key --> action index for each game type, -1 if the action is not in the action space
+        self.action_indexes = {}
+        game_types = list(ActionCodec.ACTION_SPACES.keys())
+        self.space_columns = {game_type: column for column, game_type in enumerate(game_types)}
+        for column, game_type in enumerate(game_types):
+            for action_idx, raw_action in enumerate(ActionCodec.ACTION_SPACES[game_type]):
+                for key in ActionCodec._get_keys_for_raw_action(raw_action):
+                    self.action_indexes.setdefault(key, [-1] * len(game_types))[column] = action_idx
+
+    def get_marble_ranks(self, game_state) -> [int]:
+        """Returns the progress rank of each marble (by marble id): most progress == 0, less progress: 1, 2 and 3."""
+        fields_with_marbles = game_state.fields_with_marbles
+        if isinstance(fields_with_marbles, FieldsWithMarbles):
+            get_field = fields_with_marbles.marbles_with_fields.__getitem__
+        else:
+            def get_field(marble):
+                return BoardState.get_field_for_marble(marble, fields_with_marbles)
+        marble_ranks = [0] * len(self.board.marbles)
+        for color, marbles in self.board.marbles_with_color.items():
+            progress = self.field_progress[color]
+            # Marbles never share a field, so the rank is the position when sorted on progress
+            marbles_by_progress = sorted(marbles, key=lambda marble: progress[get_field(marble).id_], reverse=True)
+            for rank, marble in enumerate(marbles_by_progress):
+                marble_ranks[marble.id_] = rank
+        return marble_ranks
+
+    def get_action_key(self, move, marble_ranks) -> ():
+        """Returns the key of the move in the action table, like (SPLIT, 7, 1, 2, 'T', 3) for 'SP07P12T3'."""
+        if move is None:
+            return "NO",
+        if move.move_type == MoveType.THROW_CARDS or move.move_type == MoveType.DEAL:
+            return move.move_type,
+        marble_moves = move.marble_moves
+        first_marble = marble_moves[0].marble
+        card_value = move.cards[0].card_value.value
+        if len(marble_moves) == 1 or move.move_type == MoveType.START or move.move_type == MoveType.RUN:
+            return move.move_type, card_value, marble_ranks[first_marble.id_]
+        second_marble = marble_moves[1].marble
+        team_mate_color = move.player.get_team_mate().player_color
+        if move.move_type == MoveType.SPLIT:
+            marble_char = None
+            if second_marble.color_ == first_marble.color_:
+                marble_char = "P"
+            elif second_marble.color_ == team_mate_color:
+                marble_char = "T"
+            return move.move_type, card_value, marble_ranks[first_marble.id_], len(marble_moves[0].steps), \
+                marble_char, marble_ranks[second_marble.id_]
+        if second_marble.color_ == team_mate_color:
+            marble_char = "T"
+        elif second_marble.color_ == move.player.get_next_player(self.players).player_color:
+            marble_char = "A"
+        else:
+            marble_char = "B"
+        return move.move_type, card_value, marble_ranks[first_marble.id_], marble_char, marble_ranks[second_marble.id_]
+
+    def get_action_index(self, move, marble_ranks, game_type="Keez") -> int:
+        """Returns the index of the move in the action space of the game type."""
+        action_idx = self.action_indexes[self.get_action_key(move, marble_ranks)][self.space_columns[game_type]]
+        if action_idx < 0:
+            raise KeyError("Move " + self.get_raw_action(move, marble_ranks) + " not in action space " + game_type)
+        return action_idx
+
+    def get_legal_moves(self, moves, marble_ranks, game_type="Keez") -> {}:
+        """Returns action index --> move for the moves, in the order of the moves. Of moves with the same action
+        index the move with the lowest tie-break key is taken."""
+        legal_moves = {}
+        for move in moves:
+            action_idx = self.get_action_index(move, marble_ranks, game_type)
+            legal_move = legal_moves.get(action_idx)
+            if legal_move is None or ActionCodec.get_tie_break_key(move) < ActionCodec.get_tie_break_key(legal_move):
+                legal_moves[action_idx] = move
+        return legal_moves
+
+    @staticmethod
+    def get_tie_break_key(move) -> ():
+        """Returns the marble ids of the move. Only a switch with an opponent shares an action index with another
+        move (in ALL_ACTIONS_SIMPLE), the switch with the lowest marble id of the opponent has the lowest key: the
+        first move of CardOpSwitchOneOwnMarble and the move of VectorKeezenGame."""
+        return tuple(marble_move.marble.id_ for marble_move in move.marble_moves)
+
+    def get_raw_action(self, move, marble_ranks) -> str:
+        """Returns the raw action of the move, like 'SP07P12T3'. The same as Move.get_raw_action."""
+        return ActionCodec.get_raw_action_for_key(self.get_action_key(move, marble_ranks))
+
+    @staticmethod
+    def get_raw_action_for_key(key) -> str:
+        if len(key) == 1:
+            return ActionCodec.KEY_ACTIONS[key]
+        result = ActionCodec.TYPE_CODES[key[0]] + str(key[1]).zfill(2) + "P" + str(key[2])
+        if len(key) == 6:  # SPLIT with two marbles
+            result += str(key[3]) + str(key[4]) + str(key[5])
+        elif len(key) == 5:  # SWITCH
+            result += key[3] + str(key[4])
+        return result
+
+    @staticmethod
+    def _get_keys_for_raw_action(raw_action) -> [()]:
+        for key, key_action in ActionCodec.KEY_ACTIONS.items():
+            if key_action == raw_action:
+                return [key]
+        move_type = next(move_type for move_type, code in ActionCodec.TYPE_CODES.items()
+                         if raw_action.startswith(code))
+        card_value = int(raw_action[2:4])
+        rank = int(raw_action[5])
+        if len(raw_action) == 6:
+            return [(move_type, card_value, rank)]
+        if move_type == MoveType.SPLIT:  # SP07P12T3
+            return [(move_type, card_value, rank, int(raw_action[6]), raw_action[7], int(raw_action[8]))]
+        if raw_action[6] == "O":  # ALL_ACTIONS_SIMPLE: switch with the next (A) or previous (B) opponent
+            return [(move_type, card_value, rank, "A", int(raw_action[7])),
+                    (move_type, card_value, rank, "B", int(raw_action[7]))]
+        return [(move_type, card_value, rank, raw_action[6], int(raw_action[7]))]
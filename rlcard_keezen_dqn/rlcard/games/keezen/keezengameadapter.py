@@ -1,5 +1,5 @@
 from rlcard.games.keezen.board import FieldColor, Board
-from rlcard.games.keezen.game import Game, GameActions
+from rlcard.games.keezen.game import Game, GameActions, ActionCodec
 from rlcard.games.keezen.player import Player, PlayerLocation, Team
 from rlcard.games.keezen.rules import Rules
 
@@ -8,9 +8,15 @@ class KeezenGameAdapter:
     """Adapter class to use the Keezen game in RLCard. The state and actions are converted to dict and ints."""
 
     game_type = "Keez"  # "KeezSimple"  # or "Keez"
-
-    def __init__(self, allow_step_back=False):
-        self.allow_step_back = allow_step_back
+    array_game_state = False  # True to use ArrayGameState, observation planes updated in place
+    lean_state = False  # True for states with only the player and the game state, see get_state
+
+    def __init__(self, allow_step_back=False, array_game_state=None, lean_state=None):
+        if array_game_state is None:
+            array_game_state = KeezenGameAdapter.array_game_state
+        if lean_state is None:
+            lean_state = KeezenGameAdapter.lean_state
+        self.lean_state = lean_state
         player_north = Player("Green", FieldColor.GREEN, PlayerLocation.NORTH)
         player_east = Player("Red", FieldColor.RED, PlayerLocation.EAST)
         player_south = Player("Blue", FieldColor.BLUE, PlayerLocation.SOUTH)
@@ -21,19 +27,46 @@ class KeezenGameAdapter:
 
         print("Initialize game. game_type: " + KeezenGameAdapter.game_type)
         self.game = Game(Rules(KeezenGameAdapter.game_type), self.players, Board(self.players))
+        self.game.array_game_state = array_game_state
+        self.allow_step_back = allow_step_back
+        self.action_codec = ActionCodec(self.game)
         self.game_state = None
+        self.legal_moves_game_state = None  # The game state of allowed_moves and legal_moves
+        self.allowed_moves = []
+        self.legal_moves = {}  # Action index --> Move, for the allowed moves of legal_moves_game_state
+        self.legal_action_ids = []  # Action index for each allowed move
 
+        self._ACTION_LIST = []
         self._ACTION_SPACE = {} # Copied from KeezenEnv to have access to a action space mapping
         idx = 0
         if self.game.rules.game_type == "Keez":
+            self._ACTION_LIST = GameActions.ALL_ACTIONS_271
             for action_id in GameActions.ALL_ACTIONS_271:
                 self._ACTION_SPACE[action_id] = idx
                 idx += 1
         elif self.game.rules.game_type == "KeezSimple":
+            self._ACTION_LIST = GameActions.ALL_ACTIONS_SIMPLE
             for action_id in GameActions.ALL_ACTIONS_SIMPLE:
                 self._ACTION_SPACE[action_id] = idx
                 idx += 1
-        # self.legal_moves = {}  # actionid --> move  CHANGED: NO MEMBER VARIABLE self.legal_moves
+
+    @property
+    def np_random(self):
+        return self.game.np_random
+
+    @np_random.setter
+    def np_random(self, np_random):
+        """Set on the game, the cards are shuffled with it."""
+        self.game.np_random = np_random
+
+    @property
+    def allow_step_back(self):
+        return self.game.allow_step_back
+
+    @allow_step_back.setter
+    def allow_step_back(self, allow_step_back):
+        """Set on the game, the game keeps the step back history."""
+        self.game.allow_step_back = allow_step_back
 
     def init_game(self):
         self.game_state, player_idx = self.game.init_game()
@@ -44,11 +77,8 @@ class KeezenGameAdapter:
         """Do a move. Action is the raw id of a move."""
         move = None
         if action != 'NO':
-            # move = self.legal_moves[action]  # CHANGED: NO MEMBER VARIABLE self.legal_moves
-            moves = [move for move in self.game.get_allowed_moves(self.game_state) if move.get_raw_action(self.game, self.game_state) == action]
-            if len(moves) is not 1:
-                print("UNEXPECTED NUMBER OF MOVES FOR ACTION " + action + ":" + str(len(moves)))
-            move = moves[0]
+            self._update_legal_moves()
+            move = self.legal_moves[self._ACTION_SPACE[action]]
         self.game_state, rewards, done = self.game.step(move, self.game_state)
         player_idx = self.game.players.index(self.game_state.move_player)
         player_state = self.get_state(player_idx)
@@ -63,8 +93,11 @@ class KeezenGameAdapter:
             return player_state, player_idx
 
     def get_state(self, player_idx):
+        if self.lean_state:  # No copies of the board and cards, no allowed moves
+            return {'state_for_player': self.game.players[player_idx], 'game_state': self.game_state}
         player_state = self.game_state.get_state_for_player(self.game.players[player_idx])
-        allowed_moves = self.game.get_allowed_moves(self.game_state)
+        self._update_legal_moves()
+        allowed_moves = list(self.allowed_moves)
         # CHANGED: NO MEMBER VARIABLE self.legal_moves
         # self.legal_moves.clear()
         # legal_moves_id = []
@@ -114,18 +147,34 @@ class KeezenGameAdapter:
     #                 legal_action_idx.append(action_idx)
     #     return legal_action_idx
 
-    def get_legal_actions(self, action_space) -> [int]:  # No member variable self.legal_moves
-        allowed_moves = self.game.get_allowed_moves(self.game_state)
-        legal_moves_id = []
-        for move in allowed_moves:
-            raw_action = move.get_raw_action(self.game, self.game_state)
-            action_idx = action_space[raw_action]
-            legal_moves_id.append(action_idx)
+    def get_allowed_moves(self):
+        """The allowed moves of the current game state."""
+        self._update_legal_moves()
+        return list(self.allowed_moves)
+
+    def get_legal_actions(self, action_space) -> [int]:
+        self._update_legal_moves()
+        if action_space is self._ACTION_SPACE:
+            legal_moves_id = list(self.legal_action_ids)
+        else:
+            legal_moves_id = [action_space[self._ACTION_LIST[action_idx]] for action_idx in self.legal_action_ids]
         if not legal_moves_id:
             no_idx = action_space['NO']
             legal_moves_id.append(no_idx)  # pass
         return legal_moves_id
 
+    def _update_legal_moves(self):
+        """Computes the allowed moves and the legal moves table once per game state."""
+        if self.legal_moves_game_state is self.game_state:
+            return
+        self.allowed_moves = self.game.get_allowed_moves(self.game_state)
+        marble_ranks = self.action_codec.get_marble_ranks(self.game_state)
+        # One move per action: a switch with an opponent ('O') in KeezSimple is the action of two moves
+        self.legal_moves = self.action_codec.get_legal_moves(self.allowed_moves, marble_ranks,
+                                                             self.game.rules.game_type)
+        self.legal_action_ids = list(self.legal_moves.keys())
+        self.legal_moves_game_state = self.game_state
+
 
 
     # def get_action_idx(self, moves):
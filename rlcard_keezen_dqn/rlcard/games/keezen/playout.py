@@ -0,0 +1,71 @@
+import random
+
+import numpy as np
+
+from rlcard.games.keezen.agent import RuleBasedAgent
+from rlcard.games.keezen.game import GameState
+
+
+def playout(game_state=None, policy="random", n=1, game=None):
+    """Plays n games to the end with the game engine only: no observations, action indexes or state dicts.
+    The game state is not changed, each game starts from a copy. Without game state each game starts with a new deal.
+    The allowed moves of each ply are still generated as Move objects, which takes most of the time: random playouts
+    run about 2.7 times the games per second of Env.run with random agents (2.1 times with lean states).
+
+    Args:
+        game_state (GameState): The start of the games, None for new games
+        policy (str, agent or list): "random" (uniform over the allowed moves), "rule" (RuleBasedAgent), an agent
+          with get_move(moves, game_state), or a list with one of these per player
+        n (int): The number of games
+        game (Game): The game of the rules, players and random state, the game of the game state by default
+
+    Returns:
+        (tuple): The payoffs (n, players) and lengths in moves (n,) as NumPy arrays
+    """
+    game = game or (game_state.game if game_state is not None else None)
+    if game is None:
+        raise ValueError("A game is needed for the playouts of new games.")
+    policies = policy if isinstance(policy, list) else [policy] * len(game.players)
+    agents = {player: _get_agent(policy, game) for player, policy in zip(game.players, policies)}
+    payoffs = np.zeros((n, len(game.players)), dtype=int)
+    lengths = np.zeros(n, dtype=int)
+    for index in range(n):
+        playout_state = _copy_for_playout(game_state if game_state is not None else game._new_game_state())
+        done, rewards = False, None
+        while not done:
+            moves = game.get_allowed_moves(playout_state)
+            agent = agents[playout_state.move_player]
+            if agent is None:  # Random
+                move = moves[_randint(game, len(moves))] if moves else None
+            else:
+                move = agent.get_move(moves, playout_state)
+            done, rewards = game.play(move, playout_state)
+            lengths[index] += 1
+        payoffs[index] = rewards
+    return payoffs, lengths
+
+
+def _get_agent(policy, game):
+    if policy == "random":
+        return None
+    if policy == "rule":
+        return RuleBasedAgent(game)
+    if isinstance(policy, str):
+        raise ValueError("Unknown playout policy: " + policy)
+    return policy
+
+
+def _randint(game, high):
+    if game.random_buffer is not None:
+        return game.random_buffer.randint(0, high)
+    return random.randrange(high)
+
+
+def _copy_for_playout(game_state):
+    """Plain GameState copy (an ArrayGameState would update its observation planes) with its own card lists."""
+    playout_state = GameState(game_state.fields_with_marbles, game_state.stock_cards, {}, game_state.played_cards,
+                              game_state.players_play_with_color, game_state.deal_player, game_state.move_player,
+                              game_state.round_number, game_state.move_number)
+    playout_state.player_cards = {player: list(cards) for player, cards in game_state.player_cards.items()}
+    playout_state.game = game_state.game
+    return playout_state
@@ -92,4 +92,3 @@ class Rules:
                 elif card.card_value == CardValue.KING:
                     card_ops[card] = [CardOpStart(board)]
         return card_ops
-
@@ -0,0 +1,145 @@
+import pickle
+import unittest
+
+import numpy as np
+
+from rlcard.games.keezen.board import FieldColor, Board, BoardState, FieldsWithMarbles, BoardPlanes, \
+    ArrayFieldsWithMarbles
+from rlcard.games.keezen.player import Player, PlayerLocation
+from rlcard.games.keezen.rules import Rules
+
+
+class TestBoard(unittest.TestCase):
+    """Test the board."""
+
+    def setUp(self) -> None:
+        """Setup the board."""
+        player_north = Player("Green", FieldColor.GREEN, PlayerLocation.NORTH)
+        player_east = Player("Red", FieldColor.RED, PlayerLocation.EAST)
+        player_south = Player("Blue", FieldColor.BLUE, PlayerLocation.SOUTH)
+        player_west = Player("Yellow", FieldColor.YELLOW, PlayerLocation.WEST)
+        self.players = [player_north, player_east, player_south, player_west]
+        self.board = Board(self.players)
+        self.fields_with_marbles = BoardState.get_initial_board_state(self.board.marbles, self.board.waitFields)
+
+    def test_create_fields(self):
+        self.assertEqual(96, len(self.board.fields))
+        self.assertEqual(16, len(self.board.waitFields))
+        self.assertEqual(4, len(self.board.startFields))
+        self.assertEqual(16, len(self.board.homeFields))
+
+    def test_get_marbles_with_color(self):
+        self.assertEqual(16, len(self.board.marbles))
+        for color in [FieldColor.GREEN, FieldColor.RED, FieldColor.BLUE, FieldColor.YELLOW]:
+            marbles = self.board.get_marbles_with_color(color)
+            self.assertEqual(4, len(marbles))
+            self.assertTrue(all(marble.color_ == color for marble in marbles))
+
+    def test_initial_board_state_is_indexed(self):
+        self.assertIsInstance(self.fields_with_marbles, FieldsWithMarbles)
+        for marble in self.board.marbles:
+            field = BoardState.get_field_for_marble(marble, self.fields_with_marbles)
+            self.assertIs(marble, self.fields_with_marbles[field])
+
+    def test_put_marble_on_field_updates_index(self):
+        green_marble = self.board.get_marbles_with_color(FieldColor.GREEN)[0]
+        red_marble = self.board.get_marbles_with_color(FieldColor.RED)[0]
+        wait_field = BoardState.get_field_for_marble(green_marble, self.fields_with_marbles)
+        BoardState.put_marble_on_field(red_marble, self.board.fields[10], self.fields_with_marbles)
+        BoardState.put_marble_on_field(green_marble, self.board.fields[5], self.fields_with_marbles)
+        self.assertIs(self.board.fields[5], BoardState.get_field_for_marble(green_marble, self.fields_with_marbles))
+        self.assertIsNone(BoardState.get_marble_for_field_opt(wait_field, self.fields_with_marbles))
+        # Hit the red marble: it has no field until it is put back on a wait field
+        hit_marble = BoardState.put_marble_on_field(green_marble, self.board.fields[10], self.fields_with_marbles)
+        self.assertIs(red_marble, hit_marble)
+        self.assertIsNone(BoardState.get_field_for_marble(red_marble, self.fields_with_marbles))
+        self.assertIsNone(BoardState.get_marble_for_field_opt(self.board.fields[5], self.fields_with_marbles))
+
+    def test_index_matches_plain_dict(self):
+        blue_marble = self.board.get_marbles_with_color(FieldColor.BLUE)[1]
+        BoardState.put_marble_on_field(blue_marble, self.board.fields[53], self.fields_with_marbles)
+        plain = dict(self.fields_with_marbles)
+        copied = self.fields_with_marbles.copy()
+        for marble in self.board.marbles:
+            self.assertIs(BoardState.get_field_for_marble(marble, plain),
+                          BoardState.get_field_for_marble(marble, copied))
+        unpickled = pickle.loads(pickle.dumps(self.fields_with_marbles))
+        for field, marble in unpickled.items():
+            self.assertIs(field, BoardState.get_field_for_marble(marble, unpickled))
+
+    def test_get_path_for_marble(self):
+        fields = self.board.fields
+        green_marble = self.board.get_marbles_with_color(FieldColor.GREEN)[0]
+        red_marble = self.board.get_marbles_with_color(FieldColor.RED)[0]
+        # No path for marble on WAIT field
+        self.assertEqual([], self.board.get_path_for_marble(green_marble, 6, self.fields_with_marbles))
+        BoardState.put_marble_on_field(green_marble, fields[5], self.fields_with_marbles)
+        self.assertEqual(fields[6:12], self.board.get_path_for_marble(green_marble, 6, self.fields_with_marbles))
+        self.assertEqual([fields[4], fields[91], fields[90], fields[89]],
+                         self.board.get_path_for_marble(green_marble, -4, self.fields_with_marbles))
+        # Red marble on its start field blocks the green marble
+        BoardState.put_marble_on_field(green_marble, fields[17], self.fields_with_marbles)
+        BoardState.put_marble_on_field(red_marble, fields[29], self.fields_with_marbles)
+        self.assertEqual([], self.board.get_path_for_marble(green_marble, 4, self.fields_with_marbles))
+        self.assertEqual([fields[18], fields[19], fields[28]],
+                         self.board.get_path_for_marble(green_marble, 4, self.fields_with_marbles, True))
+        BoardState.put_marble_on_field(red_marble, fields[30], self.fields_with_marbles)
+        self.assertEqual([fields[18], fields[19], fields[28], fields[29]],
+                         self.board.get_path_for_marble(green_marble, 4, self.fields_with_marbles))
+
+    def test_compiled_paths_match_walked_paths(self):
+        marbles = self.board.marbles
+        for i, marble in enumerate(marbles[::2]):
+            BoardState.put_marble_on_field(marble, self.board.fields[(i * 29 + 5) % 96], self.fields_with_marbles)
+        for field in self.board.fields:
+            for player in self.players:
+                for run_fields in [-4, -1, 1, 2, 5, 7, 12]:
+                    for get_shorter_path in [False, True]:
+                        self.assertEqual(
+                            Board._walk_path_for_color(player.player_color, field, run_fields,
+                                                       self.fields_with_marbles, get_shorter_path),
+                            Board.get_path_for_color(player.player_color, field, run_fields,
+                                                     self.fields_with_marbles, get_shorter_path))
+
+    def test_array_fields_with_marbles(self):
+        board_planes = BoardPlanes(self.board, self.players)
+        fields_with_marbles = ArrayFieldsWithMarbles(board_planes, self.fields_with_marbles)
+        fields_with_marbles.set_active_row(1)
+        green_marble = self.board.get_marbles_with_color(FieldColor.GREEN)[0]
+        red_marble = self.board.get_marbles_with_color(FieldColor.RED)[0]
+        BoardState.put_marble_on_field(red_marble, self.board.fields[10], fields_with_marbles)
+        BoardState.put_marble_on_field(green_marble, self.board.fields[10], fields_with_marbles)
+        self.assertEqual(10, fields_with_marbles.marble_positions[green_marble.id_])
+        self.assertEqual(-1, fields_with_marbles.marble_positions[red_marble.id_])
+        observation = fields_with_marbles.get_observation()
+        board_matrix = BoardState.get_board_state_as_matrix(fields_with_marbles, self.board, self.players[1],
+                                                            FieldColor.RED, self.players)
+        np.testing.assert_array_equal(board_matrix, observation[:, 1:])
+        np.testing.assert_array_equal([0, 1, 0, 0, 0], observation[:, 0])
+        # The exported view is not changed by later moves (copy on write)
+        BoardState.put_marble_on_field(green_marble, self.board.fields[11], fields_with_marbles)
+        fields_with_marbles.set_active_row(2)
+        np.testing.assert_array_equal(board_matrix, observation[:, 1:])
+        np.testing.assert_array_equal([0, 0, 1, 0, 0], fields_with_marbles.get_observation()[:, 0])
+        copied = fields_with_marbles.copy()
+        unpickled = pickle.loads(pickle.dumps(fields_with_marbles))
+        for other in [copied, unpickled]:
+            np.testing.assert_array_equal(fields_with_marbles.observation, other.observation)
+            np.testing.assert_array_equal(fields_with_marbles.marble_positions, other.marble_positions)
+
+    def test_is_color_finished(self):
+        rules = Rules()
+        self.assertFalse(self.board.is_color_finished(FieldColor.GREEN, self.fields_with_marbles, rules))
+        for i, green_marble in enumerate(self.board.get_marbles_with_color(FieldColor.GREEN)):
+            BoardState.put_marble_on_field(green_marble, self.board.fields[i], self.fields_with_marbles)
+        self.assertTrue(self.board.is_color_finished(FieldColor.GREEN, self.fields_with_marbles, rules))
+        self.assertEqual(4, self.fields_with_marbles.copy().home_counts[FieldColor.GREEN])
+        green_marble = self.board.get_marbles_with_color(FieldColor.GREEN)[0]
+        BoardState.put_marble_on_field(green_marble, self.board.fields[11], self.fields_with_marbles)
+        self.assertEqual(3, self.fields_with_marbles.home_counts[FieldColor.GREEN])
+        self.assertEqual(3, self.board.get_home_count(FieldColor.GREEN, dict(self.fields_with_marbles)))
+        self.assertFalse(self.board.is_color_finished(FieldColor.GREEN, self.fields_with_marbles, rules))
+
+
+if __name__ == '__main__':
+    unittest.main()
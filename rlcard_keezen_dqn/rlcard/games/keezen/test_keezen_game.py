@@ -0,0 +1,268 @@
+import pickle
+import random
+import unittest
+from copy import copy
+
+import numpy as np
+
+from rlcard.games.keezen.board import FieldColor, Board
+from rlcard.games.keezen.card import CardState, CardLocations
+from rlcard.games.keezen.game import Game, GameState, GameActions, ActionCodec, _unpickle_game_state
+from rlcard.games.keezen.player import Player, PlayerLocation, Team
+from rlcard.games.keezen.playout import playout
+from rlcard.games.keezen.rules import Rules
+from rlcard.utils import seeding
+
+
+def get_state_signature(game_state):
+    return (sorted((field.id_, marble.id_) for field, marble in game_state.fields_with_marbles.items()),
+            sorted((marble.id_, field.id_) for marble, field in game_state.fields_with_marbles.marbles_with_fields.items()),
+            [card.id_ for card in game_state.stock_cards], [card.id_ for card in game_state.played_cards],
+            sorted((player.name, [card.id_ for card in cards]) for player, cards in game_state.player_cards.items()),
+            sorted((player.name, color) for player, color in game_state.players_play_with_color.items()),
+            game_state.deal_player.name, game_state.move_player.name, game_state.round_number,
+            game_state.move_number, game_state.last_move)
+
+
+class TestGame(unittest.TestCase):
+    """Test the game."""
+
+    def setUp(self) -> None:
+        self.game = self.create_game()
+        self.players = self.game.players
+
+    @staticmethod
+    def create_game():
+        player_north = Player("Green", FieldColor.GREEN, PlayerLocation.NORTH)
+        player_east = Player("Red", FieldColor.RED, PlayerLocation.EAST)
+        player_south = Player("Blue", FieldColor.BLUE, PlayerLocation.SOUTH)
+        player_west = Player("Yellow", FieldColor.YELLOW, PlayerLocation.WEST)
+        players = [player_north, player_east, player_south, player_west]
+        Team("GreenBlue", [player_north, player_south])
+        Team("RedYellow", [player_east, player_west])
+        return Game(Rules(), players, Board(players))
+
+    def test_action_codec_table(self):
+        action_codec = ActionCodec(self.game)
+        for game_type, column in [("Keez", 0), ("KeezSimple", 1)]:
+            for action_idx, raw_action in enumerate(ActionCodec.ACTION_SPACES[game_type]):
+                for key in ActionCodec._get_keys_for_raw_action(raw_action):
+                    self.assertEqual(action_idx, action_codec.action_indexes[key][column])
+        for raw_action in GameActions.ALL_ACTIONS_271:
+            key = ActionCodec._get_keys_for_raw_action(raw_action)[0]
+            self.assertEqual(raw_action, ActionCodec.get_raw_action_for_key(key))
+
+    def test_action_codec_same_as_raw_action(self):
+        action_codec = ActionCodec(self.game)
+        random.seed(2)
+        for _ in range(2):
+            game_state, _ = self.game.init_game()
+            done = False
+            while not done:
+                moves = self.game.get_allowed_moves(game_state)
+                marble_ranks = action_codec.get_marble_ranks(game_state)
+                for move in moves:
+                    raw_action = move.get_raw_action(self.game, game_state)
+                    self.assertEqual(raw_action, action_codec.get_raw_action(move, marble_ranks))
+                    self.assertEqual(GameActions.ALL_ACTIONS_271.index(raw_action),
+                                     action_codec.get_action_index(move, marble_ranks))
+                move = random.choice(moves) if moves else None
+                game_state, _, done = self.game.step(move, game_state)
+
+    def test_action_codec_switch_with_two_opponents(self):
+        game = Game(Rules("KeezSimple"), self.players, self.game.board)
+        action_codec = ActionCodec(game)
+        random.seed(4)
+        game_state, _ = game.init_game()
+        switch_moves = None
+        while switch_moves is None:
+            moves = game.get_allowed_moves(game_state)
+            marble_ranks = action_codec.get_marble_ranks(game_state)
+            moves_by_index = {}
+            for move in moves:
+                action_idx = action_codec.get_action_index(move, marble_ranks, "KeezSimple")
+                moves_by_index.setdefault(action_idx, []).append(move)
+            switch_moves = next((moves for moves in moves_by_index.values() if len(moves) > 1), None)
+            game_state, _, _ = game.step(random.choice(moves) if moves else None, game_state)
+        # The same 'O' action for a switch with the next (A) and with the previous (B) opponent
+        self.assertEqual(2, len(switch_moves))
+        self.assertEqual({"A", "B"}, {action_codec.get_action_key(move, marble_ranks)[3] for move in switch_moves})
+        raw_actions = {action_codec.get_raw_action_for_key(action_codec.get_action_key(move, marble_ranks))
+                       .replace("A", "O").replace("B", "O") for move in switch_moves}
+        action_idx = action_codec.get_action_index(switch_moves[0], marble_ranks, "KeezSimple")
+        self.assertEqual({GameActions.ALL_ACTIONS_SIMPLE[action_idx]}, raw_actions)
+        # The switch with the lowest marble id of the opponent, whatever the order of the moves
+        expected = min(switch_moves, key=lambda move: move.marble_moves[1].marble.id_)
+        for ordered_moves in (switch_moves, switch_moves[::-1]):
+            legal_moves = action_codec.get_legal_moves(ordered_moves, marble_ranks, "KeezSimple")
+            self.assertEqual([action_idx], list(legal_moves.keys()))
+            self.assertIs(expected, legal_moves[action_idx])
+        self.assertIs(expected, switch_moves[0])  # The first move of the card operation
+
+    def test_apply_move_and_undo(self):
+        random.seed(3)
+        game_state, _ = self.game.init_game()
+        done = False
+        while not done:
+            moves = self.game.get_allowed_moves(game_state)
+            signature = get_state_signature(game_state)
+            # Every allowed move is undone exactly
+            for move in moves:
+                undo_token = self.game.apply_move(game_state, move)
+                self.game.undo(game_state, undo_token)
+                self.assertEqual(signature, get_state_signature(game_state))
+            move = random.choice(moves) if moves else None
+            # apply_move gives the same game state as step (same shuffle when the stock is reset)
+            seed = random.random()
+            random.seed(seed)
+            undo_token = self.game.apply_move(game_state, move)
+            applied_signature = get_state_signature(game_state)
+            self.game.undo(game_state, undo_token)
+            random.seed(seed)
+            game_state, rewards, done = self.game.step(move, game_state)
+            self.assertEqual(applied_signature, get_state_signature(game_state))
+            self.assertEqual((done, rewards if done else None), (undo_token.done, undo_token.rewards))
+
+    def test_undo_whole_game(self):
+        random.seed(4)
+        game_state, _ = self.game.init_game()
+        undo_tokens = []
+        signatures = []
+        while not undo_tokens or not undo_tokens[-1].done:
+            moves = self.game.get_allowed_moves(game_state)
+            signatures.append(get_state_signature(game_state))
+            undo_tokens.append(self.game.apply_move(game_state, random.choice(moves) if moves else None))
+        for undo_token, signature in zip(reversed(undo_tokens), reversed(signatures)):
+            self.game.undo(game_state, undo_token)
+            self.assertEqual(signature, get_state_signature(game_state))
+
+    def test_card_locations(self):
+        self.game.array_game_state = True
+        random.seed(6)
+        game_state, _ = self.game.init_game()
+        done = False
+        while not done:
+            for move in self.game.get_allowed_moves(game_state):
+                undo_token = self.game.apply_move(game_state, move)
+                self.check_card_locations(game_state)
+                self.game.undo(game_state, undo_token)
+                self.check_card_locations(game_state)
+            moves = self.game.get_allowed_moves(game_state)
+            game_state, _, done = self.game.step(random.choice(moves) if moves else None, game_state)
+            self.check_card_locations(game_state)
+
+    def check_card_locations(self, game_state):
+        card_locations = CardLocations(self.game.board_planes.player_rows, game_state.stock_cards,
+                                       game_state.player_cards, game_state.played_cards)
+        np.testing.assert_array_equal(card_locations.locations, game_state.card_locations.locations)
+        self.assertEqual(card_locations.counts, game_state.card_locations.counts)
+        self.assertEqual(Game._is_round_over(game_state), all(not cards for cards in game_state.player_cards.values()))
+        for player in self.players:
+            self.assertEqual(len(game_state.player_cards[player]), game_state.card_locations.get_hand_count(player))
+            expected = np.hstack((CardState.get_card_state_as_matrix(game_state.player_cards[player]),
+                                  CardState.get_card_state_as_matrix(game_state.played_cards)))
+            np.testing.assert_array_equal(expected, game_state.get_card_planes(player))
+
+    def test_seeded_game(self):
+        signatures = []
+        for seed in [3, 3, 4]:
+            self.game.np_random, _ = seeding.np_random(seed)
+            rng = random.Random(0)  # The moves do not use the random state of the game
+            game_state, _ = self.game.init_game()
+            signature = [get_state_signature(game_state)]
+            for _ in range(100):  # Past a reset of the stock
+                moves = self.game.get_allowed_moves(game_state)
+                game_state, _, _ = self.game.step(rng.choice(moves) if moves else None, game_state)
+                signature.append(get_state_signature(copy(game_state)))
+            signatures.append(signature)
+        self.assertEqual(signatures[0], signatures[1])
+        self.assertNotEqual(signatures[0], signatures[2])
+
+    def test_playout(self):
+        self.game.np_random, _ = seeding.np_random(3)
+        game_state, _ = self.game.init_game()
+        signature = get_state_signature(game_state)
+        results = []
+        for _ in range(2):
+            self.game.np_random, _ = seeding.np_random(4)
+            results.append(playout(game_state, "random", 3, self.game))
+        self.assertEqual(signature, get_state_signature(game_state))  # The games start from copies
+        payoffs, lengths = results[0]
+        np.testing.assert_array_equal(payoffs, results[1][0])
+        np.testing.assert_array_equal(lengths, results[1][1])
+        self.assertEqual([2, 2, 2], payoffs.sum(axis=1).tolist())  # One team wins
+        self.assertTrue((lengths > 0).all())
+        payoffs, lengths = playout(None, ["rule", "random", "rule", "random"], 1, self.game)
+        self.assertEqual([[1, 0, 1, 0]], payoffs.tolist())
+
+    def test_step_back(self):
+        for snapshot_interval in [0, 5]:
+            self.game.allow_step_back = True
+            self.game.history_snapshot_interval = snapshot_interval
+            random.seed(5)
+            game_state, _ = self.game.init_game()
+            signatures = [get_state_signature(game_state)]
+            for _ in range(60):
+                moves = self.game.get_allowed_moves(game_state)
+                game_state, _, _ = self.game.step(random.choice(moves) if moves else None, game_state)
+                signatures.append(get_state_signature(game_state))
+            self.assertEqual(60, len(self.game.game_history))
+            for signature in reversed(signatures[:-1]):
+                game_state = self.game.step_back()
+                self.assertEqual(signature, get_state_signature(game_state))
+            self.assertIsNone(self.game.step_back())
+
+    def test_to_bytes(self):
+        for array_game_state in [False, True]:
+            self.game.array_game_state = array_game_state
+            random.seed(7)
+            game_state, _ = self.game.init_game()
+            for _ in range(80):
+                moves = self.game.get_allowed_moves(game_state)
+                game_state, _, _ = self.game.step(random.choice(moves) if moves else None, game_state)
+                data = game_state.to_bytes()
+                self.assertEqual(84, len(data))
+                for other in [type(game_state).from_bytes(data, self.game), pickle.loads(pickle.dumps(game_state))]:
+                    self.assertIs(type(game_state), type(other))
+                    self.assertEqual(get_state_signature(copy(game_state)), get_state_signature(other))
+                    self.assertEqual(data, other.to_bytes())
+                    if array_game_state:
+                        np.testing.assert_array_equal(game_state.get_observation(), other.get_observation())
+
+    def test_pickle_with_two_games(self):
+        """A game state is decoded with a game created from the spec of its own game, not with a live game."""
+        players = [Player(name, player.player_color, player.location) for name, player in zip("ABCD", self.players)]
+        Team("AC", [players[0], players[2]])
+        Team("BD", [players[1], players[3]])
+        other_game = Game(Rules("KeezSimple"), players, Board(players))
+        random.seed(3)
+        game_states = []
+        for game in [self.game, other_game]:
+            game_state, _ = game.init_game()
+            for _ in range(30):
+                moves = game.get_allowed_moves(game_state)
+                game_state, _, _ = game.step(random.choice(moves) if moves else None, game_state)
+            game_states.append(game_state)
+        for game, game_state in zip([self.game, other_game], game_states):
+            other = pickle.loads(pickle.dumps(game_state))
+            self.assertIsNot(game, other.game)
+            self.assertEqual(game.spec, other.game.spec)
+            self.assertEqual(game.rules.game_type, other.game.rules.game_type)
+            self.assertEqual([player.get_team_mate().name for player in game.players],
+                             [player.get_team_mate().name for player in other.game.players])
+            self.assertEqual(get_state_signature(copy(game_state)), get_state_signature(other))
+            self.assertIs(other.game, pickle.loads(pickle.dumps(copy(game_state))).game)  # Once per spec
+        # No live game with the spec is needed
+        spec = ("Keez", tuple((name + "2", color, location, team + "2")
+                              for name, color, location, team in self.game.spec[1]))
+        data = game_states[0].to_bytes()
+        other = _unpickle_game_state(GameState, data, spec)
+        self.assertEqual(spec, other.game.spec)
+        self.assertEqual(data, other.to_bytes())
+        game_states[0].game = None
+        with self.assertRaises(ValueError):
+            pickle.dumps(game_states[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
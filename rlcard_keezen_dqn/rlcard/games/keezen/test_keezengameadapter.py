@@ -0,0 +1,98 @@
+import pickle
+import unittest
+
+import numpy as np
+
+from rlcard.games.keezen.keezengameadapter import KeezenGameAdapter
+from rlcard.utils import seeding
+
+
+def get_legal_actions_per_action(adapter):
+    """The legal actions as generated before the legal moves table: the raw action of each allowed move."""
+    legal_moves_id = [adapter._ACTION_SPACE[move.get_raw_action(adapter.game, adapter.game_state)]
+                      for move in adapter.game.get_allowed_moves(adapter.game_state)]
+    if not legal_moves_id:
+        legal_moves_id.append(adapter._ACTION_SPACE['NO'])
+    return legal_moves_id
+
+
+def get_moves_for_action(adapter, action):
+    """The moves for the raw action as found before the legal moves table, by matching the raw action."""
+    return [move for move in adapter.game.get_allowed_moves(adapter.game_state)
+            if move.get_raw_action(adapter.game, adapter.game_state) == action]
+
+
+def get_marble_ids(move):
+    return [marble_move.marble.id_ for marble_move in move.marble_moves]
+
+
+class TestKeezenGameAdapter(unittest.TestCase):
+    """Test the adapter."""
+
+    def test_legal_moves_same_as_per_action(self):
+        adapter = KeezenGameAdapter()
+        adapter.np_random, _ = seeding.np_random(5)
+        np_random = np.random.RandomState(5)
+        for _ in range(3):
+            adapter.init_game()
+            while not adapter.is_over():
+                legal_actions = adapter.get_legal_actions(adapter._ACTION_SPACE)
+                self.assertEqual(get_legal_actions_per_action(adapter), legal_actions)
+                action = adapter._ACTION_LIST[np_random.choice(legal_actions)]
+                if action != 'NO':
+                    moves = get_moves_for_action(adapter, action)
+                    self.assertEqual(1, len(moves))
+                    self.assertEqual(str(moves[0]), str(adapter.legal_moves[adapter._ACTION_SPACE[action]]))
+                adapter.step(action)
+
+    def test_keez_simple_games(self):
+        game_type = KeezenGameAdapter.game_type
+        KeezenGameAdapter.game_type = "KeezSimple"
+        try:
+            adapter = KeezenGameAdapter()
+        finally:
+            KeezenGameAdapter.game_type = game_type
+        adapter.np_random, _ = seeding.np_random(6)
+        np_random = np.random.RandomState(6)
+        shared_actions = 0
+        for _ in range(3):
+            adapter.init_game()
+            while not adapter.is_over():
+                legal_actions = adapter.get_legal_actions(adapter._ACTION_SPACE)
+                # The allowed moves of each action, by the action index of the codec
+                marble_ranks = adapter.action_codec.get_marble_ranks(adapter.game_state)
+                moves_by_action = {}
+                for move in adapter.game.get_allowed_moves(adapter.game_state):
+                    action_idx = adapter.action_codec.get_action_index(move, marble_ranks, "KeezSimple")
+                    moves_by_action.setdefault(action_idx, []).append(move)
+                self.assertEqual(list(moves_by_action.keys()) or [adapter._ACTION_SPACE['NO']], legal_actions)
+                shared_actions += sum(1 for moves in moves_by_action.values() if len(moves) > 1)
+                action_idx = np_random.choice(legal_actions)
+                if action_idx in moves_by_action:
+                    # The switch with the lowest marble id of the opponent for an 'O' action of two moves
+                    self.assertEqual(min(get_marble_ids(move) for move in moves_by_action[action_idx]),
+                                     get_marble_ids(adapter.legal_moves[action_idx]))
+                adapter.step(adapter._ACTION_LIST[action_idx])
+        self.assertGreater(shared_actions, 0)
+
+    def test_pickle_state(self):
+        adapter = KeezenGameAdapter()
+        adapter.init_game()
+        for _ in range(20):
+            adapter.step(adapter._ACTION_LIST[adapter.get_legal_actions(adapter._ACTION_SPACE)[0]])
+        state = adapter.get_state(adapter.get_player_id())
+        other = pickle.loads(pickle.dumps(state))
+        # The board and the allowed moves are left out, the game state has them
+        self.assertEqual(set(state) - {'fields_with_marbles', 'allowed_moves'}, set(other))
+        self.assertEqual(state['legal_moves'], other['legal_moves'])
+        self.assertEqual(state['game_state'].to_bytes(), other['game_state'].to_bytes())
+        game = other['game_state'].game
+        marble_fields = {marble.id_: field.id_ for field, marble in state['fields_with_marbles'].items()}
+        self.assertEqual(marble_fields, {marble.id_: field.id_
+                                         for field, marble in other['game_state'].fields_with_marbles.items()})
+        self.assertEqual([str(move) for move in state['allowed_moves']],
+                         [str(move) for move in game.get_allowed_moves(other['game_state'])])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+from copy import copy
+
+import numpy as np
+
+from rlcard.games.keezen.board import FieldColor, Board, ArrayFieldsWithMarbles
+from rlcard.games.keezen.move import MoveType
+from rlcard.games.keezen.game import Game, ActionCodec
+from rlcard.games.keezen.player import Player, PlayerLocation, Team
+from rlcard.games.keezen.rules import Rules
+from rlcard.games.keezen.vector import VectorKeezenGame
+
+
+def get_state_signature(game_state, with_cards=True):
+    signature = (sorted((marble.id_, field.id_) for field, marble in game_state.fields_with_marbles.items()),
+                 sorted((player.name, color) for player, color in game_state.players_play_with_color.items()),
+                 game_state.deal_player.name, game_state.move_player.name, game_state.round_number,
+                 game_state.move_number)
+    if with_cards:
+        signature += ([card.id_ for card in game_state.stock_cards], [card.id_ for card in game_state.played_cards],
+                      sorted((player.name, [card.id_ for card in cards])
+                             for player, cards in game_state.player_cards.items()))
+    return signature
+
+
+class TestVectorKeezenGame(unittest.TestCase):
+    """Test that the batched games give the same legal actions and game states as Game."""
+
+    def setUp(self) -> None:
+        player_north = Player("Green", FieldColor.GREEN, PlayerLocation.NORTH)
+        player_east = Player("Red", FieldColor.RED, PlayerLocation.EAST)
+        player_south = Player("Blue", FieldColor.BLUE, PlayerLocation.SOUTH)
+        player_west = Player("Yellow", FieldColor.YELLOW, PlayerLocation.WEST)
+        self.players = [player_north, player_east, player_south, player_west]
+        Team("GreenBlue", [player_north, player_south])
+        Team("RedYellow", [player_east, player_west])
+
+    def check_same_as_game(self, game_type, steps):
+        game = Game(Rules(game_type), self.players, Board(self.players))
+        action_codec = ActionCodec(game)
+        vector_game = VectorKeezenGame(game, 16, seed=1)
+        observations, legal_masks = vector_game.reset()
+        rng = np.random.RandomState(2)
+        finished_games = 0
+        for _ in range(steps):
+            actions = []
+            expected = []
+            for index in range(vector_game.num_games):
+                game_state = vector_game.get_game_state(index)
+                # Legal actions, one move for each action like KeezenGameAdapter
+                marble_ranks = action_codec.get_marble_ranks(game_state)
+                moves = action_codec.get_legal_moves(game.get_allowed_moves(game_state), marble_ranks, game_type)
+                if not moves:
+                    moves[0] = None
+                self.assertEqual(sorted(moves.keys()), np.flatnonzero(legal_masks[index]).tolist())
+                # Same observation as the board planes of the game state
+                fields_with_marbles = ArrayFieldsWithMarbles(game.board_planes, game_state.fields_with_marbles)
+                fields_with_marbles.set_active_row(game.players.index(game_state.move_player))
+                np.testing.assert_array_equal(fields_with_marbles.get_observation(), observations[index])
+                action = rng.choice(sorted(moves.keys()))
+                actions.append(action)
+                # A deal with an empty stock shuffles the cards: the cards are not compared
+                with_cards = not (moves[action] and moves[action].move_type == MoveType.DEAL and
+                                  not game_state.stock_cards)
+                expected.append(game.step(moves[action], copy(game_state)) + (with_cards,))
+            observations, legal_masks, rewards, dones = vector_game.step(actions)
+            for index, (game_state, game_rewards, done, with_cards) in enumerate(expected):
+                self.assertEqual(done, dones[index])
+                if done:
+                    finished_games += 1
+                    self.assertEqual(game_rewards, rewards[index].tolist())
+                else:
+                    self.assertEqual(get_state_signature(game_state, with_cards),
+                                     get_state_signature(vector_game.get_game_state(index), with_cards))
+        return finished_games
+
+    def test_same_as_game(self):
+        self.check_same_as_game("Keez", 300)
+
+    def test_same_as_game_simple(self):
+        self.assertGreater(self.check_same_as_game("KeezSimple", 400), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
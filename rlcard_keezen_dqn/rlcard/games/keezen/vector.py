@@ -0,0 +1,517 @@
+# Batched lockstep simulation
+import numpy as np
+
+from rlcard.games.keezen.board import BoardState, FieldType, FieldsWithMarbles
+from rlcard.games.keezen.cardop import CardOpRun, CardOpStart, CardOpSwitchOneOwnMarble, CardOpSplitTwoMarbles
+from rlcard.games.keezen.game import GameState, ActionCodec
+from rlcard.games.keezen.move import MoveType
+from rlcard.utils import seeding
+
+
+class ActionKind:
+    NO = 0
+    DEAL = 1
+    THROW_CARDS = 2
+    RUN = 3
+    START = 4
+    SWITCH = 5
+    SPLIT = 6
+
+
+class VectorKeezenGame:
+    """Advances N independent Keezen games in lockstep. The marble positions, cards and turn data of all games are
+    NumPy arrays of shape (N, ...), the observations are returned as (N, 5, 97) and the legal actions as (N, actions)
+    masks. The RUN, START and SWITCH card operations are evaluated for all games at once with tables compiled from
+    the board paths; SPLIT moves (the 7 of "Keez") are generated per game by the card operations of the game.
+    Gives the same legal actions and resulting states as Game, the cards are shuffled with its own random state."""
+
+    auto_reset = True  # Reset finished games at the end of step
+
+    def __init__(self, game, num_games, seed=None):
+        """Create the batch for the rules, players, board and cards of a Game. The card operations of the game are
+        used for the SPLIT moves."""
+        self.game = game
+        self.num_games = num_games
+        self.np_random, _ = seeding.np_random(seed)
+        self.action_codec = ActionCodec(game)
+        self.game_type = game.rules.game_type
+        self.action_num = len(ActionCodec.ACTION_SPACES[self.game_type])
+        self._compile_tables()
+        self._arange = np.arange(num_games)
+
+        n = num_games
+        marble_count = len(self.marble_colors)
+        self.marble_fields = np.zeros((n, marble_count), dtype=np.int8)  # Marble id --> field id
+        self.field_marbles = np.full((n, len(game.board.fields)), -1, dtype=np.int8)  # Field id --> marble id or -1
+        self.stock_cards = np.zeros((n, len(game.cards)), dtype=np.int8)  # Card ids, the top card is the last one
+        self.stock_counts = np.zeros(n, dtype=np.int16)
+        self.played_cards = np.zeros((n, len(game.cards)), dtype=np.int8)
+        self.played_counts = np.zeros(n, dtype=np.int16)
+        self.player_cards = np.full((n, self.player_num, max(game.rules.cards_per_round)), -1, dtype=np.int8)
+        self.player_card_counts = np.zeros((n, self.player_num), dtype=np.int8)
+        self.players_play_with_color = np.zeros((n, self.player_num), dtype=np.int8)  # Player --> color index
+        self.deal_player = np.zeros(n, dtype=np.int8)
+        self.move_player = np.zeros(n, dtype=np.int8)
+        self.round_number = np.zeros(n, dtype=np.int32)
+        self.move_number = np.zeros(n, dtype=np.int32)
+        self.legal_masks = np.zeros((n, self.action_num), dtype=bool)
+        # Filled by _update_legal_masks, used by step
+        self._marble_ranks = None
+        self._marble_by_rank = None
+        self._start_marbles = None
+        self._switchable = None
+        self._switch_chars = None
+        self._split_moves = {}  # Game index --> {action index: Move}
+
+    def _compile_tables(self):
+        game = self.game
+        board = game.board
+        players = game.players
+        self.player_num = len(players)
+        colors = [player.player_color for player in players]  # Color index == index of the player with the color
+        self.marble_colors = np.array([colors.index(marble.color_) for marble in board.marbles])
+        self.color_marbles = np.array([[marble.id_ for marble in board.marbles_with_color[color]] for color in colors])
+        field_count = len(board.fields)
+        self.field_types = np.array([field.type_ for field in board.fields])
+        self.field_colors = np.array([colors.index(field.color_) if field.color_ in colors else -1
+                                      for field in board.fields])
+        self.track_fields = (self.field_types != FieldType.WAIT) & (self.field_types != FieldType.HOME)
+        self.home_fields = self.field_types == FieldType.HOME
+        self.wait_fields = np.array([[field.id_ for field in board.waitFields if field.color_ == color]
+                                     for color in colors])
+        self.start_fields = np.array([board.get_start_field_with_color(color).id_ for color in colors])
+        initial_board_state = BoardState.get_initial_board_state(board.marbles, board.waitFields)
+        self.initial_marble_fields = np.array([initial_board_state.marbles_with_fields[marble].id_
+                                               for marble in board.marbles])
+        self.field_columns = np.array(game.board_planes.field_columns)
+        self.marble_rows = np.array(game.board_planes.marble_rows)
+        self.observation_shape = game.board_planes.shape
+        self.field_progress = np.array([self.action_codec.field_progress[color] for color in colors])
+        self.next_players = np.array([players.index(player.get_next_player(players)) for player in players])
+        self.team_mates = np.array([players.index(player.get_team_mate()) for player in players])
+        self.card_values = np.array([card.card_value.value for card in game.cards])
+        self.cards_per_round = np.array(game.rules.cards_per_round)
+        # Switch: T (team mate), A (next player) or B of ActionCodec.get_action_key, by player and marble color
+        self.switch_chars = np.zeros((self.player_num, len(colors)), dtype=np.int8)
+        for player_idx, player in enumerate(players):
+            for color_idx, color in enumerate(colors):
+                if color == player.get_team_mate().player_color:
+                    self.switch_chars[player_idx, color_idx] = 0
+                elif color == player.get_next_player(players).player_color:
+                    self.switch_chars[player_idx, color_idx] = 1
+                else:
+                    self.switch_chars[player_idx, color_idx] = 2
+
+        # Card operations by card value, in the order of Rules.initialize_card_ops
+        run_ops, self.start_values, self.switch_values, self.split_values = [], [], [], []
+        for card in game.cards:
+            value = card.card_value.value
+            if any(value == run_value for run_value, _ in run_ops) or value in self.start_values + \
+                    self.switch_values + self.split_values:
+                continue
+            for card_op in game.card_ops[card]:
+                if isinstance(card_op, CardOpRun):
+                    run_ops.append((value, card_op.run_fields))
+                elif isinstance(card_op, CardOpStart):
+                    self.start_values.append(value)
+                elif isinstance(card_op, CardOpSwitchOneOwnMarble):
+                    self.switch_values.append(value)
+                elif isinstance(card_op, CardOpSplitTwoMarbles):
+                    self.split_values.append(value)
+                else:
+                    raise ValueError("Card operation not supported by VectorKeezenGame: " + type(card_op).__name__)
+        self.run_values = np.array([value for value, _ in run_ops], dtype=np.int64)
+
+        # Run paths: (color, from field, run op) --> destination field (-1 if no full path) and blocker fields,
+        # padded with field_count: a column of the blocking mask that is never set
+        max_blockers = max(len(blocker_indexes) for field in board.fields for _, blocker_indexes in field.paths.values())
+        self.run_destinations = np.full((len(colors), field_count, len(run_ops)), -1, dtype=np.int16)
+        self.run_blockers = np.full((len(colors), field_count, len(run_ops), max(max_blockers, 1)), field_count,
+                                    dtype=np.int16)
+        for color_idx, color in enumerate(colors):
+            for field in board.fields:
+                for op_idx, (_, run_fields) in enumerate(run_ops):
+                    path, blocker_indexes = field.paths[(color, run_fields)]
+                    if len(path) == abs(run_fields):
+                        self.run_destinations[color_idx, field.id_, op_idx] = path[-1].id_
+                    for blocker, index in enumerate(blocker_indexes):
+                        self.run_blockers[color_idx, field.id_, op_idx, blocker] = path[index].id_
+
+        # Action indexes (-1 if not in the action space) and the decoding of each action index
+        column = self.action_codec.space_columns[self.game_type]
+
+        def get_action_index(key):
+            return self.action_codec.action_indexes.get(key, [-1] * len(self.action_codec.space_columns))[column]
+
+        ranks = range(len(self.color_marbles[0]))
+        self.run_indexes = np.array([[get_action_index((MoveType.RUN, value, rank)) for rank in ranks]
+                                     for value, _ in run_ops], dtype=np.int16).reshape(len(run_ops), len(ranks))
+        self.start_indexes = np.array([[get_action_index((MoveType.START, value, rank)) for rank in ranks]
+                                       for value in self.start_values], dtype=np.int16).reshape(-1, len(ranks))
+        self.switch_indexes = np.array([[[[get_action_index((MoveType.SWITCH, value, rank1, char, rank2))
+                                           for rank2 in ranks] for char in "TAB"] for rank1 in ranks]
+                                        for value in self.switch_values], dtype=np.int16)\
+            .reshape(-1, len(ranks), 3, len(ranks))
+        self.action_kinds = np.zeros(self.action_num, dtype=np.int8)
+        self.action_ops = np.zeros(self.action_num, dtype=np.int8)  # Index in the operations of the kind
+        self.action_ranks = np.zeros(self.action_num, dtype=np.int8)
+        self.no_index = get_action_index(("NO",))
+        self.deal_index = get_action_index((MoveType.DEAL,))
+        self.throw_cards_index = get_action_index((MoveType.THROW_CARDS,))
+        self.action_kinds[self.deal_index] = ActionKind.DEAL
+        self.action_kinds[self.throw_cards_index] = ActionKind.THROW_CARDS
+        for action_kind, indexes in [(ActionKind.RUN, self.run_indexes), (ActionKind.START, self.start_indexes),
+                                     (ActionKind.SWITCH, self.switch_indexes)]:
+            for index, action_idx in np.ndenumerate(indexes):
+                if action_idx >= 0:
+                    self.action_kinds[action_idx] = action_kind
+                    self.action_ops[action_idx] = index[0]
+                    self.action_ranks[action_idx] = index[1]
+        for action_idx, raw_action in enumerate(ActionCodec.ACTION_SPACES[self.game_type]):
+            if raw_action.startswith(ActionCodec.TYPE_CODES[MoveType.SPLIT]):
+                self.action_kinds[action_idx] = ActionKind.SPLIT
+
+    def reset(self, indexes=None):
+        """Starts new games, all games or the games at the indexes. Returns the observations and legal masks."""
+        if indexes is None:
+            indexes = self._arange
+        self._init_games(np.asarray(indexes))
+        self._update_legal_masks()
+        return self.get_observations(), self.legal_masks.copy()
+
+    def step(self, actions):
+        """Does the action (index) for each game. Returns the observations, legal masks, rewards (N, players) and
+        done flags. With auto_reset the finished games are started again: their observation is of the new game."""
+        actions = np.asarray(actions)
+        if not self.legal_masks[self._arange, actions].all():
+            illegal = np.flatnonzero(~self.legal_masks[self._arange, actions])
+            raise ValueError("Illegal actions for games " + str(illegal.tolist()))
+        kinds = self.action_kinds[actions]
+        move_players = self.move_player.copy()
+        for action_kind, play_move in [(ActionKind.RUN, self._play_runs), (ActionKind.START, self._play_starts),
+                                       (ActionKind.SWITCH, self._play_switches),
+                                       (ActionKind.SPLIT, self._play_splits),
+                                       (ActionKind.THROW_CARDS, self._throw_cards), (ActionKind.DEAL, self._deal)]:
+            indexes = np.flatnonzero(kinds == action_kind)
+            if len(indexes):
+                play_move(indexes, actions[indexes])
+        played = (kinds != ActionKind.NO) & (kinds != ActionKind.DEAL)
+        if self.game.rules.switch_color:
+            self._switch_colors(np.flatnonzero(played))
+        self.move_number[played] += 1
+        dones, rewards = self.is_over()
+        # Next move player
+        is_deal = kinds == ActionKind.DEAL
+        self.move_player[is_deal] = self.next_players[self.deal_player[is_deal]]
+        self.move_player[~is_deal] = self.next_players[move_players[~is_deal]]
+        if self.auto_reset and dones.any():
+            self._init_games(np.flatnonzero(dones))
+        self._update_legal_masks()
+        return self.get_observations(), self.legal_masks.copy(), rewards, dones
+
+    def is_over(self) -> (np.ndarray, np.ndarray):
+        """Returns the done flags and rewards (N, players) of Game.is_over for the move player of each game."""
+        finished = self.get_home_counts() == self.game.rules.finish_marble_nrs
+        move_players = self.move_player
+        player_finished = finished[self._arange, self.players_play_with_color[self._arange, move_players]]
+        rewards = np.zeros((self.num_games, self.player_num), dtype=int)
+        if self.game.rules.switch_color:
+            team_mates = self.team_mates[move_players]
+            dones = player_finished & finished[self._arange, self.players_play_with_color[self._arange, team_mates]]
+            rewards[self._arange[dones], team_mates[dones]] = 1
+        else:
+            dones = player_finished
+        rewards[self._arange[dones], move_players[dones]] = 1
+        return dones, rewards
+
+    def get_home_counts(self) -> np.ndarray:
+        """Returns the number of marbles at the home fields (N, colors)."""
+        return self.home_fields[self.marble_fields][:, self.color_marbles].sum(axis=2)
+
+    def get_observations(self) -> np.ndarray:
+        """Returns the observation planes of the move player of each game, the same as KeezenEnv (N, 5, 97)."""
+        observations = np.zeros((self.num_games,) + self.observation_shape, dtype=np.int8)
+        columns = self.field_columns[self.marble_fields]
+        observations[self._arange[:, None], self.marble_rows[None, :], columns] = 1
+        observations[self._arange[:, None], self.observation_shape[0] - 1, columns] = 1
+        observations[self._arange, self.move_player, 0] = 1
+        return observations
+
+    def get_game_state(self, index) -> GameState:
+        """Returns the game at the index as GameState of the game."""
+        cards = self.game.cards
+        players = self.game.players
+        player_cards = {player: [cards[card_id] for card_id in
+                                 self.player_cards[index, player_idx, :self.player_card_counts[index, player_idx]]]
+                        for player_idx, player in enumerate(players)}
+        players_play_with_color = {player: players[color_idx].player_color for player, color_idx in
+                                   zip(players, self.players_play_with_color[index])}
+        game_state = GameState(self._get_fields_with_marbles(index), [cards[card_id] for card_id in
+                                                     self.stock_cards[index, :self.stock_counts[index]]],
+                               player_cards, [cards[card_id] for card_id in
+                                              self.played_cards[index, :self.played_counts[index]]],
+                               players_play_with_color, players[self.deal_player[index]],
+                               players[self.move_player[index]], int(self.round_number[index]),
+                               int(self.move_number[index]))
+        game_state.game = self.game
+        return game_state
+
+    def _get_fields_with_marbles(self, index) -> FieldsWithMarbles:
+        board = self.game.board
+        return FieldsWithMarbles({board.fields[field_id]: board.marbles[marble_id]
+                                  for marble_id, field_id in enumerate(self.marble_fields[index])})
+
+    def _init_games(self, indexes):
+        """All marbles at the wait fields, cards shuffled and dealt, like Game.init_game."""
+        self.field_marbles[indexes] = -1
+        self.marble_fields[indexes] = self.initial_marble_fields
+        self.field_marbles[indexes[:, None], self.initial_marble_fields[None, :]] = np.arange(len(self.marble_colors))
+        self._shuffle_stock(indexes)
+        self.played_counts[indexes] = 0
+        self.player_cards[indexes] = -1
+        self.player_card_counts[indexes] = 0
+        self.players_play_with_color[indexes] = np.arange(self.player_num)
+        self.deal_player[indexes] = self.game.rules.player_start
+        self.move_player[indexes] = self.next_players[self.game.rules.player_start]
+        self.round_number[indexes] = 0
+        self.move_number[indexes] = 0
+        self._deal_cards(indexes)
+
+    def _shuffle_stock(self, indexes):
+        card_count = self.stock_cards.shape[1]
+        self.stock_cards[indexes] = np.argsort(self.np_random.random_sample((len(indexes), card_count)), axis=1)
+        self.stock_counts[indexes] = card_count
+
+    def _deal_cards(self, indexes):
+        """Deals the cards of the round, one card at a time starting with the player after the deal player."""
+        card_numbers = self.cards_per_round[self.round_number[indexes] % len(self.cards_per_round)]
+        for card_idx in range(card_numbers.max(initial=0)):
+            dealing = indexes[card_numbers > card_idx]
+            player = self.deal_player[dealing]
+            for _ in range(self.player_num):
+                player = self.next_players[player]
+                self.stock_counts[dealing] -= 1
+                card_counts = self.player_card_counts[dealing, player]
+                self.player_cards[dealing, player, card_counts] = self.stock_cards[dealing, self.stock_counts[dealing]]
+                self.player_card_counts[dealing, player] = card_counts + 1
+
+    def _update_legal_masks(self):
+        """Computes the legal masks of all games and what is needed to play the legal actions."""
+        arange = self._arange
+        masks = self.legal_masks
+        masks[:] = False
+        move_players = self.move_player
+        colors = self.players_play_with_color[arange, move_players]
+        self._update_marble_ranks()
+        marbles = self.color_marbles[colors]  # (N, 4) marbles of the color the move player plays with
+        marble_fields = self.marble_fields[arange[:, None], marbles]
+        marble_ranks = self._marble_ranks[arange[:, None], marbles]
+        hand = self.player_cards[arange, move_players]
+        has_value = np.zeros((self.num_games, self.card_values.max() + 1), dtype=bool)
+        has_value[arange[:, None], np.where(hand >= 0, self.card_values[hand], 0)] = True
+        has_value[:, 0] = False
+        occupied = self.field_marbles >= 0
+        # Blocking: a marble on a START or HOME field of its own color
+        blocking = np.zeros((self.num_games, self.field_marbles.shape[1] + 1), dtype=bool)
+        blocking[:, :-1] = occupied & (self.marble_colors[self.field_marbles] == self.field_colors[None, :])
+
+        if len(self.run_values):
+            destinations = self.run_destinations[colors[:, None], marble_fields]  # (N, 4, run ops)
+            blocked = blocking[arange[:, None, None, None], self.run_blockers[colors[:, None], marble_fields]].any(-1)
+            valid = (destinations >= 0) & ~blocked & has_value[:, self.run_values][:, None, :]
+            action_indexes = self.run_indexes[np.arange(len(self.run_values))[None, None, :], marble_ranks[:, :, None]]
+            self._set_legal(valid, action_indexes)
+
+        if self.start_values:
+            start_fields = self.start_fields[colors]
+            marble_on_start = self.field_marbles[arange, start_fields]
+            start_free = (marble_on_start < 0) | (self.marble_colors[marble_on_start] != colors)
+            waiting = self.field_types[marble_fields] == FieldType.WAIT
+            first_waiting = waiting.argmax(axis=1)
+            self._start_marbles = marbles[arange, first_waiting]
+            start_ranks = marble_ranks[arange, first_waiting]
+            can_start = start_free & waiting.any(axis=1)
+            for op_idx, value in enumerate(self.start_values):
+                self._set_legal(can_start & has_value[:, value], self.start_indexes[op_idx, start_ranks])
+
+        if self.switch_values:
+            fields = self.marble_fields
+            # CardOpSwitchOneOwnMarble.is_marble_switchable, for the marbles of the other colors
+            self._switchable = self.track_fields[fields] & (self.marble_colors[None, :] != colors[:, None]) & \
+                ~((self.field_types[fields] == FieldType.START) & (self.field_colors[fields] == self.marble_colors))
+            self._switch_chars = self.switch_chars[move_players][:, self.marble_colors]  # (N, marbles)
+            own_switchable = self.track_fields[marble_fields]
+            for op_idx, value in enumerate(self.switch_values):
+                valid = has_value[:, value][:, None, None] & own_switchable[:, :, None] & self._switchable[:, None, :]
+                action_indexes = self.switch_indexes[op_idx, marble_ranks[:, :, None], self._switch_chars[:, None, :],
+                                                     self._marble_ranks[:, None, :]]
+                self._set_legal(valid, action_indexes)
+
+        self._split_moves = {}
+        for value in self.split_values:
+            for index in np.flatnonzero(has_value[:, value]):
+                self._update_split_moves(index, value)
+
+        # No marble moves: throw the cards, deal when the round is over or no move ('NO')
+        no_moves = ~masks.any(axis=1)
+        if no_moves.any():
+            has_cards = self.player_card_counts[arange, move_players] > 0
+            masks[no_moves & has_cards, self.throw_cards_index] = True
+            can_deal = no_moves & ~has_cards & (self.player_card_counts == 0).all(axis=1) & ~self.is_over()[0]
+            masks[can_deal, self.deal_index] = True
+            masks[no_moves & ~has_cards & ~can_deal, self.no_index] = True
+
+    def _set_legal(self, valid, action_indexes):
+        game_indexes = np.broadcast_to(self._arange.reshape((-1,) + (1,) * (valid.ndim - 1)), valid.shape)[valid]
+        action_indexes = action_indexes[valid]
+        if (action_indexes < 0).any():
+            raise KeyError("Moves not in action space " + self.game_type)
+        self.legal_masks[game_indexes, action_indexes] = True
+
+    def _update_marble_ranks(self):
+        """Progress rank of each marble within its color, like ActionCodec.get_marble_ranks."""
+        progress = self.field_progress[self.marble_colors[None, :], self.marble_fields][:, self.color_marbles]
+        ranks = (progress[:, :, None, :] > progress[:, :, :, None]).sum(axis=3)  # (N, colors, marbles of color)
+        self._marble_ranks = np.zeros_like(self.marble_fields)
+        self._marble_ranks[:, self.color_marbles] = ranks
+        self._marble_by_rank = np.zeros_like(ranks)
+        self._marble_by_rank[self._arange[:, None, None], np.arange(len(self.color_marbles))[None, :, None], ranks] = \
+            self.color_marbles[None, :, :]
+
+    def _update_split_moves(self, index, value):
+        """SPLIT moves of the first card with the value, by the card operations of the game."""
+        game = self.game
+        fields_with_marbles = self._get_fields_with_marbles(index)
+        player_idx = self.move_player[index]
+        player = game.players[player_idx]
+        card = next(game.cards[card_id] for card_id in self.player_cards[index, player_idx]
+                    if card_id >= 0 and self.card_values[card_id] == value)
+        plays_with_color = game.players[self.players_play_with_color[index, player_idx]].player_color
+        moves = []
+        for card_op in game.card_ops[card]:
+            moves.extend(card_op.get_moves(player, plays_with_color, card, fields_with_marbles))
+        marble_ranks = self._marble_ranks[index].tolist()
+        split_moves = self._split_moves.setdefault(index, {})
+        for action_idx, move in self.action_codec.get_legal_moves(moves, marble_ranks, self.game_type).items():
+            if action_idx not in split_moves:
+                split_moves[action_idx] = move
+                self.legal_masks[index, action_idx] = True
+
+    def _play_runs(self, indexes, actions):
+        op_indexes = self.action_ops[actions]
+        colors = self.players_play_with_color[indexes, self.move_player[indexes]]
+        marbles = self._marble_by_rank[indexes, colors, self.action_ranks[actions]]
+        to_fields = self.run_destinations[colors, self.marble_fields[indexes, marbles], op_indexes]
+        self._move_marbles(indexes, marbles, to_fields)
+        self._play_cards(indexes, self.run_values[op_indexes])
+
+    def _play_starts(self, indexes, actions):
+        colors = self.players_play_with_color[indexes, self.move_player[indexes]]
+        self._move_marbles(indexes, self._start_marbles[indexes], self.start_fields[colors])
+        self._play_cards(indexes, np.array(self.start_values)[self.action_ops[actions]])
+
+    def _play_switches(self, indexes, actions):
+        op_indexes = self.action_ops[actions]
+        colors = self.players_play_with_color[indexes, self.move_player[indexes]]
+        marbles = self._marble_by_rank[indexes, colors, self.action_ranks[actions]]
+        # The other marble: the switchable marble with the lowest id with the action, like ActionCodec.get_legal_moves
+        action_indexes = self.switch_indexes[op_indexes[:, None], self._marble_ranks[indexes, marbles][:, None],
+                                             self._switch_chars[indexes], self._marble_ranks[indexes]]
+        other_marbles = (self._switchable[indexes] & (action_indexes == actions[:, None])).argmax(axis=1)
+        fields = self.marble_fields[indexes, marbles]
+        other_fields = self.marble_fields[indexes, other_marbles]
+        self.marble_fields[indexes, marbles] = other_fields
+        self.marble_fields[indexes, other_marbles] = fields
+        self.field_marbles[indexes, other_fields] = marbles
+        self.field_marbles[indexes, fields] = other_marbles
+        self._play_cards(indexes, np.array(self.switch_values)[op_indexes])
+
+    def _play_splits(self, indexes, actions):
+        card_values = []
+        for index, action_idx in zip(indexes, actions):
+            move = self._split_moves[index][action_idx]
+            for marble_move in move.marble_moves:
+                self._put_marble_on_field(index, marble_move.marble.id_, marble_move.to_field.id_)
+                for hit_marble_move in marble_move.hit_marble_moves:
+                    self._put_marble_on_field(index, hit_marble_move.marble.id_, hit_marble_move.to_field.id_)
+            card_values.append(move.cards[0].card_value.value)
+        self._play_cards(indexes, np.array(card_values))
+
+    def _put_marble_on_field(self, index, marble, field):
+        """BoardState.put_marble_on_field for one game: a marble that was on the field is not on a field anymore."""
+        from_field = self.marble_fields[index, marble]
+        if from_field == field:
+            return
+        if from_field >= 0 and self.field_marbles[index, from_field] == marble:
+            self.field_marbles[index, from_field] = -1
+        marble_on_field = self.field_marbles[index, field]
+        if marble_on_field >= 0:
+            self.marble_fields[index, marble_on_field] = -1
+        self.field_marbles[index, field] = marble
+        self.marble_fields[index, marble] = field
+
+    def _move_marbles(self, indexes, marbles, to_fields):
+        """Moves a marble in each game, a marble on the destination field goes to the first free wait field."""
+        hit_marbles = self.field_marbles[indexes, to_fields]
+        hit = hit_marbles >= 0
+        if hit.any():
+            hit_indexes = indexes[hit]
+            hit_marbles = hit_marbles[hit]
+            wait_fields = self.wait_fields[self.marble_colors[hit_marbles]]
+            free_wait_fields = wait_fields[np.arange(len(hit_indexes)),
+                                           (self.field_marbles[hit_indexes[:, None], wait_fields] < 0).argmax(axis=1)]
+        self.field_marbles[indexes, self.marble_fields[indexes, marbles]] = -1
+        self.field_marbles[indexes, to_fields] = marbles
+        self.marble_fields[indexes, marbles] = to_fields
+        if hit.any():
+            self.field_marbles[hit_indexes, free_wait_fields] = hit_marbles
+            self.marble_fields[hit_indexes, hit_marbles] = free_wait_fields
+
+    def _play_cards(self, indexes, card_values):
+        """Plays the first card with the value from the hand of the move player of each game."""
+        players = self.move_player[indexes]
+        hands = self.player_cards[indexes, players]
+        card_indexes = (np.where(hands >= 0, self.card_values[hands], 0) == card_values[:, None]).argmax(axis=1)
+        self.played_cards[indexes, self.played_counts[indexes]] = hands[np.arange(len(indexes)), card_indexes]
+        self.played_counts[indexes] += 1
+        positions = np.arange(hands.shape[1])
+        source_positions = np.minimum(positions + (positions >= card_indexes[:, None]), hands.shape[1] - 1)
+        hands = np.take_along_axis(hands, source_positions, axis=1)
+        hands[:, -1] = -1
+        self.player_cards[indexes, players] = hands
+        self.player_card_counts[indexes, players] -= 1
+
+    def _throw_cards(self, indexes, actions):
+        """Plays all cards of the move player of each game."""
+        for index in indexes:
+            player = self.move_player[index]
+            card_count = self.player_card_counts[index, player]
+            played_count = self.played_counts[index]
+            self.played_cards[index, played_count:played_count + card_count] = \
+                self.player_cards[index, player, :card_count]
+            self.played_counts[index] += card_count
+        self.player_cards[indexes, self.move_player[indexes]] = -1
+        self.player_card_counts[indexes, self.move_player[indexes]] = 0
+
+    def _deal(self, indexes, actions):
+        """The next round: a new deal player, the stock is reset and shuffled when empty."""
+        self.round_number[indexes] += 1
+        empty_stock = indexes[self.stock_counts[indexes] == 0]
+        if len(empty_stock):
+            self._shuffle_stock(empty_stock)  # All cards are played when the round is over
+            self.played_counts[empty_stock] = 0
+        if self.game.rules.rotate_dealer_each_round:
+            self.deal_player[indexes] = self.next_players[self.deal_player[indexes]]
+        else:
+            self.deal_player[empty_stock] = self.next_players[self.deal_player[empty_stock]]
+        self._deal_cards(indexes)
+
+    def _switch_colors(self, indexes):
+        """After a move: a player whose own marbles are all home plays with the marbles of the team mate."""
+        finished = self.get_home_counts()[indexes] == self.game.rules.finish_marble_nrs
+        players = self.move_player[indexes]
+        team_mates = self.team_mates[players]
+        arange = np.arange(len(indexes))
+        switch = finished[arange, players] & ~finished[arange, team_mates] & \
+            (self.players_play_with_color[indexes, players] == players)
+        self.players_play_with_color[indexes[switch], players[switch]] = team_mates[switch]
@@ -4,6 +4,7 @@ import random
 from rlcard.games.mejn.board import Board, BoardState, FieldType
 from rlcard.games.mejn.move import Move, MoveType, MarbleMove
 from rlcard.games.mejn.player import Player
+from rlcard.utils import seeding
 
 from colorama import Fore, Style
 
@@ -19,17 +20,44 @@ class Game:
         self.players = players
         self.board = board
         self.game_history = []  # [GamePosition]
+        self.np_random = None
+
+    @property
+    def spec(self):
+        """The name, color and location of each player: enough to create a game with the same players and board (see
+        from_spec). Pickled game states carry the spec of their game."""
+        return tuple((player.name, player.player_color, player.location) for player in self.players)
+
+    @classmethod
+    def from_spec(cls, spec):
+        """Creates a game with the players of the spec, see spec."""
+        players = [Player(name, player_color, location) for name, player_color, location in spec]
+        return cls(players, Board(players))
+
+    @property
+    def np_random(self):
+        return self._np_random
+
+    @np_random.setter
+    def np_random(self, np_random):
+        """The RandomState of the game (see Env._seed) for the dice, None to use the random module."""
+        self._np_random = np_random
+        self.random_buffer = seeding.RandomBuffer(np_random) if np_random is not None else None
 
     def init_game(self):
         """Initializes the game. All marbles at wait fields, cards in stock."""
         self.game_history.clear()
-        move_number = 0
-        fields_with_marbles = BoardState.get_initial_board_state(self.board.marbles, self.board.waitFields)
-        move_player = self.players[0]
-        game_state = GameState(fields_with_marbles, move_player, move_number, self.throw_dice())
+        game_state = self._new_game_state()
         if self.KEEP_HISTORY:
             self.game_history.append(game_state)
-        return game_state, self.players.index(move_player)
+        return game_state, self.players.index(game_state.move_player)
+
+    def _new_game_state(self):
+        """The game state at the start of a game, the dice thrown for the first player."""
+        fields_with_marbles = BoardState.get_initial_board_state(self.board.marbles, self.board.waitFields)
+        game_state = GameState(fields_with_marbles, self.players[0], 0, self.throw_dice())
+        game_state.game = self
+        return game_state
 
     def render(self, game_state):
         field_idx = [[68, 69, -1, -1, 67, 4, 5, -1, -1, 14, 15],
@@ -111,6 +139,8 @@ class Game:
         return allowed_moves
 
     def throw_dice(self) -> int:
+        if self.random_buffer is not None:
+            return self.random_buffer.randint(1, 7)
         return random.randint(1, 6)
 
     def _get_hit_marble_moves(self, marble_move, fields_with_marbles) -> []:
@@ -122,6 +152,16 @@ class Game:
 
     def step(self, move, game_state) -> ():  # GamePosition, reward, done, info: [String: String]):
         """Return next state and next player's id"""
+        done, rewards = self.play(move, game_state)
+        copy_game_state = copy(game_state)
+        if self.KEEP_HISTORY:
+            copy_game_state.last_move = move
+            self.game_history.append(copy_game_state)
+        return copy_game_state, rewards, done
+
+    def play(self, move, game_state) -> ():
+        """Does a move on the game state in place and throws the dice for the next move, like step but without
+        copy and history. Returns the done flag and the rewards (None if not done)."""
         if move:
             for marble_move in move.marble_moves:
                 _ = BoardState.put_marble_on_field(marble_move.marble, marble_move.to_field,
@@ -134,11 +174,7 @@ class Game:
         if not done and game_state.dice != 6:
             game_state.move_player = game_state.move_player.get_next_player(self.players)
         game_state.dice = self.throw_dice()
-        copy_game_state = copy(game_state)
-        if self.KEEP_HISTORY:
-            copy_game_state.last_move = move
-            self.game_history.append(copy_game_state)
-        return copy_game_state, rewards, done
+        return done, rewards
 
     def is_over(self, game_state):
         """Returns if the game is over. All marbles of a team are at the home fields.
@@ -174,13 +210,47 @@ class GameState:
         self.move_number = move_number
         self.dice = dice
         self.last_move = None
+        self.game = None  # The game of the players and marbles, used by to_bytes and pickle
 
     def __copy__(self):
         new_one = type(self)(self.fields_with_marbles, self.move_player, self.move_number, self.dice)
+        new_one.game = self.game
         return new_one
 
+    def __reduce__(self):
+        data = self.to_bytes()
+        return _unpickle_game_state, (type(self), data, self.game.spec)
+
+    def to_bytes(self, game=None):
+        """Encodes the game state in 20 bytes: the field id of each marble, the move player, the dice and the move
+        number (2 bytes). The players and marbles are resolved against the game, the game of the game state by
+        default."""
+        game = game or self.game
+        if game is None:
+            raise ValueError("The game state has no game to encode the players and marbles with.")
+        data = bytearray([255] * len(game.board.marbles))
+        for field, marble in self.fields_with_marbles.items():
+            data[marble.id_] = field.id_
+        data.append(game.players.index(self.move_player))
+        data.append(self.dice)
+        return bytes(data + self.move_number.to_bytes(2, 'little'))
+
+    @classmethod
+    def from_bytes(cls, data, game):
+        """Decodes a game state encoded by to_bytes, with the players, fields and marbles of the game."""
+        if game is None:
+            raise ValueError("A game is needed to decode the players and marbles of a game state.")
+        marbles = game.board.marbles
+        fields_with_marbles = {game.board.fields[field_id]: marble
+                               for marble, field_id in zip(marbles, data[:len(marbles)]) if field_id != 255}
+        offset = len(marbles)
+        move_number = int.from_bytes(data[offset + 2:offset + 4], 'little')
+        game_state = cls(fields_with_marbles, game.players[data[offset]], move_number, data[offset + 1])
+        game_state.game = game
+        return game_state
+
     def get_state_for_player(self, player: Player):
-        state = dict()
+        state = PlayerState()
         state['state_for_player'] = player
         state['fields_with_marbles'] = dict(self.fields_with_marbles)
         state['move_player'] = self.move_player
@@ -189,6 +259,30 @@ class GameState:
         return state
 
 
+class PlayerState(dict):
+    """The state of a game state for a player, see GameState.get_state_for_player. The board (fields_with_marbles)
+    and the allowed moves refer to the Field objects of the whole board: they are left out when pickled, the game
+    state in the player state is pickled compactly and has the same board."""
+
+    UNPICKLED_KEYS = ('fields_with_marbles', 'allowed_moves')
+
+    def __reduce__(self):
+        return PlayerState, (), None, None, ((key, value) for key, value in self.items()
+                                             if key not in PlayerState.UNPICKLED_KEYS)
+
+
+_spec_games = {}  # Spec --> game created from the spec, decodes the unpickled game states of games with the spec
+
+
+def _unpickle_game_state(cls, data, game_spec):
+    """Decodes a pickled game state with a game created from the spec of its game, once per process. The game state
+    does not refer to the game it was pickled from: see GameState.from_bytes to decode it with another game."""
+    game = _spec_games.get(game_spec)
+    if game is None:
+        game = _spec_games[game_spec] = Game.from_spec(game_spec)
+    return cls.from_bytes(data, game)
+
+
 class GameActions:
     ALL_ACTIONS_29 = ['NO', 'RU01P0', 'RU01P1', 'RU01P2', 'RU01P3', 'RU02P0', 'RU02P1', 'RU02P2', 'RU02P3', 'RU03P0',
                       'RU03P1', 'RU03P2', 'RU03P3', 'RU04P0', 'RU04P1', 'RU04P2', 'RU04P3', 'RU05P0', 'RU05P1',
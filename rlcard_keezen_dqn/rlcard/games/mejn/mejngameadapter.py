@@ -7,9 +7,13 @@ class MejnGameAdapter:
     """Adapter class to use the Mejn game in RLCard. The state and actions are converted to dict and ints."""
 
     game_type = "Mejn"  # "MejnBackwards"  # or "Mejn"
+    lean_state = False  # True for states with only the player and the game state, see get_state
 
-    def __init__(self, allow_step_back=False):
+    def __init__(self, allow_step_back=False, lean_state=None):
         self.allow_step_back = allow_step_back
+        if lean_state is None:
+            lean_state = MejnGameAdapter.lean_state
+        self.lean_state = lean_state
         player_north = Player("Green", FieldColor.GREEN, PlayerLocation.NORTH)
         player_east = Player("Red", FieldColor.RED, PlayerLocation.EAST)
         player_south = Player("Blue", FieldColor.BLUE, PlayerLocation.SOUTH)
@@ -33,6 +37,15 @@ class MejnGameAdapter:
 
         # self.legal_moves = {}  # actionid --> move  CHANGED: NO MEMBER VARIABLE self.legal_moves
 
+    @property
+    def np_random(self):
+        return self.game.np_random
+
+    @np_random.setter
+    def np_random(self, np_random):
+        """Set on the game, the dice are thrown with it."""
+        self.game.np_random = np_random
+
     def init_game(self):
         self.game_state, player_idx = self.game.init_game()
         player_state = self.get_state(player_idx)
@@ -64,6 +77,8 @@ class MejnGameAdapter:
             return player_state, player_idx
 
     def get_state(self, player_idx):
+        if self.lean_state:  # No copy of the board, no allowed moves
+            return {'state_for_player': self.game.players[player_idx], 'game_state': self.game_state}
         player_state = self.game_state.get_state_for_player(self.game.players[player_idx])
         allowed_moves = self.game.get_allowed_moves(self.game_state)
         # CHANGED: NO MEMBER VARIABLE self.legal_moves
@@ -115,6 +130,10 @@ class MejnGameAdapter:
     #                 legal_action_idx.append(action_idx)
     #     return legal_action_idx
 
+    def get_allowed_moves(self):
+        """The allowed moves of the current game state."""
+        return self.game.get_allowed_moves(self.game_state)
+
     def get_legal_actions(self, action_space) -> [int]:  # No member variable self.legal_moves
         allowed_moves = self.game.get_allowed_moves(self.game_state)
         legal_moves_id = []
@@ -0,0 +1,108 @@
+import pickle
+import random
+import unittest
+from copy import copy
+
+from rlcard.games.mejn.board import FieldColor, Board
+from rlcard.games.mejn.game import Game, GameState, _unpickle_game_state
+from rlcard.games.mejn.player import Player, PlayerLocation
+from rlcard.games.mejn.playout import playout
+from rlcard.utils import seeding
+
+
+def get_state_signature(game_state):
+    return (sorted((field.id_, marble.id_) for field, marble in game_state.fields_with_marbles.items()),
+            game_state.move_player.name, game_state.move_number, game_state.dice, game_state.last_move)
+
+
+class TestGame(unittest.TestCase):
+    """Test the game."""
+
+    def setUp(self) -> None:
+        self.game = self.create_game()
+        self.players = self.game.players
+
+    @staticmethod
+    def create_game():
+        player_north = Player("Green", FieldColor.GREEN, PlayerLocation.NORTH)
+        player_east = Player("Red", FieldColor.RED, PlayerLocation.EAST)
+        player_south = Player("Blue", FieldColor.BLUE, PlayerLocation.SOUTH)
+        player_west = Player("Yellow", FieldColor.YELLOW, PlayerLocation.WEST)
+        players = [player_north, player_east, player_south, player_west]
+        return Game(players, Board(players))
+
+    def test_to_bytes(self):
+        random.seed(7)
+        game_state, _ = self.game.init_game()
+        for _ in range(80):
+            moves = self.game.get_allowed_moves(game_state)
+            game_state, _, _ = self.game.step(random.choice(moves) if moves else None, game_state)
+            data = game_state.to_bytes()
+            self.assertEqual(20, len(data))
+            for other in [GameState.from_bytes(data, self.game), pickle.loads(pickle.dumps(game_state))]:
+                self.assertEqual(get_state_signature(copy(game_state)), get_state_signature(other))
+                self.assertEqual(data, other.to_bytes())
+
+    def test_pickle_with_two_games(self):
+        """A game state is decoded with a game created from the spec of its own game, not with a live game."""
+        players = [Player(name, player.player_color, player.location) for name, player in zip("ABCD", self.players)]
+        other_game = Game(players, Board(players))
+        random.seed(3)
+        game_states = []
+        for game in [self.game, other_game]:
+            game_state, _ = game.init_game()
+            for _ in range(30):
+                moves = game.get_allowed_moves(game_state)
+                game_state, _, _ = game.step(random.choice(moves) if moves else None, game_state)
+            game_states.append(game_state)
+        for game, game_state in zip([self.game, other_game], game_states):
+            other = pickle.loads(pickle.dumps(game_state))
+            self.assertIsNot(game, other.game)
+            self.assertEqual(game.spec, other.game.spec)
+            self.assertEqual(get_state_signature(copy(game_state)), get_state_signature(other))
+            self.assertIs(other.game, pickle.loads(pickle.dumps(copy(game_state))).game)  # Once per spec
+        # No live game with the spec is needed
+        spec = tuple((name + "2", color, location) for name, color, location in self.game.spec)
+        data = game_states[0].to_bytes()
+        other = _unpickle_game_state(GameState, data, spec)
+        self.assertEqual(spec, other.game.spec)
+        self.assertEqual(data, other.to_bytes())
+        # The state for a player is pickled without the board, the game state has it
+        state = game_states[0].get_state_for_player(self.players[0])
+        state['game_state'] = game_states[0]
+        other = pickle.loads(pickle.dumps(state))
+        self.assertEqual(set(state) - {'fields_with_marbles'}, set(other))
+        self.assertEqual(get_state_signature(copy(game_states[0])), get_state_signature(other['game_state']))
+        game_states[0].game = None
+        with self.assertRaises(ValueError):
+            pickle.dumps(game_states[0])
+
+    def test_seeded_game(self):
+        dice = []
+        for seed in [3, 3, 4]:
+            self.game.np_random, _ = seeding.np_random(seed)
+            dice.append([self.game.throw_dice() for _ in range(2000)])
+        self.assertEqual(dice[0], dice[1])
+        self.assertNotEqual(dice[0], dice[2])
+        self.assertEqual(set(range(1, 7)), set(dice[0]))
+
+    def test_playout(self):
+        self.game.np_random, _ = seeding.np_random(3)
+        game_state, _ = self.game.init_game()
+        signature = get_state_signature(game_state)
+        results = []
+        for _ in range(2):
+            self.game.np_random, _ = seeding.np_random(4)
+            results.append(playout(game_state, "random", 3, self.game))
+        self.assertEqual(signature, get_state_signature(game_state))  # The games start from copies
+        payoffs, lengths = results[0]
+        self.assertEqual(payoffs.tolist(), results[1][0].tolist())
+        self.assertEqual(lengths.tolist(), results[1][1].tolist())
+        self.assertEqual([1, 1, 1], payoffs.sum(axis=1).tolist())  # One player wins
+        self.assertTrue((lengths > 0).all())
+        payoffs, lengths = playout(None, "rule", 2, self.game)
+        self.assertEqual([1, 1], payoffs.sum(axis=1).tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
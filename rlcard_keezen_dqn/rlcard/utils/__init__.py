@@ -1,3 +1,5 @@
 from rlcard.utils.logger import Logger
 from rlcard.utils import seeding
 from rlcard.utils.utils import *
+from rlcard.utils.evaluator import AsyncEvaluator
+from rlcard.utils.trajectory import TrajectoryBuffer
@@ -0,0 +1,113 @@
+import multiprocessing
+import queue
+import traceback
+
+
+class AsyncEvaluator(object):
+    ''' Plays evaluation tournaments in a separate process, so the training
+    does not wait for them. The training submits policy snapshots tagged with
+    the timestep, the results are logged to the Logger by poll and close.
+    '''
+
+    def __init__(self, env_id, config, make_agents, logger, evaluate_num, player_id=0, max_pending=1,
+                 start_method=None, **tournament_kwargs):
+        ''' Start the evaluation process
+
+        Args:
+            env_id (string): The name of the evaluation environment
+            config (dict): The config of the evaluation environment
+            make_agents (function): Called in the evaluation process with a
+              snapshot, returns the agents to evaluate. Must be picklable, like
+              a module level function.
+            logger (Logger): The logger of the results
+            evaluate_num (int): The number of games of a tournament
+            player_id (int): The player of the logged payoff
+            max_pending (int): The maximum number of snapshots waiting for
+              evaluation, submit skips snapshots beyond it
+            start_method (string): The multiprocessing start method, use
+              'spawn' if the agents use TensorFlow
+            tournament_kwargs: Passed to tournament, like precision or sprt
+        '''
+        self.logger = logger
+        self.player_id = player_id
+        self.max_pending = max_pending
+        self.pending = 0
+        context = multiprocessing.get_context(start_method)
+        self.tasks = context.Queue()
+        self.results = context.Queue()
+        self.process = context.Process(target=_evaluate, args=(env_id, config, make_agents, evaluate_num,
+                                                               tournament_kwargs, self.tasks, self.results),
+                                       daemon=True)
+        self.process.start()
+
+    def submit(self, timestep, snapshot):
+        ''' Evaluate a policy snapshot in the background
+
+        Args:
+            timestep (int): The training timestep of the snapshot
+            snapshot (object): Picklable data for make_agents, like weights
+
+        Returns:
+            (boolean): False if the snapshot is skipped, because max_pending
+              snapshots are waiting
+        '''
+        self.poll()
+        if self.pending >= self.max_pending:
+            return False
+        self.tasks.put((timestep, snapshot))
+        self.pending += 1
+        return True
+
+    def poll(self):
+        ''' Log the finished evaluations, does not wait
+
+        Returns:
+            (list): The (timestep, payoffs) of the finished evaluations
+        '''
+        results = []
+        while self.pending:
+            try:
+                result = self.results.get_nowait()
+            except queue.Empty:
+                break
+            results.append(self._log(result))
+        return results
+
+    def close(self):
+        ''' Wait for the pending evaluations, log them and stop the process
+
+        Returns:
+            (list): The (timestep, payoffs) of the evaluations
+        '''
+        results = []
+        while self.pending:
+            results.append(self._log(self.results.get()))
+        self.tasks.put(None)
+        self.process.join()
+        return results
+
+    def _log(self, result):
+        self.pending -= 1
+        timestep, payoffs, error = result
+        if error is not None:
+            raise RuntimeError('Evaluation of timestep {} failed:\n{}'.format(timestep, error))
+        self.logger.log_performance(timestep, payoffs[self.player_id])
+        return timestep, payoffs
+
+
+def _evaluate(env_id, config, make_agents, evaluate_num, tournament_kwargs, tasks, results):
+    ''' The evaluation process: plays a tournament for each snapshot '''
+    from rlcard.envs.registration import make
+    from rlcard.utils.utils import tournament
+
+    env = make(env_id, config)
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        timestep, snapshot = task
+        try:
+            env.set_agents(make_agents(snapshot))
+            results.put((timestep, tournament(env, evaluate_num, **tournament_kwargs), None))
+        except Exception:
+            results.put((timestep, None, traceback.format_exc()))
@@ -40,6 +40,41 @@ def np_random(seed=None):
     rng.seed(_int_list_from_bigint(hash_seed(seed)))
     return rng, seed
 
+class RandomBuffer(object):
+    """Draws random integers and permutations from a RandomState in batches,
+    which is much faster than a NumPy call per draw. The draws only depend on
+    the RandomState, so a seeded game can be replayed exactly.
+    """
+
+    def __init__(self, np_random, batch_size=1024, permutation_batch_size=64):
+        self.np_random = np_random
+        self.batch_size = batch_size
+        self.permutation_batch_size = permutation_batch_size
+        self._buffers = {}  # (low, high) or n --> [values, index of the next value]
+
+    def randint(self, low, high):
+        """Random integer in [low, high)."""
+        buffer = self._buffers.get((low, high))
+        if buffer is None or buffer[1] == len(buffer[0]):
+            buffer = [self.np_random.randint(low, high, size=self.batch_size).tolist(), 0]
+            self._buffers[(low, high)] = buffer
+        buffer[1] += 1
+        return buffer[0][buffer[1] - 1]
+
+    def permutation(self, n):
+        """Random permutation of range(n), as a list."""
+        buffer = self._buffers.get(n)
+        if buffer is None or buffer[1] == len(buffer[0]):
+            sample = self.np_random.random_sample((self.permutation_batch_size, n))
+            buffer = [np.argsort(sample, axis=1).tolist(), 0]
+            self._buffers[n] = buffer
+        buffer[1] += 1
+        return buffer[0][buffer[1] - 1]
+
+    def shuffle(self, values):
+        """Shuffles the list in place."""
+        values[:] = [values[index] for index in self.permutation(len(values))]
+
 def hash_seed(seed=None, max_bytes=8):
     """Any given evaluation is likely to have many PRNG's active at
     once. (Most commonly, because the environment is running in
@@ -0,0 +1,128 @@
+import numpy as np
+
+
+class TrajectoryBuffer(object):
+    ''' Replay memory for the transitions of Env.run. Each state is stored once:
+    the observation in an int8 ring buffer and the legal actions as a bitset.
+    A transition only keeps the numbers of its state and next state, plus
+    the action, reward and done flag. Both are rings: when the slot of a new
+    state is still used, the oldest transitions are dropped.
+    '''
+
+    def __init__(self, capacity, state_shape, action_num, obs_dtype=np.int8, state_capacity=None):
+        ''' Initialize the buffer
+
+        Args:
+            capacity (int): The number of transitions kept, the oldest are replaced
+            state_shape (list): The shape of the observations
+            action_num (int): The number of actions
+            obs_dtype (numpy.dtype): The type the observations are stored as
+            state_capacity (int): The number of states kept, default 1.25 * capacity.
+              A trajectory of n transitions has n + 1 states.
+        '''
+        self.capacity = capacity
+        self.action_num = action_num
+        self.state_capacity = state_capacity or capacity + capacity // 4 + 1
+        self.obs = np.zeros((self.state_capacity,) + tuple(state_shape), dtype=obs_dtype)
+        self.legal_bits = np.zeros((self.state_capacity, (action_num + 7) // 8), dtype=np.uint8)
+        self.states = np.zeros((capacity, 2), dtype=np.int64)  # Transition --> (state number, next state number)
+        self.actions = np.zeros(capacity, dtype=np.int32)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self.state_count = 0
+        self.transition_count = 0
+        self.first_transition = 0  # Number of the oldest transition kept
+
+    def __len__(self):
+        return self.transition_count - self.first_transition
+
+    def add_state(self, state):
+        ''' Store the observation and legal actions of a state
+
+        Args:
+            state (dict): A state with 'obs' and 'legal_actions'
+
+        Returns:
+            (int): The number of the state
+        '''
+        oldest_state = self.state_count - self.state_capacity  # The state in the slot
+        while len(self) and self.states[self.first_transition % self.capacity, 0] <= oldest_state:
+            self.first_transition += 1
+        index = self.state_count % self.state_capacity
+        self.obs[index] = state['obs']
+        legal_mask = np.zeros(self.action_num, dtype=bool)
+        legal_mask[list(state['legal_actions'])] = True
+        self.legal_bits[index] = np.packbits(legal_mask)
+        self.state_count += 1
+        return self.state_count - 1
+
+    def add_trajectories(self, trajectories):
+        ''' Store the transitions of reorganized trajectories, like the ones of Env.run.
+        The next state of a transition is the state of the next transition, it is stored once.
+
+        Args:
+            trajectories (list): A list of [state, action, reward, next_state, done] for each player
+        '''
+        for player_trajectory in trajectories:
+            last_state, last_number = None, None
+            for state, action, reward, next_state, done in player_trajectory:
+                state_number = last_number if state is last_state else self.add_state(state)
+                next_number = self.add_state(next_state)
+                last_state, last_number = next_state, next_number
+                if len(self) == self.capacity:
+                    self.first_transition += 1
+                transition = self.transition_count % self.capacity
+                self.states[transition] = state_number, next_number
+                self.actions[transition] = action
+                self.rewards[transition] = reward
+                self.dones[transition] = done
+                self.transition_count += 1
+
+    def get_legal_masks(self, state_numbers):
+        ''' The legal action masks (bool) of the states '''
+        indexes = np.asarray(state_numbers) % self.state_capacity
+        return np.unpackbits(self.legal_bits[indexes], axis=1, count=self.action_num).astype(bool)
+
+    def sample(self, batch_size, np_random=np.random):
+        ''' Sample a batch of transitions
+
+        Args:
+            batch_size (int): The number of transitions
+            np_random (RandomState): The random state of the sampling
+
+        Returns:
+            (tuple): Tuple containing:
+
+                (numpy.array): The observations of the states
+                (numpy.array): The actions
+                (numpy.array): The rewards
+                (numpy.array): The observations of the next states
+                (numpy.array): The done flags
+                (numpy.array): The legal action masks of the next states
+        '''
+        transitions = (self.first_transition + np_random.randint(len(self), size=batch_size)) % self.capacity
+        state_numbers, next_numbers = self.states[transitions].T
+        return self.obs[state_numbers % self.state_capacity], self.actions[transitions], self.rewards[transitions], \
+            self.obs[next_numbers % self.state_capacity], self.dones[transitions], self.get_legal_masks(next_numbers)
+
+    def get_transition(self, transition):
+        ''' A stored transition like reorganize gives it, the states only have 'obs' and 'legal_actions'
+
+        Args:
+            transition (int): The index of the transition, 0 is the oldest one kept
+
+        Returns:
+            (list): [state, action, reward, next_state, done]
+        '''
+        transition = (self.first_transition + transition) % self.capacity
+        states = []
+        for number in self.states[transition]:
+            states.append({'obs': self.obs[number % self.state_capacity].copy(),
+                           'legal_actions': np.flatnonzero(self.get_legal_masks([number])[0]).tolist()})
+        return [states[0], int(self.actions[transition]), float(self.rewards[transition]), states[1],
+                bool(self.dones[transition])]
+
+    def nbytes(self):
+        ''' The memory of the arrays in bytes '''
+        return sum(array.nbytes for array in [self.obs, self.legal_bits, self.states, self.actions, self.rewards,
+                                              self.dones])
@@ -1,6 +1,10 @@
+import math
+from statistics import NormalDist
+
 import numpy as np
 
 from rlcard.core import Card, Player
+from rlcard.utils import seeding
 
 
 def init_standard_deck():
@@ -350,13 +354,116 @@ def remove_illegal(action_probs, legal_actions):
     '''
     probs = np.zeros(action_probs.shape[0])
     probs[legal_actions] = action_probs[legal_actions]
-    if np.sum(probs) == 0:
+    total = probs.sum()
+    if total == 0:
         probs[legal_actions] = 1 / len(legal_actions)
     else:
-        probs /= sum(probs)
+        probs /= total
     return probs
 
 
+def get_legal_masks(legal_actions, action_num):
+    ''' Boolean legal action masks of lists of legal action indexes
+
+    Args:
+        legal_actions (list): A list with a list of legal action indexes per state
+        action_num (int): The number of actions
+
+    Returns:
+        (numpy.array): The (batch, action_num) masks
+    '''
+    legal_masks = np.zeros((len(legal_actions), action_num), dtype=bool)
+    for row, actions in enumerate(legal_actions):
+        legal_masks[row, actions] = True
+    return legal_masks
+
+
+def remove_illegal_batch(action_probs, legal_masks):
+    ''' Remove illegal actions and normalize the probabilities of a batch,
+        rows without probability on legal actions get uniform probabilities
+        over the legal actions, like remove_illegal
+
+    Args:
+        action_probs (numpy.array): The (batch, action_num) probabilities
+        legal_masks (numpy.array): The (batch, action_num) boolean legal action masks
+
+    Returns:
+        (numpy.array): The normalized (batch, action_num) probabilities
+
+    Note: A ValueError is raised if a row of legal_masks has no legal action,
+          the same in the masked_* functions.
+    '''
+    _check_legal_masks(legal_masks)
+    probs = np.where(legal_masks, action_probs, 0.0)
+    totals = probs.sum(axis=1, keepdims=True)
+    uniform = legal_masks / legal_masks.sum(axis=1, keepdims=True)
+    return np.where(totals > 0, probs / np.where(totals > 0, totals, 1.0), uniform)
+
+
+def masked_softmax(logits, legal_masks):
+    ''' Softmax over the legal actions of a batch, illegal actions get probability 0
+
+    Args:
+        logits (numpy.array): The (batch, action_num) logits or Q values
+        legal_masks (numpy.array): The (batch, action_num) boolean legal action masks
+
+    Returns:
+        (numpy.array): The (batch, action_num) probabilities
+
+    Note: A ValueError is raised if a row of legal_masks has no legal action.
+    '''
+    _check_legal_masks(legal_masks)
+    logits = np.where(legal_masks, logits, -np.inf)
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exps = np.exp(logits)
+    return exps / exps.sum(axis=1, keepdims=True)
+
+
+def masked_argmax(values, legal_masks):
+    ''' The legal action with the highest value per state of a batch, the first one on ties
+
+    Args:
+        values (numpy.array): The (batch, action_num) values, like Q values
+        legal_masks (numpy.array): The (batch, action_num) boolean legal action masks
+
+    Returns:
+        (numpy.array): The (batch,) actions
+
+    Note: A ValueError is raised if a row of legal_masks has no legal action.
+    '''
+    _check_legal_masks(legal_masks)
+    return np.where(legal_masks, values, -np.inf).argmax(axis=1)
+
+
+def masked_sample(action_probs, legal_masks, np_random=np.random):
+    ''' Sample a legal action per state of a batch, the probabilities are
+        normalized over the legal actions like remove_illegal_batch
+
+    Args:
+        action_probs (numpy.array): The (batch, action_num) probabilities
+        legal_masks (numpy.array): The (batch, action_num) boolean legal action masks
+        np_random (RandomState): The random state of the sampling
+
+    Returns:
+        (numpy.array): The (batch,) actions
+
+    Note: A ValueError is raised if a row of legal_masks has no legal action.
+    '''
+    cumulative = np.cumsum(remove_illegal_batch(action_probs, legal_masks), axis=1)
+    draws = np_random.random_sample((len(cumulative), 1)) * cumulative[:, -1:]
+    actions = (cumulative <= draws).sum(axis=1)
+    # Rounding can point past the last legal action: take the last legal action then
+    last_legal = legal_masks.shape[1] - 1 - legal_masks[:, ::-1].argmax(axis=1)
+    return np.minimum(actions, last_legal)
+
+
+def _check_legal_masks(legal_masks):
+    ''' The masked functions have no action to give for a state without legal actions '''
+    empty_rows = np.flatnonzero(~np.asarray(legal_masks).any(axis=1))
+    if len(empty_rows):
+        raise ValueError('No legal action in rows {} of the legal masks'.format(empty_rows.tolist()))
+
+
 def assign_task(task_num, process_num):
     ''' Assign the number of tasks according to the number of processes
 
@@ -371,16 +478,21 @@ def assign_task(task_num, process_num):
     per_tasks[0] += (task_num % process_num)
     return per_tasks
 
-def tournament(env, num):
+def tournament(env, num, precision=None, sprt=None, player_id=0, min_num=100):
     ''' Evaluate he performance of the agents in the environment
 
     Args:
         env (Env class): The environment to be evaluated.
-        num (int): The number of games to play.
+        num (int): The number of games to play, the maximum number with
+          precision or sprt.
+        precision, sprt, player_id, min_num: Stop early, see sequential_tournament.
 
     Returns:
         A list of avrage payoffs for each player
     '''
+    if precision is not None or sprt is not None:
+        payoffs, _, _ = sequential_tournament(env, num, precision, sprt, player_id, min_num)
+        return payoffs
     payoffs = [0 for _ in range(env.player_num)]
     counter = 0
     while counter < num:
@@ -398,3 +510,181 @@ def tournament(env, num):
         payoffs[i] /= counter
     return payoffs
 
+def parallel_tournament(env_id, config, agents, num, process_num=None, seed=0, chunk_size=None):
+    ''' Evaluate the agents in worker processes. Game i is played with seed
+    seed + i for the environment and the random and numpy.random modules, so
+    the results are the same for any number of processes if the agents only
+    draw random numbers from these global random states (an agent with its
+    own random state continues it across the games of a worker). The games
+    are handed out in chunks as the workers finish, and the chunk results are
+    merged in seed order.
+
+    Args:
+        env_id (string): The name of the environment, each worker makes its own
+        config (dict): The config of the environment
+        agents (list): The agents, must be picklable
+        num (int): The number of games to play
+        process_num (int): The number of worker processes, default the number
+          of CPUs. With 1 the games are played in this process, the
+          random and numpy.random states are restored afterwards.
+        seed (int): The seed of the first game
+        chunk_size (int): The number of games per task
+
+    Returns:
+        (tuple): Tuple containing:
+
+            (list): The average payoff of each player
+            (float): The average number of steps of a game
+            (float): The wall clock time in seconds
+    '''
+    import multiprocessing
+    import random
+    import time
+
+    global _tournament_env
+    if process_num is None:
+        process_num = multiprocessing.cpu_count()
+    if chunk_size is None:
+        chunk_size = max(1, num // (process_num * 8))
+    chunks = [(start, min(start + chunk_size, seed + num)) for start in range(seed, seed + num, chunk_size)]
+    start_time = time.time()
+    if process_num == 1:
+        random_state, np_random_state = random.getstate(), np.random.get_state()
+        _init_tournament_worker(env_id, config, agents)
+        try:
+            results = [_play_seeded_games(chunk) for chunk in chunks]
+        finally:
+            random.setstate(random_state)
+            np.random.set_state(np_random_state)
+            _tournament_env = None
+    else:
+        with multiprocessing.Pool(process_num, _init_tournament_worker, (env_id, config, agents)) as pool:
+            results = list(pool.imap(_play_seeded_games, chunks))
+    payoffs = sum(payoff_sums for payoff_sums, _ in results)
+    lengths = sum(length_sum for _, length_sum in results)
+    return (payoffs / num).tolist(), lengths / num, time.time() - start_time
+
+_tournament_env = None
+
+def _init_tournament_worker(env_id, config, agents):
+    from rlcard.envs.registration import make
+
+    global _tournament_env
+    _tournament_env = make(env_id, config)
+    _tournament_env.set_agents(agents)
+
+def _play_seeded_games(chunk):
+    ''' Plays the games with the seeds in [start, end), returns the sums of the payoffs and game lengths '''
+    import random
+
+    env = _tournament_env
+    payoff_sums = np.zeros(env.player_num)
+    length_sum = 0
+    for seed in range(*chunk):
+        env._seed(seed)
+        random.seed(seed)
+        np.random.seed(seed)
+        timestep = env.timestep
+        _, payoffs = env.run(is_training=False)
+        payoff_sums += payoffs
+        length_sum += env.timestep - timestep
+    return payoff_sums, length_sum
+
+def sequential_tournament(env, max_num, precision=None, sprt=None, player_id=0, min_num=100, confidence=0.95):
+    ''' Evaluate the agents until a stopping criterion on the payoff of one
+    player holds, or max_num games are played. The criteria are checked after
+    each game, from min_num games on.
+
+    Args:
+        env (Env class): The environment to be evaluated.
+        max_num (int): The maximum number of games to play.
+        precision (float): Stop when the half width of the confidence interval
+          of the average payoff (win rate) of the player is below it, like 0.01.
+        sprt (tuple): (p0, p1, alpha, beta), a sequential probability ratio
+          test of a win rate p0 against p1 of the player, with the payoff in
+          [0, 1] as win. Stops when H0 (p0) or H1 (p1) is accepted.
+        player_id (int): The player (seat) of the criteria.
+        min_num (int): The minimum number of games to play.
+        confidence (float): The confidence of the precision interval.
+
+    Returns:
+        (tuple): Tuple containing:
+
+            (list): The average payoff of each player
+            (int): The number of games played
+            (string): 'precision', 'H0', 'H1', or None if max_num games are played
+    '''
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    if sprt is not None:
+        p0, p1, alpha, beta = sprt
+        win_llr, loss_llr = math.log(p1 / p0), math.log((1 - p1) / (1 - p0))
+        upper, lower = math.log((1 - beta) / alpha), math.log(beta / (1 - alpha))
+    payoffs = np.zeros(env.player_num)
+    total, total_squares, llr = 0.0, 0.0, 0.0
+    counter = 0
+    decision = None
+    while counter < max_num and decision is None:
+        _, _payoffs = env.run(is_training=False)
+        for _p in (_payoffs if isinstance(_payoffs, list) else [_payoffs]):
+            payoffs += _p
+            counter += 1
+            payoff = float(_p[player_id])
+            total += payoff
+            total_squares += payoff * payoff
+            if sprt is not None:
+                llr += payoff * win_llr + (1 - payoff) * loss_llr
+            if counter < max(min_num, 2):
+                continue
+            if sprt is not None and llr >= upper:
+                decision = 'H1'
+            elif sprt is not None and llr <= lower:
+                decision = 'H0'
+            elif precision is not None:
+                variance = max(total_squares / counter - (total / counter) ** 2, 0.0) * counter / (counter - 1)
+                if z * math.sqrt(variance / counter) < precision:
+                    decision = 'precision'
+            if decision is not None:
+                break
+    return (payoffs / counter).tolist(), counter, decision
+
+def paired_tournament(env, num, seed=None, confidence=0.95):
+    ''' Evaluate the agents with duplicate deals: every deal is played twice,
+    the second time with the agents moved one seat. In a team game like
+    Keezen (seats 0 and 2 against 1 and 3) the teams then swap cards, so the
+    card luck cancels out in the per deal difference.
+
+    Args:
+        env (Env class): The environment to be evaluated, the game must draw
+          its cards or dice from the random state of the environment
+        num (int): The number of deals, 2 * num games are played
+        seed (int): The seed of the first deal, deal i has seed + i
+        confidence (float): The confidence of the interval of the difference
+
+    Returns:
+        (tuple): Tuple containing:
+
+            (list): The average payoff of each agent
+            (float): The average per deal difference of the payoffs of agent 0 and agent 1
+            (float): The half width of the confidence interval of the difference
+    '''
+    if seed is None:
+        seed = seeding.create_seed(max_bytes=4)
+    agents = env.agents
+    player_num = env.player_num
+    rotated_agents = agents[1:] + agents[:1]  # Seat s has agent s + 1
+    deal_payoffs = np.zeros((num, player_num))
+    try:
+        for deal in range(num):
+            env._seed(seed + deal)
+            env.set_agents(agents)
+            _, payoffs = env.run(is_training=False)
+            env._seed(seed + deal)
+            env.set_agents(rotated_agents)
+            _, rotated_payoffs = env.run(is_training=False)
+            deal_payoffs[deal] = (np.asarray(payoffs) + np.roll(rotated_payoffs, 1)) / 2
+    finally:
+        env.set_agents(agents)
+    differences = deal_payoffs[:, 0] - deal_payoffs[:, 1]
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    half_width = z * differences.std(ddof=1) / np.sqrt(num) if num > 1 else float('inf')
+    return deal_payoffs.mean(axis=0).tolist(), float(differences.mean()), float(half_width)
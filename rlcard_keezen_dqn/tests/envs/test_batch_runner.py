@@ -0,0 +1,94 @@
+import unittest
+
+import numpy as np
+
+import rlcard
+from rlcard.envs.batch_runner import BatchRunner
+
+
+class HashAgent(object):
+    ''' Picks a legal action from the sum of the observation, the same one by one and batched '''
+
+    use_raw = False
+
+    def __init__(self, offset):
+        self.offset = offset
+        self.batch_seats = []  # The seats of the states of each batch, from the active player column
+        self.batch_sizes = []
+
+    def _get_action(self, obs, legal_actions):
+        legal_actions = sorted(legal_actions)  # Like the indexes of a legal mask
+        return legal_actions[(int(obs.sum()) + self.offset) % len(legal_actions)]
+
+    def step(self, state):
+        return self._get_action(state['obs'], state['legal_actions'])
+
+    def eval_step(self, state):
+        return self.step(state), None
+
+    def step_batch(self, obs, legal_masks):
+        self.batch_seats.append(set(obs[:, :, 0].argmax(axis=1).tolist()))
+        self.batch_sizes.append(len(obs))
+        return np.array([self._get_action(o, np.flatnonzero(legal_mask).tolist())
+                         for o, legal_mask in zip(obs, legal_masks)])
+
+    def eval_step_batch(self, obs, legal_masks):
+        return self.step_batch(obs, legal_masks), None
+
+
+class TestBatchRunner(unittest.TestCase):
+
+    def _assert_same_as_run(self, trajectories, payoffs, seed, is_training, offsets=(0, 1, 0, 1)):
+        for index in range(len(trajectories)):
+            env = rlcard.make('keezen', config={'seed': seed + index})
+            env.set_agents([HashAgent(offset) for offset in offsets])
+            expected_trajectories, expected_payoffs = env.run(is_training=is_training)
+            self.assertTrue(np.array_equal(expected_payoffs, payoffs[index]))
+            for expected_trajectory, trajectory in zip(expected_trajectories, trajectories[index]):
+                self.assertEqual(len(expected_trajectory), len(trajectory))
+                for expected, transition in zip(expected_trajectory, trajectory):
+                    self.assertTrue(np.array_equal(expected[0]['obs'], transition[0]['obs']))
+                    self.assertEqual(expected[1:3] + expected[4:], transition[1:3] + transition[4:])
+                    self.assertTrue(np.array_equal(expected[3]['obs'], transition[3]['obs']))
+
+    def _compare_with_run(self, is_training):
+        runner = BatchRunner('keezen', {'env_num': 3, 'seed': 7})
+        agents = [HashAgent(0), HashAgent(1)]
+        runner.set_agents([agents[0], agents[1], agents[0], agents[1]])
+        trajectories, payoffs = runner.run(is_training=is_training, game_num=5)
+        self.assertEqual(5, len(trajectories))
+        self._assert_same_as_run(trajectories, payoffs, 7, is_training)
+        for agent in agents:
+            # An agent plays two seats: the states of both are in one batch
+            self.assertTrue(any(len(seats) > 1 for seats in agent.batch_seats))
+        # The next run plays the next games
+        trajectories, payoffs = runner.run(is_training=is_training, game_num=2)
+        self.assertEqual(2, len(trajectories))
+        self._assert_same_as_run(trajectories, payoffs, 12, is_training)
+
+    def test_same_as_run(self):
+        self._compare_with_run(is_training=False)
+
+    def test_same_as_run_training(self):
+        self._compare_with_run(is_training=True)
+
+    def test_batch_size(self):
+        runner = BatchRunner('keezen', {'env_num': 4, 'seed': 3})
+        agent = HashAgent(0)
+        runner.set_agents([agent] * 4)
+        trajectories, payoffs = runner.run(game_num=10)
+        self.assertEqual(10, len(trajectories))
+        self.assertTrue(all(payoff is not None for payoff in payoffs))
+        # Finished games are replaced until the last games are started, then the batch gets smaller
+        sizes = agent.batch_sizes
+        full = sizes.index(3)
+        self.assertGreater(full, 0)
+        self.assertEqual([4] * full, sizes[:full])
+        self.assertEqual(sorted(sizes[full:], reverse=True), sizes[full:])
+        self.assertEqual(1, sizes[-1])
+        # Each game is the game of Env.run with the seed of the game
+        self._assert_same_as_run(trajectories, payoffs, 3, is_training=False, offsets=(0, 0, 0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+import unittest
+
+import numpy as np
+
+import rlcard
+from rlcard.envs.keezen import KeezenEnv
+from rlcard.games.keezen.board import BoardState
+from rlcard.games.keezen.move import MoveType
+
+
+class LegalActionsAgent(object):
+    ''' Agent that only declares the legal actions: its seat gets no observation '''
+
+    use_raw = False
+    state_fields = ['legal_actions']
+
+
+class ObservationAgent(object):
+    ''' Agent that declares the observation and the legal actions '''
+
+    use_raw = False
+    state_fields = ['obs', 'legal_actions']
+
+
+class RecordingAgent(object):
+    ''' Plays the first legal action and keeps the states it gets '''
+
+    use_raw = False
+
+    def __init__(self, state_fields=None):
+        if state_fields is not None:
+            self.state_fields = state_fields
+        self.states = []
+
+    def step(self, state):
+        self.states.append(state)
+        return state['legal_actions'][0]
+
+    def eval_step(self, state):
+        return self.step(state), None
+
+
+class Model(object):
+    def __init__(self, agents):
+        self.agents = agents
+
+
+class SingleAgentKeezenEnv(KeezenEnv):
+    ''' Single agent mode against RecordingAgents '''
+
+    def _load_model(self):
+        return Model([RecordingAgent(['legal_actions']), RecordingAgent(['legal_actions']), RecordingAgent(),
+                      RecordingAgent(['legal_actions'])])
+
+
+FULL_STATE_KEYS = {'obs', 'legal_actions', 'allowed_moves', 'game_state', 'player_id'}
+
+
+class TestKeezenEnv(unittest.TestCase):
+
+    @staticmethod
+    def _full_rebuild(env, player_id):
+        ''' The observation rebuilt from the board, like without a game state in the state '''
+        game = env.game.game
+        game_state = env.game.game_state
+        player = game.players[player_id]
+        board_matrix = BoardState.get_board_state_as_matrix(game_state.fields_with_marbles, game.board, player,
+                                                            game_state.players_play_with_color[player], game.players)
+        active_player = np.zeros((5, 1), dtype=int)
+        active_player[player_id][0] = 1
+        return np.hstack((active_player, board_matrix))
+
+    def _play_and_compare(self, env, num_steps, step_back_every=0):
+        ''' Plays random actions and compares each observation with a full rebuild '''
+        np_random = np.random.RandomState(1)
+        move_types = set()
+        compared = step_backs = 0
+        state, player_id = env.reset()
+        for step in range(1, num_steps + 1):
+            if env.is_over():
+                state, player_id = env.reset()
+            if 'obs' in state:
+                self.assertTrue(np.array_equal(state['obs'], self._full_rebuild(env, player_id)))
+                compared += 1
+            if step_back_every and step % step_back_every == 0:
+                previous = env.step_back()
+                if previous:
+                    state, player_id = previous
+                    step_backs += 1
+                    continue
+            action = np_random.choice(env._get_legal_actions())
+            state, player_id = env.step(action)
+            last_move = env.game.game_state.last_move
+            move_types.add(last_move.move_type if last_move is not None else 'NO')
+        return move_types, compared, step_backs
+
+    def test_encoder_equals_full_rebuild(self):
+        env = rlcard.make('keezen', config={'seed': 0, 'allow_step_back': True})
+        move_types, compared, step_backs = self._play_and_compare(env, 1500, step_back_every=7)
+        self.assertIn(MoveType.DEAL, move_types)
+        self.assertIn('NO', move_types)
+        self.assertGreater(step_backs, 0)
+        self.assertGreater(compared, 1000)
+
+    def test_encoder_with_skipped_seats(self):
+        env = rlcard.make('keezen', config={'seed': 0, 'lean_state': True})
+        env.set_agents([ObservationAgent(), LegalActionsAgent(), ObservationAgent(), LegalActionsAgent()])
+        move_types, compared, _ = self._play_and_compare(env, 1500)
+        self.assertIn(MoveType.DEAL, move_types)
+        self.assertGreater(compared, 300)
+
+    def test_lean_state(self):
+        env = rlcard.make('keezen', config={'seed': 2})
+        lean_env = rlcard.make('keezen', config={'seed': 2, 'lean_state': True})
+        (state, player_id), (lean_state, lean_player_id) = env.reset(), lean_env.reset()
+        np_random = np.random.RandomState(2)
+        for _ in range(300):
+            self.assertEqual({'obs', 'legal_actions', 'allowed_moves', 'game_state', 'player_id'}, set(state))
+            self.assertEqual({'obs', 'legal_actions', 'player_id'}, set(lean_state))
+            self.assertTrue(np.array_equal(state['obs'], lean_state['obs']))
+            self.assertEqual(state['legal_actions'], lean_state['legal_actions'])
+            self.assertEqual(player_id, lean_player_id)
+            if env.is_over():
+                break
+            action = np_random.choice(state['legal_actions'])
+            (state, player_id), (lean_state, lean_player_id) = env.step(action), lean_env.step(action)
+
+    def test_state_fields_in_run(self):
+        env = rlcard.make('keezen', config={'seed': 4})
+        agents = [RecordingAgent(['legal_actions']), RecordingAgent(), RecordingAgent(['legal_actions']),
+                  RecordingAgent()]
+        env.set_agents(agents)
+        trajectories, _ = env.run(is_training=False)
+        for player_id in (0, 2):
+            self.assertTrue(agents[player_id].states)
+            for state in agents[player_id].states + [transition[3] for transition in trajectories[player_id]]:
+                self.assertEqual({'legal_actions', 'player_id'}, set(state))
+
+        # Agents without state fields get the full states, the same as when no agent declares them
+        full_env = rlcard.make('keezen', config={'seed': 4})
+        full_agents = [RecordingAgent() for _ in range(4)]
+        full_env.set_agents(full_agents)
+        full_env.run(is_training=False)
+        for player_id in (1, 3):
+            self.assertEqual(len(full_agents[player_id].states), len(agents[player_id].states))
+            for state, full_state in zip(agents[player_id].states, full_agents[player_id].states):
+                self.assertEqual(FULL_STATE_KEYS, set(state))
+                self.assertTrue(np.array_equal(full_state['obs'], state['obs']))
+                self.assertEqual(full_state['legal_actions'], state['legal_actions'])
+                self.assertEqual([str(move) for move in full_state['allowed_moves']],
+                                 [str(move) for move in state['allowed_moves']])
+
+    def test_state_fields_in_single_agent_mode(self):
+        config = {'seed': 4, 'allow_step_back': False, 'allow_raw_data': False, 'record_action': False,
+                  'single_agent_mode': True, 'active_player': 0, 'env_num': 1}
+        env = SingleAgentKeezenEnv(config)
+        state = env.reset()
+        for _ in range(100):
+            self.assertEqual(FULL_STATE_KEYS, set(state))  # The model agent of the active player is not used
+            state, _, _ = env.step(state['legal_actions'][0])
+        agents = env.model.agents
+        self.assertEqual([], agents[0].states)
+        for player_id in (1, 2, 3):
+            self.assertTrue(agents[player_id].states)
+        for player_id in (1, 3):
+            for state in agents[player_id].states:
+                self.assertEqual({'legal_actions', 'player_id'}, set(state))
+        for state in agents[2].states:
+            self.assertEqual(FULL_STATE_KEYS, set(state))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+import numpy as np
+
+import rlcard
+
+
+class RecordingAgent(object):
+    ''' Plays the first legal action and keeps the states it gets '''
+
+    use_raw = False
+
+    def __init__(self, state_fields=None):
+        if state_fields is not None:
+            self.state_fields = state_fields
+        self.states = []
+
+    def step(self, state):
+        self.states.append(state)
+        return state['legal_actions'][0]
+
+    def eval_step(self, state):
+        return self.step(state), None
+
+
+class TestMejnEnv(unittest.TestCase):
+
+    def test_lean_state(self):
+        env = rlcard.make('mejn', config={'seed': 2})
+        lean_env = rlcard.make('mejn', config={'seed': 2, 'lean_state': True})
+        (state, player_id), (lean_state, lean_player_id) = env.reset(), lean_env.reset()
+        np_random = np.random.RandomState(2)
+        while True:
+            self.assertEqual({'obs', 'legal_actions', 'allowed_moves', 'game_state', 'player_id'}, set(state))
+            self.assertEqual({'obs', 'legal_actions', 'player_id'}, set(lean_state))
+            self.assertTrue(np.array_equal(state['obs'], lean_state['obs']))
+            self.assertEqual(state['legal_actions'], lean_state['legal_actions'])
+            self.assertEqual(player_id, lean_player_id)
+            if env.is_over():
+                break
+            action = np_random.choice(state['legal_actions'])
+            (state, player_id), (lean_state, lean_player_id) = env.step(action), lean_env.step(action)
+        self.assertTrue(lean_env.is_over())
+        self.assertTrue(np.array_equal(env.get_payoffs(), lean_env.get_payoffs()))
+
+    def test_state_fields_in_run(self):
+        env = rlcard.make('mejn', config={'seed': 4})
+        agents = [RecordingAgent(['legal_actions']), RecordingAgent(), RecordingAgent(['obs', 'legal_actions']),
+                  RecordingAgent()]
+        env.set_agents(agents)
+        trajectories, _ = env.run(is_training=True)
+        for state in agents[0].states + [transition[3] for transition in trajectories[0]]:
+            self.assertEqual({'legal_actions', 'player_id'}, set(state))
+        for state in agents[2].states:
+            self.assertEqual({'obs', 'legal_actions', 'player_id'}, set(state))
+        for player_id in (1, 3):
+            self.assertTrue(agents[player_id].states)
+            for state in agents[player_id].states:
+                self.assertEqual({'obs', 'legal_actions', 'allowed_moves', 'game_state', 'player_id'}, set(state))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+
+import numpy as np
+
+import rlcard
+from rlcard.envs.vec_env import VecEnv
+
+
+class FirstActionAgent(object):
+    use_raw = False
+
+    def step(self, state):
+        return state['legal_actions'][0]
+
+    def eval_step(self, state):
+        return self.step(state), None
+
+
+class TestVecEnv(unittest.TestCase):
+
+    def _compare_with_serial(self, env_id, num_steps):
+        ''' Steps a VecEnv with 2 workers and serial environments with the seeds of the workers (seed + index) '''
+        vec_env = VecEnv(env_id, {'env_num': 2, 'seed': 3})
+        envs = [rlcard.make(env_id, config={'seed': 3 + index}) for index in range(2)]
+        try:
+            obs, legal_masks, player_ids = vec_env.reset()
+            states = [env.reset() for env in envs]
+            self._assert_states_equal(vec_env, states, obs, legal_masks, player_ids)
+            np_random = np.random.RandomState(0)
+            done_num = np.zeros(2, dtype=int)
+            same_workers = True
+            for _ in range(num_steps):
+                actions = [np_random.choice(np.flatnonzero(legal_mask)) for legal_mask in legal_masks]
+                obs, legal_masks, player_ids, payoffs, dones = vec_env.step(actions)
+                for index, env in enumerate(envs):
+                    states[index] = env.step(actions[index])
+                    self.assertEqual(env.is_over(), dones[index])
+                    if env.is_over():
+                        self.assertTrue(np.array_equal(env.get_payoffs(), payoffs[index]))
+                        states[index] = env.reset()
+                        done_num[index] += 1
+                    else:
+                        self.assertFalse(payoffs[index].any())
+                self._assert_states_equal(vec_env, states, obs, legal_masks, player_ids)
+                same_workers = same_workers and np.array_equal(legal_masks[0], legal_masks[1])
+        finally:
+            vec_env.close()
+        self.assertFalse(same_workers)  # The workers get their own seed
+        return done_num
+
+    def _assert_states_equal(self, vec_env, states, obs, legal_masks, player_ids):
+        for index, (state, player_id) in enumerate(states):
+            self.assertTrue(np.array_equal(state['obs'], obs[index]))
+            self.assertEqual(sorted(state['legal_actions']), np.flatnonzero(legal_masks[index]).tolist())
+            self.assertEqual(player_id, player_ids[index])
+        self.assertEqual(obs.shape, (2,) + tuple(np.asarray(states[0][0]['obs']).shape))
+        self.assertEqual(legal_masks.shape, (2, vec_env.action_num))
+
+    def test_keezen_same_as_serial(self):
+        self._compare_with_serial('keezen', 200)
+
+    def test_mejn_auto_reset(self):
+        done_num = self._compare_with_serial('mejn', 1000)
+        self.assertTrue((done_num > 0).all())
+
+    def test_run_states_have_player_id(self):
+        vec_env = VecEnv('mejn', {'env_num': 2, 'seed': 3})
+        vec_env.set_agents([FirstActionAgent() for _ in range(vec_env.player_num)])
+        try:
+            trajectories, payoffs = vec_env.run()
+        finally:
+            vec_env.close()
+        for index in range(2):
+            env = rlcard.make('mejn', config={'seed': 3 + index})
+            env.set_agents([FirstActionAgent() for _ in range(env.player_num)])
+            expected_trajectories, expected_payoffs = env.run()
+            self.assertTrue(np.array_equal(expected_payoffs, payoffs[index]))
+            for player_id, (expected_trajectory, trajectory) in enumerate(zip(expected_trajectories,
+                                                                               trajectories[index])):
+                self.assertEqual(len(expected_trajectory), len(trajectory))
+                for expected, transition in zip(expected_trajectory, trajectory):
+                    for state_index in (0, 3):  # The state and the next state
+                        self.assertEqual(player_id, transition[state_index]['player_id'])
+                        self.assertEqual(expected[state_index]['player_id'], transition[state_index]['player_id'])
+
+    def test_close(self):
+        vec_env = VecEnv('mejn', {'env_num': 2, 'seed': 0})
+        vec_env.reset()
+        vec_env.close()
+        for process in vec_env.processes:
+            self.assertFalse(process.is_alive())
+            self.assertEqual(0, process.exitcode)
+        vec_env.close()  # No effect on a closed VecEnv
+        self.assertTrue(vec_env.closed)
+
+
+if __name__ == '__main__':
+    unittest.main()
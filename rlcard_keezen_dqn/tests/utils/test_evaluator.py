@@ -0,0 +1,80 @@
+import time
+import unittest
+
+import rlcard
+from rlcard.utils import AsyncEvaluator, tournament
+
+
+class FirstActionAgent(object):
+    ''' Plays the first legal action '''
+
+    use_raw = False
+
+    def eval_step(self, state):
+        return state['legal_actions'][0], None
+
+
+def make_agents(snapshot):
+    ''' The snapshot is the time to wait before the tournament, or 'error' '''
+    if snapshot == 'error':
+        raise ValueError('Bad snapshot')
+    time.sleep(snapshot)
+    return [FirstActionAgent() for _ in range(4)]
+
+
+class PerformanceLogger(object):
+    ''' Keeps the logged performances, like Logger.log_performance '''
+
+    def __init__(self):
+        self.performances = []
+
+    def log_performance(self, timestep, reward):
+        self.performances.append((timestep, reward))
+
+
+class TestAsyncEvaluator(unittest.TestCase):
+
+    def setUp(self):
+        self.config = {'seed': 1}
+        self.logger = PerformanceLogger()
+
+    def test_submit_poll_close(self):
+        evaluator = AsyncEvaluator('mejn', self.config, make_agents, self.logger, 3, player_id=1, max_pending=2,
+                                   start_method='spawn')
+        self.assertTrue(evaluator.submit(100, 0))
+        self.assertTrue(evaluator.submit(200, 0))
+        results = []
+        deadline = time.time() + 60
+        while not results and time.time() < deadline:
+            results = evaluator.poll()
+            time.sleep(0.05)
+        results += evaluator.close()
+        self.assertFalse(evaluator.process.is_alive())
+        self.assertEqual([100, 200], [timestep for timestep, _ in results])
+
+        # The same games as a tournament in this process, the env is seeded once
+        env = rlcard.make('mejn', config=self.config)
+        env.set_agents(make_agents(0))
+        expected = [tournament(env, 3), tournament(env, 3)]
+        self.assertEqual(expected, [payoffs for _, payoffs in results])
+        self.assertEqual([(100, expected[0][1]), (200, expected[1][1])], self.logger.performances)
+
+    def test_max_pending(self):
+        evaluator = AsyncEvaluator('mejn', self.config, make_agents, self.logger, 1, start_method='spawn')
+        self.assertTrue(evaluator.submit(100, 1))
+        self.assertFalse(evaluator.submit(200, 0))  # Skipped, the first snapshot waits at least 1 second
+        self.assertEqual([100], [timestep for timestep, _ in evaluator.close()])
+        self.assertEqual([100], [timestep for timestep, _ in self.logger.performances])
+
+    def test_error_in_evaluation_process(self):
+        evaluator = AsyncEvaluator('mejn', self.config, make_agents, self.logger, 1, start_method='spawn')
+        evaluator.submit(100, 'error')
+        with self.assertRaisesRegex(RuntimeError, 'timestep 100(.|\n)*ValueError: Bad snapshot'):
+            evaluator.close()
+        self.assertEqual([], self.logger.performances)
+        evaluator.close()  # The process still runs, no pending evaluations
+        self.assertFalse(evaluator.process.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+
+import numpy as np
+
+import rlcard
+from rlcard.utils import TrajectoryBuffer
+
+
+ACTION_NUM = 12
+
+
+def make_state(number):
+    ''' A state with the number in all observation cells and two legal actions of the number '''
+    return {'obs': np.full((2, 3), number), 'legal_actions': sorted({number % 5, number * 3 % 7 + 5})}
+
+
+def make_trajectory(start, num):
+    ''' Reorganized transitions of one player, the next state of a transition is the state of the next one '''
+    states = [make_state(number) for number in range(start, start + num + 1)]
+    return [[states[index], (start + index) % ACTION_NUM, float(start + index), states[index + 1], index == num - 1]
+            for index in range(num)]
+
+
+class FirstActionAgent(object):
+    use_raw = False
+
+    def step(self, state):
+        return state['legal_actions'][0]
+
+    def eval_step(self, state):
+        return self.step(state), None
+
+
+class TestTrajectoryBuffer(unittest.TestCase):
+
+    def assert_transition_equal(self, expected, transition):
+        for index in (0, 3):  # The state and next state
+            self.assertTrue(np.array_equal(expected[index]['obs'], transition[index]['obs']))
+            self.assertEqual(sorted(expected[index]['legal_actions']), transition[index]['legal_actions'])
+        self.assertEqual(expected[1:3] + expected[4:], transition[1:3] + transition[4:])
+
+    def test_round_trip(self):
+        buffer = TrajectoryBuffer(10, (2, 3), ACTION_NUM)
+        trajectory = make_trajectory(0, 5)
+        buffer.add_trajectories([trajectory, []])
+        self.assertEqual(5, len(buffer))
+        self.assertEqual(6, buffer.state_count)  # The next state of a transition is stored once
+        for index, expected in enumerate(trajectory):
+            self.assert_transition_equal(expected, buffer.get_transition(index))
+
+    def test_round_trip_env(self):
+        env = rlcard.make('mejn', config={'seed': 0})
+        env.set_agents([FirstActionAgent() for _ in range(env.player_num)])
+        trajectories, _ = env.run(is_training=True)
+        buffer = TrajectoryBuffer(1000, env.state_shape, env.action_num)
+        buffer.add_trajectories(trajectories)
+        transitions = [transition for player_trajectory in trajectories for transition in player_trajectory]
+        self.assertEqual(len(transitions), len(buffer))
+        for index, expected in enumerate(transitions):
+            self.assert_transition_equal(expected, buffer.get_transition(index))
+
+    def test_wrap_around(self):
+        buffer = TrajectoryBuffer(4, (2, 3), ACTION_NUM, state_capacity=100)
+        trajectory = make_trajectory(0, 10)
+        buffer.add_trajectories([trajectory])
+        self.assertEqual(4, len(buffer))
+        self.assertEqual(10, buffer.transition_count)
+        for index in range(4):
+            self.assert_transition_equal(trajectory[6 + index], buffer.get_transition(index))
+
+    def test_drop_transitions_of_reused_state_slots(self):
+        buffer = TrajectoryBuffer(10, (2, 3), ACTION_NUM, state_capacity=4)
+        trajectory = make_trajectory(0, 6)
+        buffer.add_trajectories([trajectory])
+        # States 0-2 are replaced by states 4-6, only the transitions from state 3 on are kept
+        self.assertEqual(3, len(buffer))
+        for index in range(3):
+            self.assert_transition_equal(trajectory[3 + index], buffer.get_transition(index))
+
+    def test_sample(self):
+        buffer = TrajectoryBuffer(8, (2, 3), ACTION_NUM)
+        trajectory = make_trajectory(0, 12)  # Wraps around
+        buffer.add_trajectories([trajectory])
+        obs, actions, rewards, next_obs, dones, next_legal_masks = buffer.sample(50, np.random.RandomState(0))
+        self.assertEqual((50, 2, 3), obs.shape)
+        self.assertEqual((50, ACTION_NUM), next_legal_masks.shape)
+        numbers = obs[:, 0, 0].astype(int)
+        self.assertTrue(set(numbers) <= set(range(4, 12)))
+        for index, number in enumerate(numbers):
+            expected = trajectory[number]
+            self.assertTrue((obs[index] == number).all())
+            self.assertTrue((next_obs[index] == number + 1).all())
+            self.assertEqual(expected[1], actions[index])
+            self.assertEqual(expected[2], rewards[index])
+            self.assertEqual(expected[4], dones[index])
+            self.assertEqual(make_state(number + 1)['legal_actions'], np.flatnonzero(next_legal_masks[index]).tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
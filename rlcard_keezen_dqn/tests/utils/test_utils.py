@@ -0,0 +1,218 @@
+import math
+import random
+import unittest
+
+import numpy as np
+
+import rlcard
+from rlcard.utils import utils, paired_tournament, sequential_tournament, parallel_tournament
+from rlcard.utils import remove_illegal, get_legal_masks, remove_illegal_batch, masked_softmax, masked_argmax, \
+    masked_sample
+
+
+class SeatAgent(object):
+    ''' Plays the first legal action and remembers the seats it played '''
+
+    use_raw = False
+
+    def __init__(self):
+        self.seats = []
+
+    def eval_step(self, state):
+        if not self.seats or self.seats[-1] != state['player_id']:
+            self.seats.append(state['player_id'])
+        return state['legal_actions'][0], None
+
+
+class ValueAgent(object):
+    ''' Agent of PayoffEnv, the payoff of its seat is its value '''
+
+    use_raw = False
+
+    def __init__(self, value, noise=False):
+        self.value = value
+        self.noise = noise  # Add the seed modulo 3
+
+
+class PayoffEnv(object):
+    ''' Env stub: the payoff of a seat is the value of its agent '''
+
+    def __init__(self, agents):
+        self.player_num = len(agents)
+        self.agents = agents
+        self.seed = 0
+
+    def _seed(self, seed):
+        self.seed = seed
+
+    def set_agents(self, agents):
+        self.agents = agents
+
+    def run(self, is_training=False):
+        return None, [agent.value + (self.seed % 3 if agent.noise else 0) for agent in self.agents]
+
+
+class GlobalRandomAgent(object):
+    ''' Plays a random legal action, drawn from the global random state '''
+
+    use_raw = False
+
+    def eval_step(self, state):
+        return random.choice(state['legal_actions']), None
+
+
+class CycleEnv(object):
+    ''' Env stub: each game has the next payoffs of the list, from the start again after the last '''
+
+    player_num = 2
+
+    def __init__(self, payoffs):
+        self.payoffs = payoffs
+        self.game_num = 0
+
+    def run(self, is_training=False):
+        payoffs = self.payoffs[self.game_num % len(self.payoffs)]
+        self.game_num += 1
+        return None, np.array(payoffs)
+
+
+class TestUtils(unittest.TestCase):
+
+    def test_paired_tournament_same_deal_rotated_seats(self):
+        env = rlcard.make('keezen', config={'seed': 0})
+        agents = [SeatAgent() for _ in range(env.player_num)]
+        env.set_agents(agents)
+        deals = []
+        reset = env.reset
+
+        def record_deal():
+            result = reset()
+            game_state = env.game.game_state
+            deals.append([[card.id_ for card in game_state.player_cards[player]] for player in env.game.game.players] +
+                         [[card.id_ for card in game_state.stock_cards]])
+            return result
+
+        env.reset = record_deal
+        paired_tournament(env, 2, seed=5)
+        self.assertEqual(4, len(deals))
+        self.assertEqual(deals[0], deals[1])
+        self.assertEqual(deals[2], deals[3])
+        self.assertNotEqual(deals[0], deals[2])
+        for index, agent in enumerate(agents):
+            # The first game of a deal in the own seat, the second game one seat lower
+            self.assertEqual(agent.seats[:2], [index, (index - 1) % env.player_num])
+        self.assertIs(env.agents, agents)
+
+    def test_paired_tournament_payoffs_of_agents(self):
+        agents = [ValueAgent(value) for value in (4, 1, 3, 2)]
+        env = PayoffEnv(agents)
+        payoffs, difference, half_width = paired_tournament(env, 9, seed=0)
+        self.assertEqual([4.0, 1.0, 3.0, 2.0], payoffs)
+        self.assertAlmostEqual(3.0, difference)
+        self.assertEqual(0.0, half_width)
+        self.assertIs(env.agents, agents)
+
+    def test_paired_tournament_confidence(self):
+        agents = [ValueAgent(0, noise=True), ValueAgent(1), ValueAgent(0), ValueAgent(0)]
+        env = PayoffEnv(agents)
+        _, _, half_width_95 = paired_tournament(env, 9, seed=0)
+        _, _, half_width_99 = paired_tournament(env, 9, seed=0, confidence=0.99)
+        self.assertGreater(half_width_99, half_width_95)
+        self.assertAlmostEqual(2.5758 / 1.9600, half_width_99 / half_width_95, places=3)
+
+    def test_sequential_tournament_precision(self):
+        env = CycleEnv([[1, 0], [0, 1]])
+        payoffs, counter, decision = sequential_tournament(env, 1000, precision=0.1, min_num=10)
+        self.assertEqual('precision', decision)
+        self.assertEqual(counter, env.game_num)
+        # Half width 1.96 * 0.5 / sqrt(n) (about, the variance has ddof 1) below 0.1 from about 96 games on
+        self.assertTrue(96 < counter < 110)
+        self.assertAlmostEqual(0.5, payoffs[0], places=1)
+
+    def test_sequential_tournament_sprt(self):
+        sprt = (0.5, 0.6, 0.05, 0.05)
+        _, counter, decision = sequential_tournament(CycleEnv([[1, 0]]), 1000, sprt=sprt, min_num=1)
+        self.assertEqual('H1', decision)
+        self.assertEqual(math.ceil(math.log(19) / math.log(0.6 / 0.5)), counter)
+        _, counter, decision = sequential_tournament(CycleEnv([[0, 1]]), 1000, sprt=sprt, min_num=1)
+        self.assertEqual('H0', decision)
+        self.assertEqual(math.ceil(math.log(19) / -math.log(0.4 / 0.5)), counter)
+
+    def test_sequential_tournament_min_num(self):
+        # No variance and a clear SPRT decision after a few games: no stop before min_num
+        _, counter, decision = sequential_tournament(CycleEnv([[1, 0]]), 1000, precision=0.1, min_num=50)
+        self.assertEqual((50, 'precision'), (counter, decision))
+        _, counter, decision = sequential_tournament(CycleEnv([[1, 0]]), 1000, sprt=(0.5, 0.6, 0.05, 0.05))
+        self.assertEqual((100, 'H1'), (counter, decision))
+
+    def test_sequential_tournament_max_num(self):
+        env = CycleEnv([[1, 0], [0, 1]])
+        payoffs, counter, decision = sequential_tournament(env, 50, precision=0.001, sprt=(0.4, 0.6, 0.05, 0.05),
+                                                           min_num=10)
+        self.assertEqual((50, None), (counter, decision))
+        self.assertEqual(50, env.game_num)
+        self.assertEqual([0.5, 0.5], payoffs)
+
+    def test_parallel_tournament_in_process(self):
+        agents = [GlobalRandomAgent() for _ in range(4)]
+        random.seed(1)
+        np.random.seed(1)
+        random_state, np_random_state = random.getstate(), np.random.get_state()
+        payoffs, length, _ = parallel_tournament('mejn', {}, agents, 6, process_num=1, seed=3, chunk_size=2)
+        self.assertEqual(random_state, random.getstate())
+        self.assertTrue(np.array_equal(np_random_state[1], np.random.get_state()[1]))
+        self.assertIsNone(utils._tournament_env)
+        parallel_payoffs, parallel_length, _ = parallel_tournament('mejn', {}, agents, 6, process_num=2, seed=3,
+                                                                   chunk_size=2)
+        self.assertEqual(payoffs, parallel_payoffs)
+        self.assertEqual(length, parallel_length)
+
+    def test_get_legal_masks(self):
+        legal_masks = get_legal_masks([[0, 2], [3], []], 4)
+        self.assertEqual(bool, legal_masks.dtype)
+        self.assertEqual([[True, False, True, False], [False, False, False, True], [False, False, False, False]],
+                         legal_masks.tolist())
+
+    def test_remove_illegal_batch(self):
+        action_probs = np.array([[0.1, 0.2, 0.3, 0.4], [0.5, 0.5, 0.0, 0.0], [0.0, 0.0, 0.0, 1.0]])
+        legal_actions = [[0, 2], [2, 3], [3]]
+        probs = remove_illegal_batch(action_probs, get_legal_masks(legal_actions, 4))
+        for row, actions in enumerate(legal_actions):
+            # Like remove_illegal, uniform over the legal actions without probability on them
+            self.assertTrue(np.allclose(remove_illegal(action_probs[row], actions), probs[row]))
+        self.assertTrue(np.allclose([[0.25, 0.0, 0.75, 0.0], [0.0, 0.0, 0.5, 0.5], [0.0, 0.0, 0.0, 1.0]], probs))
+
+    def test_masked_softmax(self):
+        logits = np.array([[1.0, 5.0, 2.0], [1000.0, -1000.0, 1000.0]])
+        legal_masks = np.array([[True, False, True], [True, True, True]])
+        probs = masked_softmax(logits, legal_masks)
+        exps = np.exp([1.0, 2.0])
+        self.assertTrue(np.allclose([exps[0] / exps.sum(), 0.0, exps[1] / exps.sum()], probs[0]))
+        self.assertTrue(np.allclose([0.5, 0.0, 0.5], probs[1]))  # No overflow
+
+    def test_masked_argmax(self):
+        values = np.array([[1.0, 5.0, 2.0], [3.0, 3.0, 3.0], [-2.0, -1.0, -3.0]])
+        legal_masks = np.array([[True, False, True], [False, True, True], [True, False, True]])
+        self.assertEqual([2, 1, 0], masked_argmax(values, legal_masks).tolist())
+
+    def test_masked_sample(self):
+        action_probs = np.tile([0.5, 0.3, 0.2, 0.0], (2000, 1))
+        legal_masks = np.tile([True, False, True, True], (2000, 1))
+        actions = masked_sample(action_probs, legal_masks, np.random.RandomState(0))
+        counts = np.bincount(actions, minlength=4) / len(actions)
+        self.assertEqual(0, counts[1])
+        self.assertTrue(np.allclose([0.5 / 0.7, 0.0, 0.2 / 0.7, 0.0], counts, atol=0.03))
+        # Only illegal probability: uniform over the legal actions, never an illegal action
+        actions = masked_sample(np.tile([0.0, 1.0, 0.0, 0.0], (600, 1)), legal_masks[:600], np.random.RandomState(0))
+        self.assertEqual({0, 2, 3}, set(actions.tolist()))
+
+    def test_masked_no_legal_action(self):
+        legal_masks = np.array([[True, False], [False, False]])
+        values = np.array([[0.5, 0.5], [0.5, 0.5]])
+        for function in (remove_illegal_batch, masked_softmax, masked_argmax, masked_sample):
+            with self.assertRaisesRegex(ValueError, r'rows \[1\]'):
+                function(values, legal_masks)
+
+
+if __name__ == '__main__':
+    unittest.main()